@@ -1,16 +1,16 @@
-import requests
-from config import BOOKSTACK_API_BASE, BOOKSTACK_HEADERS
+from api.client import BookStackBaseAPI
 
-class BookStackBooksAPI:
+class BookStackBooksAPI(BookStackBaseAPI):
     """Gestion des livres BookStack (CRUD, recherche, etc.)"""
-    def list_books(self):
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/books?count=1000", headers=BOOKSTACK_HEADERS)
-        if resp.status_code == 200:
-            return resp.json().get('data', [])
-        return []
+    def iter_books(self, filters=None, fields=None, strict=False):
+        """Parcourt tous les livres, page par page."""
+        return self._paginate("books", filters=filters, fields=fields, strict=strict)
+
+    def list_books(self, filters=None, fields=None):
+        return list(self.iter_books(filters, fields))
 
     def get_book(self, book_id):
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/books/{book_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._get(f"books/{book_id}")
         if resp.status_code == 200:
             return resp.json()
         return None
@@ -19,16 +19,16 @@ class BookStackBooksAPI:
         payload = {"name": name}
         if description:
             payload["description"] = description
-        resp = requests.post(f"{BOOKSTACK_API_BASE}/books", headers=BOOKSTACK_HEADERS, json=payload)
+        resp = self._post("books", json=payload)
         if resp.status_code in (200, 201):
             return resp.json()
         print(f"[API][Book] Erreur création livre : {resp.status_code} - {resp.text}")
         return None
 
     def update_book(self, book_id, fields):
-        resp = requests.put(f"{BOOKSTACK_API_BASE}/books/{book_id}", headers=BOOKSTACK_HEADERS, json=fields)
+        resp = self._put(f"books/{book_id}", json=fields)
         return resp.status_code == 200
 
     def delete_book(self, book_id):
-        resp = requests.delete(f"{BOOKSTACK_API_BASE}/books/{book_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._delete(f"books/{book_id}")
         return resp.status_code == 204
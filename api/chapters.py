@@ -1,22 +1,20 @@
-import requests
-from config import BOOKSTACK_API_BASE, BOOKSTACK_HEADERS
+from api.client import BookStackBaseAPI
 
-class BookStackChaptersAPI:
+class BookStackChaptersAPI(BookStackBaseAPI):
     """Gestion des chapitres BookStack (CRUD, recherche, etc.)"""
     # BookStackChaptersAPI.py
-    def list_chapters(self, book_id=None):
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/chapters?count=1000", headers=BOOKSTACK_HEADERS)
-        if resp.status_code == 200:
-            chapters = resp.json().get("data", [])
-            if book_id is not None:
-                return [ch for ch in chapters if ch.get("book_id") == book_id]
-            return chapters
-        return []
+    def iter_chapters(self, book_id=None, filters=None, fields=None, strict=False):
+        """Parcourt les chapitres (d'un livre si book_id est fourni, filtré côté serveur)."""
+        filters = dict(filters or {}, book_id=book_id)
+        return self._paginate("chapters", filters=filters, fields=fields, strict=strict)
+
+    def list_chapters(self, book_id=None, filters=None, fields=None):
+        return list(self.iter_chapters(book_id, filters, fields))
 
 
     def get_chapter(self, chapter_id):
         
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/chapters/{chapter_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._get(f"chapters/{chapter_id}")
         if resp.status_code == 200:
             return resp.json()
         return None
@@ -25,16 +23,16 @@ class BookStackChaptersAPI:
         payload = {"book_id": book_id, "name": name}
         if description:
             payload["description"] = description
-        resp = requests.post(f"{BOOKSTACK_API_BASE}/chapters", headers=BOOKSTACK_HEADERS, json=payload)
+        resp = self._post("chapters", json=payload)
         if resp.status_code in (200, 201):
             return resp.json()
         print(f"[API][Chapter] Erreur création chapitre : {resp.status_code} - {resp.text}")
         return None
 
     def update_chapter(self, chapter_id, fields):
-        resp = requests.put(f"{BOOKSTACK_API_BASE}/chapters/{chapter_id}", headers=BOOKSTACK_HEADERS, json=fields)
+        resp = self._put(f"chapters/{chapter_id}", json=fields)
         return resp.status_code == 200
 
     def delete_chapter(self, chapter_id):
-        resp = requests.delete(f"{BOOKSTACK_API_BASE}/chapters/{chapter_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._delete(f"chapters/{chapter_id}")
         return resp.status_code == 204
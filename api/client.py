@@ -0,0 +1,225 @@
+import re
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import perf
+from utils.metrics import HTTP_REQUESTS, HTTP_RETRIES, HTTP_LATENCY
+from config import (
+    BOOKSTACK_API_BASE,
+    BOOKSTACK_HEADERS,
+    BOOKSTACK_PAGE_SIZE,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_BACKOFF_MAX,
+)
+
+RETRY_STATUSES = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+_ID_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+
+
+class HTTPClient:
+    """Client HTTP partagé : pool de connexions par hôte, keep-alive, retries avec backoff."""
+
+    def __init__(
+        self,
+        pool_size: int = HTTP_POOL_SIZE,
+        timeout: float = HTTP_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        backoff_max: float = HTTP_BACKOFF_MAX,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.logger = logging.getLogger(__name__)
+        # Une session unique : urllib3 conserve un pool de connexions par hôte
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._stats = defaultdict(lambda: {"count": 0, "errors": 0, "retries": 0, "total_time": 0.0, "max_time": 0.0})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(method: str, url: str) -> str:
+        """Libellé d'endpoint : méthode + hôte + chemin, identifiants numériques remplacés par {id}."""
+        parts = urlsplit(url)
+        return f"{method.upper()} {parts.netloc}{_ID_SEGMENT_RE.sub('/{id}', parts.path)}"
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponentiel avec jitter complet."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def _record(self, endpoint: str, elapsed: float, error: bool, retried: bool, service: str = "http", status="error"):
+        HTTP_REQUESTS.inc(service=service, endpoint=endpoint, status=status)
+        HTTP_LATENCY.observe(elapsed, service=service, endpoint=endpoint)
+        if retried:
+            HTTP_RETRIES.inc(service=service, endpoint=endpoint)
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats["count"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            if error:
+                stats["errors"] += 1
+            if retried:
+                stats["retries"] += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        retry: Optional[bool] = None,
+        service: str = "http",
+        **kwargs
+    ) -> requests.Response:
+        """Envoie une requête ; les erreurs 5xx et de connexion sont réessayées.
+
+        Par défaut, seules les méthodes idempotentes sont réessayées (retry=True pour forcer).
+        service étiquette les métriques (bookstack, libretranslate).
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = self.endpoint(method, url)
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(endpoint, time.perf_counter() - start, True, attempt > 0, service)
+                perf.record_http(service, None, attempt > 0)
+                if not retry or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(f"[HTTP] {endpoint} : {e} ; nouvel essai dans {delay:.2f}s")
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                self._record(
+                    endpoint, time.perf_counter() - start, response.status_code >= 400, attempt > 0,
+                    service, response.status_code
+                )
+                perf.record_http(service, response, attempt > 0)
+                if not failed or not retry or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt)
+                self.logger.warning(f"[HTTP] {endpoint} : statut {response.status_code} ; nouvel essai dans {delay:.2f}s")
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Nombre de requêtes, erreurs, retries et latences par endpoint."""
+        with self._lock:
+            return {
+                endpoint: dict(values, avg_time=values["total_time"] / values["count"] if values["count"] else 0.0)
+                for endpoint, values in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Retourne le client HTTP partagé du processus (construit une seule fois depuis config.py)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient()
+    return _client
+
+
+class BookStackBaseAPI:
+    """Base commune des clients BookStack : URL, en-têtes et client HTTP partagé."""
+
+    def __init__(self, client: Optional[HTTPClient] = None, api_base: Optional[str] = None, headers: Optional[dict] = None):
+        self.client = client or get_http_client()
+        self.api_base = (api_base or BOOKSTACK_API_BASE).rstrip("/")
+        self.headers = headers or BOOKSTACK_HEADERS
+
+    def _request(self, method, path, **kwargs):
+        return self.client.request(
+            method, f"{self.api_base}/{path.lstrip('/')}", headers=self.headers, service="bookstack", **kwargs
+        )
+
+    def _get(self, path, **kwargs):
+        return self._request("GET", path, **kwargs)
+
+    def _post(self, path, **kwargs):
+        return self._request("POST", path, **kwargs)
+
+    def _put(self, path, **kwargs):
+        return self._request("PUT", path, **kwargs)
+
+    def _delete(self, path, **kwargs):
+        return self._request("DELETE", path, **kwargs)
+
+    def _paginate(
+        self,
+        path: str,
+        filters: Optional[dict] = None,
+        fields: Optional[Iterable[str]] = None,
+        sort: str = "+id",
+        count: int = BOOKSTACK_PAGE_SIZE,
+        strict: bool = False
+    ) -> Iterator[dict]:
+        """Parcourt un listing BookStack page par page (offset/count) jusqu'à épuisement.
+
+        Les filtres sont appliqués côté serveur (filter[champ]) ; fields restreint les
+        éléments produits aux seuls champs utiles (l'API ne permet pas de les sélectionner).
+        strict : lève requests.HTTPError au lieu d'interrompre silencieusement le listing.
+        """
+        params = {"count": count, "sort": sort}
+        for key, value in (filters or {}).items():
+            if value is not None:
+                params[f"filter[{key}]"] = value
+        keep = tuple(fields) if fields else None
+        offset = 0
+        while True:
+            params["offset"] = offset
+            resp = self._get(path, params=params)
+            if resp.status_code != 200:
+                logging.error(f"[API] Listing {path} interrompu (offset {offset}) : {resp.status_code}")
+                if strict:
+                    raise requests.HTTPError(f"Listing {path} interrompu : {resp.status_code}", response=resp)
+                return
+            body = resp.json()
+            data = body.get('data', [])
+            for item in data:
+                yield {key: item.get(key) for key in keep} if keep else item
+            offset += len(data)
+            total = body.get('total')
+            if len(data) < count or (total is not None and offset >= total):
+                return
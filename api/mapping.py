@@ -1,27 +1,101 @@
+import os
+import sys
 import json
+import shutil
 import logging
 import copy
+import threading
 from difflib import SequenceMatcher
+from typing import NamedTuple, Optional
 
+from config import (
+    MAPPING_FILE,
+    MAPPING_FILE_BACKUP,
+    MAPPING_FILE_TEMP,
+    MAPPING_JOURNAL_FILE,
+    MAPPING_COMPACT_EVERY,
+)
 from api.books import BookStackBooksAPI
 from api.chapters import BookStackChaptersAPI
 from api.pages import BookStackPagesAPI
+from api.mapping_journal import MappingJournal, apply_operation
+from api.mirror import BookStackMirror
+from api.title_matcher import TitleMatcher
 from translation.translate import TranslationService
 
 
+SECTIONS = ("books", "chapters", "pages")
+
+
+class ReverseEntry(NamedTuple):
+    """Entrée de l'index inverse : la source (et la langue) d'un contenu traduit."""
+    source_id: int
+    lang: str
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class MappingManager:
-    def __init__(self, mapping_path='db/mapping.json'):
+    def __init__(
+        self,
+        mapping_path=MAPPING_FILE,
+        book_api=None,
+        chapter_api=None,
+        page_api=None,
+        translation_service=None,
+        mirror=None
+    ):
         self.mapping_path = mapping_path
+        # Fichiers compagnons : ceux de config.py pour le mapping principal, suffixés sinon
+        is_main = os.path.abspath(mapping_path) == os.path.abspath(MAPPING_FILE)
+        self.temp_path = MAPPING_FILE_TEMP if is_main else f"{mapping_path}.tmp"
+        self.backup_path = MAPPING_FILE_BACKUP if is_main else f"{mapping_path}.bak"
+        self.journal = MappingJournal(MAPPING_JOURNAL_FILE if is_main else f"{mapping_path}.journal")
+        # Mutations et compactions sérialisées (travailleurs du webhook partageant le même mapping)
+        self._lock = threading.RLock()
+        self._signature = None
         self.mapping = self.load_mapping()
-        self.book_api = BookStackBooksAPI()
-        self.chapter_api = BookStackChaptersAPI()
-        self.page_api = BookStackPagesAPI()
-        self.translation_service = TranslationService()
+        # Index inverses par type : id traduit (int) -> ReverseEntry(id source, langue)
+        self._reverse = {section: {} for section in SECTIONS}
+        self._rebuild_reverse_index()
+        self.book_api = book_api or BookStackBooksAPI()
+        self.chapter_api = chapter_api or BookStackChaptersAPI()
+        self.page_api = page_api or BookStackPagesAPI()
+        # Service de traduction et appariement de titres construits seulement si clean_mapping est appelé
+        self._translation_service = translation_service
+        self._title_matcher = None
+        self._mirror = mirror
+
+    @property
+    def mirror(self):
+        """Miroir local de la hiérarchie BookStack (parents, noms) évitant les lectures d'API répétées."""
+        if self._mirror is None:
+            self._mirror = BookStackMirror(
+                book_api=self.book_api, chapter_api=self.chapter_api, page_api=self.page_api
+            )
+        return self._mirror
+
+    @property
+    def translation_service(self):
+        if self._translation_service is None:
+            self._translation_service = TranslationService()
+        return self._translation_service
+
+    @property
+    def title_matcher(self):
+        if self._title_matcher is None:
+            self._title_matcher = TitleMatcher(self.translation_service)
+        return self._title_matcher
 
     def is_empty(self) -> bool:
         return not self.mapping or all(not v for v in self.mapping.values())
 
-    def load_mapping(self):
+    def _read_snapshot(self):
         try:
             with open(self.mapping_path, 'r', encoding='utf-8') as f:
                 mapping = json.load(f)
@@ -48,13 +122,137 @@ class MappingManager:
             logging.error(f"[MAPPING] Erreur inconnue lors du chargement du mapping : {e}")
             return {}
 
+    def load_mapping(self):
+        """Charge le dernier instantané puis rejoue le journal des mutations."""
+        mapping = self._read_snapshot()
+        replayed = self.journal.replay(mapping)
+        if replayed:
+            logging.info(f"[MAPPING] {replayed} opérations rejouées depuis {self.journal.path}.")
+        self._signature = self._file_signature()
+        return mapping
+
+    def _file_signature(self):
+        """(mtime, taille) de l'instantané et du journal, pour détecter une écriture externe."""
+        signature = []
+        for path in (self.mapping_path, self.journal.path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload_if_changed(self) -> bool:
+        """Relit le mapping si un autre processus a modifié ses fichiers ; retourne True si relu."""
+        with self._lock:
+            if self._file_signature() == self._signature:
+                return False
+            logging.info(f"[MAPPING] {self.mapping_path} modifié sur disque, rechargement.")
+            self.journal.close()
+            self.mapping = self.load_mapping()
+            self._rebuild_reverse_index()
+            return True
+
     def save_mapping(self):
-        try:
-            with open(self.mapping_path, 'w', encoding='utf-8') as f:
-                json.dump(self.mapping, f, indent=4, ensure_ascii=False)
+        """Compacte le mapping : instantané écrit à côté puis renommé atomiquement, journal vidé."""
+        with self._lock:
+            try:
+                with open(self.temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.mapping, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.mapping_path):
+                    shutil.copy2(self.mapping_path, self.backup_path)
+                os.replace(self.temp_path, self.mapping_path)
+                self.journal.reset()
+                self._signature = self._file_signature()
                 logging.info(f"[MAPPING] Mapping sauvegardé dans {self.mapping_path}.")
-        except Exception as e:
-            logging.error(f"[MAPPING] Erreur lors de la sauvegarde du fichier de mapping : {e}")
+            except Exception as e:
+                logging.error(f"[MAPPING] Erreur lors de la sauvegarde du fichier de mapping : {e}")
+
+    def flush(self):
+        """À appeler en fin de synchronisation : intègre le journal dans un nouvel instantané."""
+        with self._lock:
+            if self.journal.operations:
+                self.save_mapping()
+            else:
+                self.journal.sync()
+
+    def _record(self, op):
+        with self._lock:
+            self._index_operation(op)
+            apply_operation(self.mapping, op)
+            self.journal.append(op)
+            if self.journal.operations >= MAPPING_COMPACT_EVERY:
+                self.save_mapping()
+            else:
+                self._signature = self._file_signature()
+
+    def _set(self, path, value):
+        self._record({"op": "set", "path": [str(part) for part in path], "value": value})
+
+    def _delete(self, path):
+        self._record({"op": "del", "path": [str(part) for part in path]})
+
+    # ---- REVERSE INDEX ----
+
+    def _index_add(self, section, source_id, lang, target_id):
+        source, target = _as_int(source_id), _as_int(target_id)
+        if source is not None and target is not None:
+            self._reverse[section].setdefault(target, ReverseEntry(source, sys.intern(lang)))
+
+    def _index_remove(self, section, source_id, lang):
+        target = _as_int(self.mapping.get(section, {}).get(str(source_id), {}).get("translations", {}).get(lang))
+        entry = self._reverse[section].get(target)
+        if entry is not None and entry.source_id == _as_int(source_id) and entry.lang == lang:
+            del self._reverse[section][target]
+
+    def _rebuild_reverse_index(self):
+        for section in SECTIONS:
+            self._reverse[section] = {}
+            for source_id, entry in self.mapping.get(section, {}).items():
+                for lang, target_id in (entry.get("translations") or {}).items():
+                    self._index_add(section, source_id, lang, target_id)
+
+    def _index_operation(self, op):
+        """Met à jour l'index inverse avant qu'une opération ne modifie le mapping."""
+        path = op["path"]
+        if not path or path[0] not in SECTIONS:
+            return
+        section = path[0]
+        if len(path) == 4 and path[2] == "translations":
+            self._index_remove(section, path[1], path[3])
+            if op["op"] == "set":
+                self._index_add(section, path[1], path[3], op["value"])
+        elif len(path) == 2 and op["op"] == "del":
+            translations = self.mapping.get(section, {}).get(path[1], {}).get("translations") or {}
+            for lang in list(translations):
+                self._index_remove(section, path[1], lang)
+
+    def get_source(self, section, target_id) -> Optional[ReverseEntry]:
+        """Retourne (id source, langue) si le contenu est lui-même une traduction, sinon None."""
+        return self._reverse[section].get(_as_int(target_id))
+
+    def get_source_book(self, target_id):
+        return self.get_source("books", target_id)
+
+    def get_source_chapter(self, target_id):
+        return self.get_source("chapters", target_id)
+
+    def get_source_page(self, target_id):
+        return self.get_source("pages", target_id)
+
+    def is_translation(self, section, item_id) -> bool:
+        return self.get_source(section, item_id) is not None
+
+    def find_orphans(self, section, valid_ids):
+        """Traductions dont la cible n'existe plus : liste de (id source, langue, id cible)."""
+        valid = {_as_int(item_id) for item_id in valid_ids}
+        return [
+            (entry.source_id, entry.lang, target)
+            for target, entry in self._reverse[section].items()
+            if target not in valid
+        ]
 
     # ---- BOOKS ----
 
@@ -68,13 +266,10 @@ class MappingManager:
         )
 
     def set_mapped_book(self, source_id, lang, target_id):
-        book = (
-            self.mapping
-            .setdefault("books", {})
-            .setdefault(str(source_id), {})
-        )
-        book.setdefault("translations", {})[lang] = target_id
-        self.save_mapping()
+        self._set(("books", source_id, "translations", lang), target_id)
+
+    def set_book(self, source_id, lang, target_id):
+        self.set_mapped_book(source_id, lang, target_id)
 
     def get_book(self, source_id, lang):
         return self.get_mapped_book(source_id, lang)
@@ -91,13 +286,10 @@ class MappingManager:
         )
 
     def set_mapped_chapter(self, source_id, lang, target_id):
-        chapter = (
-            self.mapping
-            .setdefault("chapters", {})
-            .setdefault(str(source_id), {})
-        )
-        chapter.setdefault("translations", {})[lang] = target_id
-        self.save_mapping()
+        self._set(("chapters", source_id, "translations", lang), target_id)
+
+    def set_chapter(self, source_id, lang, target_id):
+        self.set_mapped_chapter(source_id, lang, target_id)
 
     def get_chapter(self, source_id, lang):
         return self.get_mapped_chapter(source_id, lang)
@@ -113,33 +305,65 @@ class MappingManager:
             .get(lang)
         )
 
-    def set_mapped_page(self, source_id, lang, target_id):
-        page = (
-            self.mapping
-            .setdefault("pages", {})
-            .setdefault(str(source_id), {})
-        )
-        page.setdefault("translations", {})[lang] = target_id
-        if 'chapter_id' not in page or 'book_id' not in page:
+    def set_mapped_page(self, source_id, lang, target_id, book_id=None, chapter_id=None):
+        self._set(("pages", source_id, "translations", lang), target_id)
+        page = self.mapping["pages"][str(source_id)]
+        if book_id is None and ('chapter_id' not in page or 'book_id' not in page):
             try:
-                src_page = self.page_api.get_page(source_id)
-                page['chapter_id'] = src_page.get('chapter_id')
-                page['book_id'] = src_page.get('book_id')
+                src_page = self.mirror.get_page(source_id) or {}
+                book_id, chapter_id = src_page.get('book_id'), src_page.get('chapter_id')
             except Exception:
                 pass
-        self.save_mapping()
+        if book_id is not None:
+            # Parents connus de l'appelant : pas besoin de relire la page source
+            self._set(("pages", source_id, "book_id"), book_id)
+            self._set(("pages", source_id, "chapter_id"), chapter_id)
+
+    def set_page(self, source_id, lang, target_id):
+        self.set_mapped_page(source_id, lang, target_id)
 
     def get_page(self, source_id, lang):
         logging.info(f"[MAPPING] Appel de get_page({source_id}, {lang})")
         return self.get_mapped_page(source_id, lang)
 
+    # ---- SYNC STATE ----
+
+    def get_sync_state(self, section, source_id, lang):
+        """Retourne {"source_hash", "target_hash"} de la dernière publication pour une langue."""
+        return (
+            self.mapping
+            .get(section, {})
+            .get(str(source_id), {})
+            .get("synced", {})
+            .get(lang)
+        )
+
+    def set_sync_state(self, section, source_id, lang, source_hash, target_hash):
+        self._set((section, source_id, "source_hash"), source_hash)
+        self._set((section, source_id, "synced", lang), {
+            "source_hash": source_hash,
+            "target_hash": target_hash
+        })
+
+    def is_up_to_date(self, section, source_id, lang, source_hash):
+        """Vrai si la traduction existe et a été publiée à partir du même contenu source."""
+        target_id = (
+            self.mapping
+            .get(section, {})
+            .get(str(source_id), {})
+            .get("translations", {})
+            .get(lang)
+        )
+        state = self.get_sync_state(section, source_id, lang)
+        return bool(target_id and state and state.get("source_hash") == source_hash)
+
     # ---- LISTING ----
 
     def get_chapters_of_book(self, book_id):
-        return self.chapter_api.list_chapters(book_id)
+        return self.mirror.list_chapters(book_id)
 
     def get_pages_of_chapter(self, chapter_id):
-        return self.page_api.list_pages(chapter_id=chapter_id)
+        return self.mirror.list_pages(chapter_id=chapter_id)
 
     # ---- CLEANUP & LINKING ----
 
@@ -147,89 +371,84 @@ class MappingManager:
         return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
     def _match_by_title(self, source_dict, langs=["en", "de", "fr"], threshold=0.8):
-        items = list(source_dict.items())
-        for i, (src_id, src_data) in enumerate(items):
-            src_title = src_data.get("title", "")
-            for tgt_id, tgt_data in items[i + 1:]:
-                # Skip matching if same contextual parent (for chapters/pages)
-                if (
-                    "book_id" in src_data and "book_id" in tgt_data
-                    and src_data.get("book_id") == tgt_data.get("book_id")
-                ):
-                    continue
-                tgt_title = tgt_data.get("title", "")
-                for lang in langs:
-                    try:
-                        translated = self.translation_service.translate_text(src_title, lang)
-                        trans_lower = translated.strip().lower()
-                        tgt_lower = tgt_title.strip().lower()
-                        # exact or fuzzy match
-                        if trans_lower == tgt_lower or self.similar(trans_lower, tgt_lower) >= threshold:
-                            src_data.setdefault("translations", {})[lang] = int(tgt_id)
-                            break
-                    except Exception as e:
-                        logging.warning(f"Traduction échouée : {src_title} -> {lang} : {e}")
+        added = self.title_matcher.match(source_dict, langs, threshold)
+        logging.info(f"[MAPPING] {added} traductions rapprochées par titre.")
+
+    @staticmethod
+    def _keep_sync_state(entry, old_entry):
+        """Conserve les empreintes de synchronisation d'une entrée reconstruite."""
+        for key in ("source_hash", "synced"):
+            if key in old_entry:
+                entry[key] = copy.deepcopy(old_entry[key])
+        return entry
 
     def clean_mapping(self):
         print("Nettoyage et reconstruction du mapping...")
-        old_mapping = copy.deepcopy(self.mapping)
-        books = self.book_api.list_books()
-        chapters = []
-        pages = []
-
-        self.mapping = {
-            "books": {},
-            "chapters": {},
-            "pages": {},
-            "pages_by_id": {}
-        }
-
-        for book in books:
-            b_id = str(book["id"])
-            old_trans = old_mapping.get("books", {}).get(b_id, {}).get("translations", {})
-            self.mapping["books"][b_id] = {
-                "title": book.get("name"),
-                "slug": book.get("slug"),
-                "translations": old_trans.copy()
+        self.mirror.refresh()
+        books = self.mirror.list_books()
+        if not books:
+            # Miroir vide (BookStack injoignable ?) : ne pas effacer le mapping existant
+            logging.error("[MAPPING] Aucun livre dans le miroir BookStack, nettoyage annulé.")
+            return
+        # Reconstruction sous le verrou : une mutation concurrente (travailleur de synchronisation)
+        # ne peut pas viser l'ancien dictionnaire puis être perdue au remplacement
+        with self._lock:
+            old_mapping = copy.deepcopy(self.mapping)
+            mapping = {
+                "books": {},
+                "chapters": {},
+                "pages": {},
+                "pages_by_id": {}
             }
-            for chap in self.chapter_api.list_chapters(book["id"]):
+
+            # Hiérarchie lue dans le miroir local (rafraîchi de façon incrémentale)
+            for book in books:
+                b_id = str(book["id"])
+                old_book = old_mapping.get("books", {}).get(b_id, {})
+                mapping["books"][b_id] = self._keep_sync_state({
+                    "title": book.get("name"),
+                    "slug": book.get("slug"),
+                    "translations": old_book.get("translations", {}).copy()
+                }, old_book)
+
+            for chap in self.mirror.list_chapters():
                 c_id = str(chap["id"])
-                old_c_trans = old_mapping.get("chapters", {}).get(c_id, {}).get("translations", {})
-                self.mapping["chapters"][c_id] = {
+                old_chapter = old_mapping.get("chapters", {}).get(c_id, {})
+                mapping["chapters"][c_id] = self._keep_sync_state({
                     "title": chap.get("name"),
                     "book_id": chap.get("book_id"),
-                    "translations": old_c_trans.copy()
-                }
-                chapters.append(chap)
+                    "translations": old_chapter.get("translations", {}).copy()
+                }, old_chapter)
 
-            for page in self.page_api.list_pages(book_id=book["id"]):
+            for page in self.mirror.list_pages():
                 p_id = str(page["id"])
-                old_p_trans = old_mapping.get("pages", {}).get(p_id, {}).get("translations", {})
-                self.mapping["pages"][p_id] = {
+                old_page = old_mapping.get("pages", {}).get(p_id, {})
+                mapping["pages"][p_id] = self._keep_sync_state({
                     "title": page.get("name"),
                     "chapter_id": page.get("chapter_id"),
                     "book_id": page.get("book_id"),
-                    "translations": old_p_trans.copy()
-                }
-                self.mapping["pages_by_id"][p_id] = {
+                    "translations": old_page.get("translations", {}).copy()
+                }, old_page)
+                mapping["pages_by_id"][p_id] = {
                     "book_id": page.get("book_id"),
                     "chapter_id": page.get("chapter_id"),
                     "page_id": page.get("id")
                 }
-                pages.append(page)
 
-        self._match_by_title(self.mapping["books"])
-        self._match_by_title(self.mapping["chapters"])
-        self._match_by_title(self.mapping["pages"])
+            self._match_by_title(mapping["books"])
+            self._match_by_title(mapping["chapters"])
+            self._match_by_title(mapping["pages"])
 
-        self.save_mapping()
+            self.mapping = mapping
+            self._rebuild_reverse_index()
+            self.save_mapping()
         print("Mapping nettoyé et reconstruit.")
 
     def remove_page(self, source_id, lang):
         page_entry = self.mapping.get("pages", {}).get(str(source_id))
         if page_entry and 'translations' in page_entry and lang in page_entry['translations']:
-            del page_entry['translations'][lang]
-            if not page_entry['translations']:
-                del self.mapping["pages"][str(source_id)]
-            self.save_mapping()
+            if len(page_entry['translations']) == 1:
+                self._delete(("pages", source_id))
+            else:
+                self._delete(("pages", source_id, "translations", lang))
             logging.info(f"[MAPPING] Entrée supprimée : page {source_id} ({lang})")
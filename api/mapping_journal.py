@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from config import MAPPING_JOURNAL_FSYNC_EVERY, MAPPING_JOURNAL_FSYNC_INTERVAL
+
+
+def apply_operation(mapping: dict, op: dict):
+    """Applique une mutation du journal ({"op": "set" | "del", "path": [...], "value": ...})."""
+    *parents, key = op["path"]
+    node = mapping
+    if op["op"] == "set":
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[key] = op["value"]
+    elif op["op"] == "del":
+        for part in parents:
+            node = node.get(part)
+            if not isinstance(node, dict):
+                return
+        node.pop(key, None)
+
+
+class MappingJournal:
+    """Journal append-only des mutations du mapping (une ligne JSON par opération).
+
+    Chaque ligne est écrite et vidée vers le système immédiatement ; le fsync est fait par lots
+    (toutes les N opérations ou toutes les X secondes).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_every: int = MAPPING_JOURNAL_FSYNC_EVERY,
+        fsync_interval: float = MAPPING_JOURNAL_FSYNC_INTERVAL
+    ):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.logger = logging.getLogger(__name__)
+        self._file = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.operations = 0
+
+    def replay(self, mapping: dict) -> int:
+        """Rejoue le journal sur le mapping.
+
+        Une dernière ligne tronquée (crash pendant l'écriture) est ignorée puis retirée du
+        fichier, pour que l'opération suivante ne soit pas écrite à sa suite.
+        """
+        count = 0
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                apply_operation(mapping, json.loads(line.decode('utf-8')))
+                count += 1
+            except (ValueError, KeyError):
+                self.logger.warning(f"[MAPPING] Ligne de journal illisible ignorée dans {self.path}.")
+        if complete < len(data):
+            self.logger.warning(f"[MAPPING] Dernière ligne tronquée retirée du journal {self.path}.")
+            with self._lock:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(complete)
+                    f.flush()
+                    os.fsync(f.fileno())
+        self.operations = count
+        return count
+
+    def _open(self):
+        """Ouvre le journal en ajout ; complète la dernière ligne si elle n'est pas terminée."""
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, op: dict):
+        line = json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            self.operations += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._fsync()
+
+    def _fsync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Force l'écriture sur disque des opérations en attente."""
+        with self._lock:
+            self._fsync()
+
+    def reset(self):
+        """Vide le journal une fois son contenu intégré dans un instantané."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.operations = 0
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            self._fsync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,299 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Set
+
+import requests
+
+from config import MIRROR_FILE, MIRROR_FULL_REFRESH_INTERVAL
+from utils.file import ensure_directory
+
+SECTIONS = ("books", "chapters", "pages")
+COLUMNS = ("id", "book_id", "chapter_id", "name", "slug", "description", "updated_at")
+
+# Préfixe des événements webhook BookStack -> section du miroir
+EVENT_SECTIONS = {"book": "books", "chapter": "chapters", "page": "pages"}
+
+
+def _filter_timestamp(value: str) -> str:
+    """'2024-01-02T10:00:00.000000Z' -> '2024-01-02 10:00:00' (format accepté par filter[updated_at:gte])."""
+    return value[:19].replace("T", " ")
+
+
+class BookStackMirror:
+    """Copie locale (SQLite sous DB_DIR) des métadonnées des livres, chapitres et pages.
+
+    Seuls les identifiants, parents, noms, slugs, descriptions et updated_at sont conservés :
+    les corps de page restent lus à la demande. Le rafraîchissement est incrémental (filtre
+    updated_at >= dernier filigrane) ; un parcours complet périodique retire les éléments
+    supprimés que les événements webhook n'auraient pas signalés. Un élément absent est lu
+    une fois dans BookStack puis conservé.
+    """
+
+    def __init__(
+        self,
+        path: str = MIRROR_FILE,
+        book_api=None,
+        chapter_api=None,
+        page_api=None,
+        full_refresh_interval: float = MIRROR_FULL_REFRESH_INTERVAL
+    ):
+        self.path = path
+        self.full_refresh_interval = full_refresh_interval
+        self.logger = logging.getLogger(__name__)
+        if book_api is None or chapter_api is None or page_api is None:
+            from api.books import BookStackBooksAPI
+            from api.chapters import BookStackChaptersAPI
+            from api.pages import BookStackPagesAPI
+            book_api = book_api or BookStackBooksAPI()
+            chapter_api = chapter_api or BookStackChaptersAPI()
+            page_api = page_api or BookStackPagesAPI()
+        self.book_api = book_api
+        self.chapter_api = chapter_api
+        self.page_api = page_api
+        self._lock = threading.RLock()
+        # Un seul rafraîchissement à la fois ; _lock n'est tenu que pour les écritures SQLite
+        self._refresh_lock = threading.Lock()
+        # Éléments modifiés par upsert/delete pendant le parcours distant en cours :
+        # section -> identifiants ; les données du parcours, plus anciennes, ne les écrasent pas
+        self._touched: Optional[Dict[str, Set[int]]] = None
+        if path != ":memory:":
+            ensure_directory(os.path.dirname(path))
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            " section TEXT NOT NULL,"
+            " id INTEGER NOT NULL,"
+            " book_id INTEGER,"
+            " chapter_id INTEGER,"
+            " name TEXT,"
+            " slug TEXT,"
+            " description TEXT,"
+            " updated_at TEXT,"
+            " PRIMARY KEY (section, id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entities_book ON entities (section, book_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entities_chapter ON entities (section, chapter_id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks (section TEXT PRIMARY KEY, updated_at TEXT, full_refresh_at REAL)"
+        )
+        self._db.commit()
+
+    # ---- LISTINGS ----
+
+    def _iter_remote(self, section: str, filters: Optional[dict] = None) -> Iterator[dict]:
+        if section == "books":
+            return self.book_api.iter_books(filters=filters, strict=True)
+        if section == "chapters":
+            return self.chapter_api.iter_chapters(filters=filters, strict=True)
+        return self.page_api.iter_pages(filters=filters, strict=True)
+
+    def _fetch_remote(self, section: str, item_id) -> Optional[dict]:
+        if section == "books":
+            return self.book_api.get_book(item_id)
+        if section == "chapters":
+            return self.chapter_api.get_chapter(item_id)
+        return self.page_api.get_page(item_id)
+
+    # ---- WRITES ----
+
+    @staticmethod
+    def _row(section: str, item: dict) -> tuple:
+        return (
+            section,
+            int(item["id"]),
+            item.get("book_id") if section != "books" else None,
+            (item.get("chapter_id") or None) if section == "pages" else None,
+            item.get("name"),
+            item.get("slug"),
+            item.get("description") if section != "pages" else None,
+            item.get("updated_at")
+        )
+
+    def _touch(self, section: str, item_id: int):
+        if self._touched is not None:
+            self._touched[section].add(item_id)
+
+    def upsert(self, section: str, item: dict):
+        """Enregistre (ou remplace) les métadonnées d'un élément ; les champs inconnus sont ignorés."""
+        if not item or item.get("id") is None:
+            return
+        with self._lock:
+            self._touch(section, int(item["id"]))
+            self._db.execute("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._row(section, item))
+            self._db.commit()
+
+    def delete(self, section: str, item_id):
+        with self._lock:
+            self._touch(section, int(item_id))
+            self._db.execute("DELETE FROM entities WHERE section = ? AND id = ?", (section, int(item_id)))
+            if section == "books":
+                self._db.execute("DELETE FROM entities WHERE section IN ('chapters', 'pages') AND book_id = ?",
+                                 (int(item_id),))
+            elif section == "chapters":
+                self._db.execute("DELETE FROM entities WHERE section = 'pages' AND chapter_id = ?", (int(item_id),))
+            self._db.commit()
+
+    def apply_event(self, event: str, item: dict) -> bool:
+        """Applique un événement webhook (page_update, chapter_delete, ...) ; True s'il concerne le miroir."""
+        kind, _, action = (event or "").partition("_")
+        section = EVENT_SECTIONS.get(kind)
+        if section is None or not item or item.get("id") is None:
+            return False
+        if action == "delete":
+            self.delete(section, item["id"])
+        else:
+            self.upsert(section, item)
+        return True
+
+    # ---- REFRESH ----
+
+    def _watermark(self, section: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT updated_at, full_refresh_at FROM watermarks WHERE section = ?", (section,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def refresh(self, full: Optional[bool] = None) -> Dict[str, int]:
+        """Rafraîchit le miroir ; retourne le nombre d'éléments reçus par section.
+
+        full=None : parcours complet si jamais fait ou plus ancien que full_refresh_interval,
+        sinon seuls les éléments modifiés depuis le dernier filigrane sont demandés.
+        Le parcours distant se fait sans verrou : lectures et événements webhook ne sont
+        bloqués que le temps des écritures SQLite.
+        """
+        counts = {}
+        with self._refresh_lock:
+            for section in SECTIONS:
+                watermark, full_refresh_at = self._watermark(section)
+                section_full = full
+                if section_full is None:
+                    section_full = (
+                        watermark is None or full_refresh_at is None
+                        or time.time() - full_refresh_at >= self.full_refresh_interval
+                    )
+                try:
+                    counts[section] = self._refresh_section(section, watermark, section_full)
+                except requests.RequestException as e:
+                    # Miroir conservé tel quel : un listing incomplet ne doit rien supprimer
+                    self.logger.error(f"[MIRROR] Rafraîchissement de {section} interrompu : {e}")
+                    counts[section] = 0
+        return counts
+
+    def _refresh_section(self, section: str, watermark: Optional[str], full: bool) -> int:
+        filters = None if full or not watermark else {"updated_at:gte": _filter_timestamp(watermark)}
+        with self._lock:
+            self._touched = {name: set() for name in SECTIONS}
+        try:
+            rows, seen = [], set()
+            latest = watermark
+            for item in self._iter_remote(section, filters):
+                rows.append(self._row(section, item))
+                seen.add(int(item["id"]))
+                if item.get("updated_at") and (latest is None or item["updated_at"] > latest):
+                    latest = item["updated_at"]
+        except Exception:
+            with self._lock:
+                self._touched = None
+            raise
+
+        with self._lock:
+            touched, self._touched = self._touched, None
+            # Un événement reçu pendant le parcours est plus récent que le listing :
+            # l'élément (ou le contenu d'un livre ou chapitre supprimé) n'est pas réécrit
+            deleted_books, deleted_chapters = touched["books"], touched["chapters"]
+            fresh = [
+                row for row in rows
+                if row[1] not in touched[section]
+                and row[2] not in deleted_books and row[3] not in deleted_chapters
+            ]
+            self._db.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?)", fresh)
+            removed = 0
+            if full:
+                stale = [
+                    (section, item_id)
+                    for (item_id,) in self._db.execute("SELECT id FROM entities WHERE section = ?", (section,))
+                    if item_id not in seen and item_id not in touched[section]
+                ]
+                self._db.executemany("DELETE FROM entities WHERE section = ? AND id = ?", stale)
+                removed = len(stale)
+            self._db.execute(
+                "INSERT INTO watermarks (section, updated_at, full_refresh_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(section) DO UPDATE SET updated_at = excluded.updated_at,"
+                " full_refresh_at = COALESCE(excluded.full_refresh_at, watermarks.full_refresh_at)",
+                (section, latest, time.time() if full else None)
+            )
+            self._db.commit()
+        self.logger.info(
+            f"[MIRROR] {section} : {len(rows)} reçus, {removed} supprimés ({'complet' if full else 'incrémental'})."
+        )
+        return len(rows)
+
+    # ---- READS ----
+
+    @staticmethod
+    def _as_dict(row) -> dict:
+        return {key: value for key, value in zip(COLUMNS, row) if value is not None}
+
+    def _select(self, section: str, where: str = "", params: tuple = ()) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM entities WHERE section = ?{where} ORDER BY id",
+                (section,) + params
+            ).fetchall()
+        return [self._as_dict(row) for row in rows]
+
+    def get(self, section: str, item_id, fetch: bool = True) -> Optional[dict]:
+        """Métadonnées d'un élément ; lues dans BookStack (puis conservées) s'il est inconnu."""
+        try:
+            item_id = int(item_id)
+        except (TypeError, ValueError):
+            return None
+        found = self._select(section, " AND id = ?", (item_id,))
+        if found:
+            return found[0]
+        if not fetch:
+            return None
+        item = self._fetch_remote(section, item_id)
+        if not item:
+            return None
+        self.upsert(section, item)
+        return self._as_dict(self._row(section, item)[1:])
+
+    def get_book(self, book_id, fetch: bool = True) -> Optional[dict]:
+        return self.get("books", book_id, fetch)
+
+    def get_chapter(self, chapter_id, fetch: bool = True) -> Optional[dict]:
+        return self.get("chapters", chapter_id, fetch)
+
+    def get_page(self, page_id, fetch: bool = True) -> Optional[dict]:
+        return self.get("pages", page_id, fetch)
+
+    def list_books(self) -> List[dict]:
+        return self._select("books")
+
+    def list_chapters(self, book_id=None) -> List[dict]:
+        if book_id is None:
+            return self._select("chapters")
+        return self._select("chapters", " AND book_id = ?", (int(book_id),))
+
+    def list_pages(self, book_id=None, chapter_id=None) -> List[dict]:
+        if chapter_id:
+            return self._select("pages", " AND chapter_id = ?", (int(chapter_id),))
+        if book_id is not None:
+            return self._select("pages", " AND book_id = ?", (int(book_id),))
+        return self._select("pages")
+
+    def ids(self, section: str) -> Set[str]:
+        """Identifiants (chaînes, comme les clés du mapping) présents dans le miroir."""
+        with self._lock:
+            return {str(row[0]) for row in self._db.execute("SELECT id FROM entities WHERE section = ?", (section,))}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,81 +1,74 @@
 import logging
-import requests
-from config import BOOKSTACK_API_BASE, BOOKSTACK_HEADERS
+from api.client import BookStackBaseAPI
 
-class BookStackPagesAPI:
+class BookStackPagesAPI(BookStackBaseAPI):
     """Gestion des pages BookStack (CRUD, recherche, etc.)"""
     
-    def list_pages(self, book_id=None, chapter_id=None):
-        """Liste les pages en fonction du livre ou du chapitre."""
+    def iter_pages(self, book_id=None, chapter_id=None, filters=None, fields=None, strict=False):
+        """Parcourt les pages d'un livre ou d'un chapitre (filtres appliqués côté serveur)."""
+        filters = dict(filters or {})
         if chapter_id:
-            resp = requests.get(f"{BOOKSTACK_API_BASE}/chapters/{chapter_id}/pages?count=1000", headers=BOOKSTACK_HEADERS)
+            filters["chapter_id"] = chapter_id
         elif book_id:
-            resp = requests.get(f"{BOOKSTACK_API_BASE}/books/{book_id}/pages?count=1000", headers=BOOKSTACK_HEADERS)
-        else:
-            resp = requests.get(f"{BOOKSTACK_API_BASE}/pages?count=1000", headers=BOOKSTACK_HEADERS)
-        
-        if resp.status_code == 200:
-            return resp.json().get('data', [])
-        return []
+            filters["book_id"] = book_id
+        return self._paginate("pages", filters=filters, fields=fields, strict=strict)
+
+    def list_pages(self, book_id=None, chapter_id=None, filters=None, fields=None):
+        """Liste les pages en fonction du livre ou du chapitre."""
+        return list(self.iter_pages(book_id, chapter_id, filters, fields))
 
     def get_page(self, page_id):
         """Récupère les informations d'une page spécifique."""
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/pages/{page_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._get(f"pages/{page_id}")
         if resp.status_code == 200:
             return resp.json()
         return None
 
     def get_book(self, book_id):
         """Vérifie si un livre avec l'ID donné existe."""
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/books/{book_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._get(f"books/{book_id}")
         if resp.status_code == 200:
             return resp.json()
         return None
 
     def get_chapter(self, chapter_id):
         """Vérifie si un chapitre avec l'ID donné existe."""
-        resp = requests.get(f"{BOOKSTACK_API_BASE}/chapters/{chapter_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._get(f"chapters/{chapter_id}")
         if resp.status_code == 200:
             return resp.json()
         return None
 
-    def create_page(self, book_id, chapter_id, name, html, lang, source_page_id):
-        existing_id = self.mapping.get_page(source_page_id, lang)
-        if existing_id:
-            logging.warning(f"[PAGES] Tentative de recreer une page existante (ID {existing_id}) pour {lang}")
-            return None
-        payload = {
-        "book_id": book_id,
-        "chapter_id": chapter_id,
-        "name": name,
-        "html": html,
-        "source_page_id": source_page_id,
-    }
-        response = requests.post(
-        f"{self.api_base}/pages",
-        headers=self.headers,
-        json=payload
-    )
-        response.raise_for_status()
-        return response.json()
-
-
-    def update_page(self, page_id, name, html, lang):
-        payload = {
-        "name": name,
-        "html": html
-    }
-        response = requests.put(
-        f"{self.api_base}/pages/{page_id}",
-        headers=self.headers,
-        json=payload
-    )
-        response.raise_for_status()
-        return response.json()
-
+    def create_page(self, book_id, chapter_id, name, html, lang=None, source_page_id=None):
+        """Crée une page dans un chapitre (ou directement dans le livre)."""
+        payload = {"name": name, "html": html}
+        if chapter_id:
+            payload["chapter_id"] = chapter_id
+        else:
+            payload["book_id"] = book_id
+        resp = self._post("pages", json=payload)
+        if resp.status_code in (200, 201):
+            return resp.json()
+        logging.error(f"[PAGES] Erreur création page ({lang}, source {source_page_id}) : {resp.status_code} - {resp.text}")
+        return None
 
+    def update_page(self, page_id, name=None, html=None, lang=None, book_id=None, chapter_id=None):
+        """Met à jour le nom et/ou le contenu d'une page (et la déplace si besoin)."""
+        payload = {}
+        if name is not None:
+            payload["name"] = name
+        if html is not None:
+            payload["html"] = html
+        if chapter_id:
+            payload["chapter_id"] = chapter_id
+        elif book_id:
+            payload["book_id"] = book_id
+        resp = self._put(f"pages/{page_id}", json=payload)
+        if resp.status_code == 200:
+            return resp.json()
+        logging.error(f"[PAGES] Erreur mise à jour page {page_id} ({lang}) : {resp.status_code} - {resp.text}")
+        return None
 
     def delete_page(self, page_id):
         """Supprime une page spécifique."""
-        resp = requests.delete(f"{BOOKSTACK_API_BASE}/pages/{page_id}", headers=BOOKSTACK_HEADERS)
+        resp = self._delete(f"pages/{page_id}")
         return resp.status_code == 204
@@ -0,0 +1,144 @@
+import math
+import logging
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+
+def normalize_title(title: str) -> str:
+    return " ".join((title or "").lower().split())
+
+
+def char_ngrams(text: str, n: int = 3) -> Dict[str, int]:
+    """Fréquences des n-grammes de caractères d'un titre normalisé (bords compris)."""
+    padded = f" {text} "
+    counts = defaultdict(int)
+    for i in range(max(1, len(padded) - n + 1)):
+        counts[padded[i:i + n]] += 1
+    return counts
+
+
+class TitleMatcher:
+    """Appariement de titres traduits sans comparer toutes les paires.
+
+    Chaque titre est traduit une seule fois par langue (cache + lots), puis les candidats sont
+    trouvés via un index des titres normalisés et un index inversé de n-grammes pondérés TF-IDF.
+    Seuls les meilleurs candidats (cosinus) sont vérifiés avec SequenceMatcher.
+    """
+
+    def __init__(self, translation_service, ngram: int = 3, top_k: int = 3, min_cosine: float = 0.5):
+        self.translation_service = translation_service
+        self.ngram = ngram
+        self.top_k = top_k
+        self.min_cosine = min_cosine
+        self._translations = {}
+        self._max_idf = 1.0
+        self.logger = logging.getLogger(__name__)
+
+    def translate_titles(self, titles: List[str], lang: str) -> Dict[str, str]:
+        """Traduit chaque titre distinct une seule fois pour la langue donnée."""
+        missing = [t for t in dict.fromkeys(titles) if t and (lang, t) not in self._translations]
+        if missing:
+            try:
+                translated = self.translation_service.batch_translate_texts(missing, lang)
+            except Exception as e:
+                self.logger.warning(f"Traduction des titres échouée -> {lang} : {e}")
+                translated = missing
+            for title, result in zip(missing, translated):
+                self._translations[(lang, title)] = result
+        return {t: self._translations.get((lang, t), t) for t in titles}
+
+    def _vector(self, text: str, idf: Dict[str, float]) -> Dict[str, float]:
+        weights = {g: c * idf.get(g, self._max_idf) for g, c in char_ngrams(text, self.ngram).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {g: w / norm for g, w in weights.items()}
+
+    def match(self, source_dict: dict, langs: List[str], threshold: float = 0.8) -> int:
+        """Renseigne les traductions de source_dict ; retourne le nombre de liens ajoutés.
+
+        Comme l'algorithme historique, un titre ne peut être rattaché qu'à un élément situé
+        après lui, d'un autre livre, et une paire n'est liée que pour une seule langue.
+        """
+        items = list(source_dict.items())
+        titles = [data.get("title") or "" for _, data in items]
+        normalized = [normalize_title(t) for t in titles]
+
+        # Index des titres normalisés et index inversé des n-grammes
+        by_title = defaultdict(list)
+        grams = [char_ngrams(t, self.ngram) for t in normalized]
+        df = defaultdict(int)
+        for pos, (title, counts) in enumerate(zip(normalized, grams)):
+            by_title[title].append(pos)
+            for gram in counts:
+                df[gram] += 1
+        n = len(items) or 1
+        idf = {g: math.log((1 + n) / (1 + d)) + 1 for g, d in df.items()}
+        self._max_idf = math.log(1 + n) + 1
+        vectors = [self._vector(t, idf) for t in normalized]
+        postings = defaultdict(list)
+        for pos, vector in enumerate(vectors):
+            for gram, weight in vector.items():
+                postings[gram].append((pos, weight))
+        # Les n-grammes trop fréquents ne servent pas à générer des candidats
+        max_df = max(50, n // 20)
+
+        added = 0
+        used = defaultdict(set)
+        for lang in langs:
+            translated = self.translate_titles(titles, lang)
+            for i, (src_id, src_data) in enumerate(items):
+                if not titles[i] or src_data.get("translations", {}).get(lang):
+                    continue
+                best = self._best_candidate(i, normalize_title(translated[titles[i]]), items, normalized,
+                                            by_title, vectors, postings, idf, max_df, used[i], threshold)
+                if best is not None:
+                    src_data.setdefault("translations", {})[lang] = int(items[best][0])
+                    used[i].add(best)
+                    added += 1
+        return added
+
+    def _best_candidate(self, i, query, items, normalized, by_title, vectors, postings, idf, max_df, used, threshold):
+        src_data = items[i][1]
+
+        def allowed(j):
+            tgt_data = items[j][1]
+            return j > i and j not in used and not (
+                "book_id" in src_data and "book_id" in tgt_data
+                and src_data.get("book_id") == tgt_data.get("book_id")
+            )
+
+        exact = [j for j in by_title.get(query, ()) if allowed(j)]
+        if exact:
+            return exact[0]
+
+        query_vector = self._vector(query, idf)
+        # Produit creux requête × index (équivalent d'une ligne de matrice creuse) sur les n-grammes
+        # discriminants ; la masse des n-grammes fréquents ignorés borne l'erreur du score partiel.
+        partial = defaultdict(float)
+        skipped = 0.0
+        for gram, weight in query_vector.items():
+            posting = postings.get(gram, ())
+            if len(posting) > max_df:
+                skipped += weight
+                continue
+            for j, w in posting:
+                partial[j] += weight * w
+        if not partial:
+            # Titre composé uniquement de n-grammes fréquents : on se rabat sur les plus rares
+            for gram in sorted(query_vector, key=lambda g: len(postings.get(g, ())))[:3]:
+                for j, _ in postings.get(gram, ()):
+                    partial[j] += 0.0
+        scored = []
+        for j, score in partial.items():
+            if score + skipped < self.min_cosine or not allowed(j):
+                continue
+            if skipped:
+                vector = vectors[j]
+                score = sum(w * vector.get(g, 0.0) for g, w in query_vector.items())
+            if score >= self.min_cosine:
+                scored.append((score, j))
+        scored.sort(reverse=True)
+        for _, j in scored[:self.top_k]:
+            if SequenceMatcher(None, query, normalized[j]).ratio() >= threshold:
+                return j
+        return None
@@ -0,0 +1,86 @@
+import random
+from typing import Tuple
+
+WORDS = (
+    "le la les un une des du de et ou mais donc pour avec sans dans sur sous entre vers chez "
+    "serveur utilisateur document page chapitre livre procédure configuration sauvegarde accès "
+    "réseau sécurité application service mise jour installation étape tableau fichier dossier "
+    "compte droit équipe support question réponse données paramètre version module client "
+    "vérifier créer modifier supprimer partager consulter redémarrer installer configurer "
+    "nouveau ancien principal important nécessaire disponible automatique manuel rapide simple "
+    "chaque tous plusieurs quelques aucun autre même premier dernier suivant"
+).split()
+
+CODE_SNIPPET = "sudo systemctl restart bookstack\ncurl -s http://localhost:8080/api/pages | jq '.data[]'"
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 18) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def generate_page_html(rng: random.Random, blocks: Tuple[int, int] = (4, 16)) -> str:
+    """Corps de page BookStack réaliste : titres, paragraphes, listes, tableaux, code, ancres bkmrk."""
+    html = []
+    for i in range(rng.randint(*blocks)):
+        anchor = f"bkmrk-{rng.getrandbits(32):08x}"
+        kind = rng.random()
+        if kind < 0.15:
+            level = rng.choice((2, 3))
+            html.append(f'<h{level} id="{anchor}">{_sentence(rng, 2, 5)[:-1]}</h{level}>')
+        elif kind < 0.3:
+            items = "".join(f"<li>{_sentence(rng, 3, 9)}</li>" for _ in range(rng.randint(2, 6)))
+            html.append(f'<ul id="{anchor}">{items}</ul>')
+        elif kind < 0.38:
+            rows = "".join(
+                f"<tr><td>{rng.choice(WORDS)}</td><td>{_sentence(rng, 2, 6)}</td></tr>" for _ in range(rng.randint(2, 5))
+            )
+            html.append(f'<table id="{anchor}"><tbody>{rows}</tbody></table>')
+        elif kind < 0.43:
+            html.append(f'<pre id="{anchor}"><code>{CODE_SNIPPET}</code></pre>')
+        else:
+            html.append(f'<p id="{anchor}">{_paragraph(rng)} <strong>{rng.choice(WORDS)}</strong> {_sentence(rng)}</p>')
+    return "\n".join(html)
+
+
+def populate(
+    bookstack,
+    books: int = 2,
+    chapters_per_book: int = 3,
+    pages_per_chapter: int = 4,
+    loose_pages_per_book: int = 1,
+    seed: int = 42
+) -> dict:
+    """Remplit un FakeBookStack avec un corpus déterministe ; retourne les ids créés par type."""
+    rng = random.Random(seed)
+    created = {"books": [], "chapters": [], "pages": []}
+    for _ in range(books):
+        book = bookstack.add("books", {"name": _sentence(rng, 2, 4)[:-1], "description": _sentence(rng)})
+        created["books"].append(book["id"])
+        for _ in range(chapters_per_book):
+            chapter = bookstack.add("chapters", {"book_id": book["id"], "name": _sentence(rng, 2, 5)[:-1]})
+            created["chapters"].append(chapter["id"])
+            for _ in range(pages_per_chapter):
+                page = bookstack.add("pages", {
+                    "book_id": book["id"], "chapter_id": chapter["id"],
+                    "name": _sentence(rng, 2, 6)[:-1], "html": generate_page_html(rng)
+                })
+                created["pages"].append(page["id"])
+        for _ in range(loose_pages_per_book):
+            page = bookstack.add("pages", {
+                "book_id": book["id"], "chapter_id": 0,
+                "name": _sentence(rng, 2, 6)[:-1], "html": generate_page_html(rng)
+            })
+            created["pages"].append(page["id"])
+    return created
+
+
+def edit_page(bookstack, page_id: int, seed: int = 0):
+    """Simule une modification éditoriale : un paragraphe ajouté en fin de page."""
+    rng = random.Random(seed)
+    page = bookstack.items["pages"][page_id]
+    bookstack.touch("pages", page_id, html=page["html"] + f"\n<p>{_paragraph(rng)}</p>")
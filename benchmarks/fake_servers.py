@@ -0,0 +1,310 @@
+import json
+import time
+import random
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class Behaviour:
+    """Comportement injecté dans un faux serveur : latence, erreurs et limitation de débit.
+
+    latency : délai fixe par requête (s) ; jitter : délai aléatoire ajouté (0..jitter) ;
+    per_kb : délai supplémentaire par Ko de corps de requête ; error_rate : probabilité de
+    répondre 503 ; rate_limit : requêtes par seconde au-delà desquelles le serveur répond 429 ;
+    capacity : requêtes traitées simultanément (les suivantes attendent), illimité si None.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        per_kb: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        seed: int = 0,
+        capacity: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kb = per_kb
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit or 0.0
+        self._refilled = time.monotonic()
+        self._slots = threading.Semaphore(capacity) if capacity else None
+
+    @contextmanager
+    def slot(self):
+        """Place de traitement : simule un serveur aux workers limités."""
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def delay(self, body_size: int) -> float:
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + jitter + self.per_kb * body_size / 1024
+
+    def fails(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def throttled(self) -> bool:
+        """Seau à jetons : vrai si la requête dépasse rate_limit."""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+
+class ServerStats:
+    """Compteurs d'un faux serveur : requêtes par endpoint et statut, octets, durées."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = defaultdict(int)
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.durations = []
+
+    def record(self, endpoint: str, status: int, bytes_in: int, bytes_out: int, duration: float):
+        with self._lock:
+            self.calls[f"{endpoint} {status}"] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.durations.append(duration)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "total_calls": sum(self.calls.values()),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "durations": list(self.durations)
+            }
+
+
+def merge_snapshots(snapshots: List[dict]) -> dict:
+    """Agrège les statistiques de plusieurs serveurs (pool LibreTranslate)."""
+    calls = Counter()
+    for snapshot in snapshots:
+        calls.update(snapshot["calls"])
+    return {
+        "calls": dict(calls),
+        "total_calls": sum(calls.values()),
+        "bytes_in": sum(s["bytes_in"] for s in snapshots),
+        "bytes_out": sum(s["bytes_out"] for s in snapshots),
+        "durations": [d for s in snapshots for d in s["durations"]]
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        start = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        fake = self.server.fake
+        parts = urlsplit(self.path)
+        endpoint = fake.endpoint(self.command, parts.path)
+
+        with fake.behaviour.slot():
+            time.sleep(fake.behaviour.delay(len(raw)))
+            if fake.behaviour.throttled():
+                status, data, headers = 429, {"error": "Too many requests"}, {"Retry-After": "1"}
+            elif fake.behaviour.fails():
+                status, data, headers = 503, {"error": "Service unavailable"}, {}
+            else:
+                try:
+                    body = json.loads(raw) if raw else {}
+                    status, data = fake.handle(self.command, parts.path, dict(parse_qsl(parts.query)), body)
+                except Exception as e:
+                    status, data = 500, {"error": str(e)}
+                headers = {}
+
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8") if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        fake.stats.record(endpoint, status, len(raw), len(payload), time.perf_counter() - start)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class FakeServer:
+    """Serveur HTTP local (port libre, thread dédié) déléguant à handle()."""
+
+    def __init__(self, behaviour: Optional[Behaviour] = None):
+        self.behaviour = behaviour or Behaviour()
+        self.stats = ServerStats()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def endpoint(self, method: str, path: str) -> str:
+        return f"{method} {'/'.join('{id}' if part.isdigit() else part for part in path.split('/'))}"
+
+    def handle(self, method: str, path: str, query: dict, body: dict):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeBookStack(FakeServer):
+    """Sous-ensemble de l'API BookStack : listings paginés et filtrés, lecture, création, mise à jour."""
+
+    SECTIONS = ("books", "chapters", "pages")
+
+    def __init__(self, behaviour: Optional[Behaviour] = None):
+        super().__init__(behaviour)
+        self.items = {section: {} for section in self.SECTIONS}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add(self, section: str, item: dict) -> dict:
+        with self._lock:
+            item = dict(item)
+            item.setdefault("id", self._next_id)
+            self._next_id = max(self._next_id, item["id"]) + 1
+            if section == "pages" and item.get("chapter_id"):
+                item["book_id"] = self.items["chapters"][item["chapter_id"]]["book_id"]
+            item.setdefault("slug", "-".join(str(item.get("name", "")).lower().split())[:60])
+            item.setdefault("created_at", _now())
+            item["updated_at"] = _now()
+            self.items[section][item["id"]] = item
+            return item
+
+    def touch(self, section: str, item_id: int, **fields) -> dict:
+        """Modifie un élément comme le ferait un éditeur (updated_at avancé)."""
+        with self._lock:
+            item = self.items[section][item_id]
+            item.update(fields)
+            item["updated_at"] = _now()
+            return item
+
+    @staticmethod
+    def _summary(section: str, item: dict) -> dict:
+        # Les listings BookStack ne renvoient pas le corps des pages
+        return {k: v for k, v in item.items() if k != "html"} if section == "pages" else dict(item)
+
+    def _list(self, section: str, query: dict):
+        items = list(self.items[section].values())
+        for key, value in query.items():
+            if not key.startswith("filter["):
+                continue
+            field, _, op = key[len("filter["):-1].partition(":")
+            if field == "updated_at":
+                items = [i for i in items if i["updated_at"][:19].replace("T", " ") >= value]
+            else:
+                items = [i for i in items if str(i.get(field)) == value]
+        sort = query.get("sort", "+id")
+        items.sort(key=lambda i: i.get(sort.lstrip("+-")) or 0, reverse=sort.startswith("-"))
+        offset, count = int(query.get("offset", 0)), int(query.get("count", 100))
+        return {"data": [self._summary(section, i) for i in items[offset:offset + count]], "total": len(items)}
+
+    def handle(self, method, path, query, body):
+        parts = [p for p in path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "api" or parts[1] not in self.SECTIONS:
+            return 404, {"error": "Not found"}
+        section = parts[1]
+        if len(parts) == 2:
+            if method == "GET":
+                with self._lock:
+                    return 200, self._list(section, query)
+            if method == "POST":
+                return 200, self.add(section, body)
+            return 405, {"error": "Method not allowed"}
+
+        item_id = int(parts[2])
+        if item_id not in self.items[section]:
+            return 404, {"error": "Not found"}
+        if method == "GET":
+            return 200, dict(self.items[section][item_id])
+        if method == "PUT":
+            return 200, dict(self.touch(section, item_id, **body))
+        if method == "DELETE":
+            with self._lock:
+                del self.items[section][item_id]
+            return 204, None
+        return 405, {"error": "Method not allowed"}
+
+
+class FakeLibreTranslate(FakeServer):
+    """LibreTranslate factice : /translate (texte ou liste), /detect et /languages.
+
+    La traduction préfixe chaque segment par la langue cible, ce qui conserve sa taille.
+    """
+
+    def __init__(self, behaviour: Optional[Behaviour] = None, detected_lang: str = "fr"):
+        super().__init__(behaviour)
+        self.detected_lang = detected_lang
+
+    def handle(self, method, path, query, body):
+        if method == "GET" and path.rstrip("/").endswith("/languages"):
+            return 200, [{"code": code, "name": code, "targets": []} for code in ("fr", "en", "de", "es")]
+        if method != "POST":
+            return 405, {"error": "Method not allowed"}
+        if path.rstrip("/").endswith("/detect"):
+            return 200, [{"language": self.detected_lang, "confidence": 90.0}]
+        if path.rstrip("/").endswith("/translate"):
+            q, target = body.get("q"), body.get("target")
+            if isinstance(q, list):
+                return 200, {"translatedText": [f"[{target}] {text}" for text in q]}
+            return 200, {"translatedText": f"[{target}] {q}"}
+        return 404, {"error": "Not found"}
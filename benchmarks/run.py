@@ -0,0 +1,358 @@
+"""Banc d'essai de bout en bout contre des BookStack / LibreTranslate factices.
+
+    python -m benchmarks.run --scenario all --output benchmarks/results.json
+    python -m benchmarks.run --baseline benchmarks/results.json   # code 1 si régression
+
+Chaque scénario repart d'un corpus identique (graine fixe) ; le résultat JSON contient le
+commit courant pour comparer les exécutions.
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from api.client import HTTPClient
+from api.books import BookStackBooksAPI
+from api.chapters import BookStackChaptersAPI
+from api.pages import BookStackPagesAPI
+from api.mirror import BookStackMirror
+from api.mapping import MappingManager
+from translation.memory import TranslationMemory
+from translation.translate import TranslationService
+from translation.sync import SyncManager
+from translation.retry_queue import RetryQueue
+from translation.checkpoint import SyncCheckpoint
+from translation.context import SyncContext, set_context
+from benchmarks.fake_servers import Behaviour, FakeBookStack, FakeLibreTranslate, merge_snapshots
+from benchmarks.corpus import populate, edit_page
+
+SCENARIOS = ("sync_book", "sync_page", "clean_mapping", "webhook")
+
+# Métriques comparées avec --baseline : (chemin, sens de l'amélioration)
+TRACKED = (
+    (("pages_per_min",), "higher"),
+    (("http_calls_per_page",), "lower"),
+    (("bytes_per_page",), "lower"),
+    (("latency_ms", "page", "p95"), "lower"),
+)
+
+
+def percentiles(values: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """p50 / p95 / p99 (rang le plus proche), en millisecondes par défaut."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1] * scale
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99), "max": ordered[-1] * scale}
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Harness:
+    """Faux serveurs + corpus + services câblés sur eux, dans un répertoire temporaire."""
+
+    def __init__(self, args):
+        self.args = args
+        self.langs = args.langs.split(",")
+        self.workdir = tempfile.mkdtemp(prefix="bench-")
+        self.bookstack = FakeBookStack(Behaviour(
+            args.bookstack_latency, args.jitter, 0.0, args.error_rate, args.rate_limit, args.seed
+        )).start()
+        self.translators = [
+            FakeLibreTranslate(Behaviour(
+                args.translate_latency, args.jitter, args.translate_per_kb, args.error_rate, args.rate_limit,
+                args.seed + 1 + i, args.translate_capacity
+            )).start()
+            for i in range(max(1, args.translate_backends))
+        ]
+        self.corpus = populate(
+            self.bookstack, args.books, args.chapters, args.pages, args.loose_pages, args.seed
+        )
+        self.source_pages = list(self.corpus["pages"])
+        self.services = self._build_services()
+        self.page_times = []
+        self._wrap_sync_page()
+
+    def _build_services(self) -> dict:
+        client = HTTPClient()
+        api_base = f"{self.bookstack.url}/api"
+        book_api = BookStackBooksAPI(client=client, api_base=api_base)
+        chapter_api = BookStackChaptersAPI(client=client, api_base=api_base)
+        page_api = BookStackPagesAPI(client=client, api_base=api_base)
+        # Mémoire de traduction et miroir propres au banc d'essai : rien n'est écrit dans DB_DIR
+        memory = TranslationMemory(path=None)
+        translator = TranslationService(
+            api_url=[f"{server.url}/translate" for server in self.translators], memory=memory, http_client=client
+        )
+        mirror = BookStackMirror(os.path.join(self.workdir, "mirror.sqlite3"), book_api, chapter_api, page_api)
+        mapping = MappingManager(
+            os.path.join(self.workdir, "mapping.json"), book_api, chapter_api, page_api, translator, mirror
+        )
+        sync = SyncManager(
+            translator, mapping, book_api, chapter_api, page_api,
+            report_path=os.path.join(self.workdir, "last_report.json"), mirror=mirror,
+            perf_report_path=os.path.join(self.workdir, "perf_report.jsonl"),
+            retry_queue=RetryQueue(os.path.join(self.workdir, "retry_queue.sqlite3")),
+            checkpoint=SyncCheckpoint(os.path.join(self.workdir, "sync_checkpoints.sqlite3"))
+        )
+        return {
+            "http_client": client, "translation_memory": memory, "translator": translator, "book_api": book_api,
+            "chapter_api": chapter_api, "page_api": page_api, "mirror": mirror, "mapping": mapping, "sync_manager": sync
+        }
+
+    def _wrap_sync_page(self):
+        sync = self.services["sync_manager"]
+        original = sync.sync_page
+
+        def timed_sync_page(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.page_times.append(time.perf_counter() - start)
+
+        sync.sync_page = timed_sync_page
+
+    def sync_all_books(self):
+        for book_id in self.corpus["books"]:
+            self.services["sync_manager"].sync_book(book_id, self.langs)
+
+    def edit_pages(self) -> List[int]:
+        count = max(1, int(len(self.source_pages) * self.args.edit_ratio))
+        edited = self.source_pages[:count]
+        for i, page_id in enumerate(edited):
+            edit_page(self.bookstack, page_id, seed=self.args.seed + i)
+        return edited
+
+    def measure(self, name: str, func) -> dict:
+        """Exécute func() (qui retourne le nombre de pages traitées) et agrège les métriques."""
+        for server in [self.bookstack] + self.translators:
+            server.stats.reset()
+        self.page_times = []
+        start = time.perf_counter()
+        pages, extra = func()
+        wall = time.perf_counter() - start
+        bookstack = self.bookstack.stats.snapshot()
+        translate = merge_snapshots([server.stats.snapshot() for server in self.translators])
+        calls = bookstack["total_calls"] + translate["total_calls"]
+        moved = sum(s["bytes_in"] + s["bytes_out"] for s in (bookstack, translate))
+        errors = sum(n for s in (bookstack, translate) for key, n in s["calls"].items() if int(key.rsplit(" ", 1)[1]) >= 400)
+        result = {
+            "pages": pages,
+            "wall_time_s": round(wall, 4),
+            "pages_per_min": round(pages / wall * 60, 2) if wall else 0.0,
+            "http_calls": {"bookstack": bookstack["total_calls"], "translate": translate["total_calls"], "total": calls},
+            "http_calls_per_page": round(calls / pages, 3) if pages else 0.0,
+            "http_errors": errors,
+            "bytes": {
+                "sent": bookstack["bytes_in"] + translate["bytes_in"],
+                "received": bookstack["bytes_out"] + translate["bytes_out"],
+                "total": moved
+            },
+            "bytes_per_page": round(moved / pages) if pages else 0,
+            "latency_ms": {
+                "page": percentiles(extra.pop("latencies", self.page_times)),
+                "bookstack": percentiles(bookstack["durations"]),
+                "translate": percentiles(translate["durations"])
+            },
+            "endpoints": {"bookstack": bookstack["calls"], "translate": translate["calls"]}
+        }
+        result["translate_backends"] = self.services["translator"].backend_stats()
+        result.update(extra)
+        logging.getLogger(__name__).info(f"[BENCH] {name} : {result['pages_per_min']} pages/min")
+        return result
+
+    def close(self):
+        set_context(None)
+        self.services["mapping"].journal.close()
+        self.services["mirror"].close()
+        self.services["sync_manager"].checkpoint.close()
+        self.bookstack.stop()
+        self.services["translator"].pool.close()
+        for server in self.translators:
+            server.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def scenario_sync_book(harness: Harness) -> dict:
+    """Synchronisation initiale complète de tous les livres (mapping vide)."""
+    def run():
+        harness.sync_all_books()
+        return len(harness.source_pages), {}
+    return harness.measure("sync_book", run)
+
+
+def scenario_sync_page(harness: Harness) -> dict:
+    """Resynchronisation page par page après modification d'une partie du corpus."""
+    harness.sync_all_books()
+    edited = harness.edit_pages()
+
+    def run():
+        for page_id in harness.source_pages:
+            harness.services["sync_manager"].sync_page(page_id, harness.langs)
+        harness.services["mapping"].flush()
+        return len(harness.source_pages), {"edited_pages": len(edited)}
+    return harness.measure("sync_page", run)
+
+
+def scenario_clean_mapping(harness: Harness) -> dict:
+    """Reconstruction du mapping sur une bibliothèque déjà traduite."""
+    harness.sync_all_books()
+
+    def run():
+        harness.services["mapping"].clean_mapping()
+        return len(harness.bookstack.items["pages"]), {}
+    return harness.measure("clean_mapping", run)
+
+
+def scenario_webhook(harness: Harness) -> dict:
+    """Événements page_update envoyés au serveur webhook (rafales en double) jusqu'à la file vide."""
+    import webhook.server as server
+    from webhook.jobs import JobQueue, WorkerPool
+
+    harness.sync_all_books()
+    set_context(SyncContext(harness.services["mapping"].mapping_path, services=harness.services))
+    queue = JobQueue(os.path.join(harness.workdir, "queue.sqlite3"), debounce=harness.args.debounce)
+    server.job_queue = queue
+    pool = WorkerPool(queue, server.process_job, workers=harness.args.workers, poll_interval=0.05)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.WebhookHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/webhook"
+    edited = harness.edit_pages()
+
+    def run():
+        pool.start()
+        for page_id in edited:
+            page = harness.bookstack.items["pages"][page_id]
+            event = {"event": "page_update", "related_item": {k: v for k, v in page.items() if k != "html"}}
+            for _ in range(harness.args.burst):
+                requests.post(url, json=event, timeout=10)
+        while queue.depth():
+            time.sleep(0.02)
+        return len(edited), {"latencies": queue.latencies(), "coalesced_events": queue.coalesced}
+
+    try:
+        return harness.measure("webhook", run)
+    finally:
+        pool.stop(timeout=10)
+        httpd.shutdown()
+        httpd.server_close()
+        queue.close()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Liste des métriques suivies qui se dégradent de plus de tolerance par rapport à baseline."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for path, better in TRACKED:
+            new, old = current, previous
+            for key in path:
+                new, old = new.get(key, {}), old.get(key, {})
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (new - old) / old
+            if (better == "higher" and change < -tolerance) or (better == "lower" and change > tolerance):
+                regressions.append(f"{name}.{'.'.join(path)} : {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de synchronisation BookStack / LibreTranslate.")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--books", type=int, default=2)
+    parser.add_argument("--chapters", type=int, default=3, help="chapitres par livre")
+    parser.add_argument("--pages", type=int, default=4, help="pages par chapitre")
+    parser.add_argument("--loose-pages", type=int, default=1, help="pages hors chapitre par livre")
+    parser.add_argument("--langs", default="en,de")
+    parser.add_argument("--bookstack-latency", type=float, default=0.005, help="secondes par requête")
+    parser.add_argument("--translate-latency", type=float, default=0.02, help="secondes par requête")
+    parser.add_argument("--translate-per-kb", type=float, default=0.01, help="secondes par Ko traduit")
+    parser.add_argument("--translate-backends", type=int, default=1, help="serveurs LibreTranslate du pool")
+    parser.add_argument(
+        "--translate-capacity", type=int, default=None, help="requêtes traitées simultanément par serveur"
+    )
+    parser.add_argument("--jitter", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requêtes/s avant réponse 429")
+    parser.add_argument("--edit-ratio", type=float, default=0.25, help="part des pages modifiées")
+    parser.add_argument("--burst", type=int, default=3, help="événements webhook envoyés par modification")
+    parser.add_argument("--debounce", type=float, default=0.2, help="fenêtre de calme du webhook (s)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="fichier JSON de résultats (stdout sinon)")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    results = {
+        "commit": current_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "verbose")},
+        "scenarios": {}
+    }
+    runners = {
+        "sync_book": scenario_sync_book, "sync_page": scenario_sync_page,
+        "clean_mapping": scenario_clean_mapping, "webhook": scenario_webhook
+    }
+    # Les messages print() du code synchronisé ne doivent pas se mêler au JSON sur stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in scenarios:
+            harness = Harness(args)
+            try:
+                results["scenarios"][name] = runners[name](harness)
+            finally:
+                harness.close()
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[BENCH] Régression : {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
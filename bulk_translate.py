@@ -0,0 +1,335 @@
+"""Traduction en masse, sans interaction (tâche planifiée).
+
+    python bulk_translate.py --all --langs en,de --concurrency 3
+    python bulk_translate.py 12 15 27 --langs en --force
+
+Les livres sont synchronisés en parallèle (SyncManager.sync_book), les plus gros d'abord.
+La progression (livres terminés, pages-langues, débit, caractères traduits) est écrite sur
+stderr ; un rapport unique regroupe les résultats de tous les livres (BULK_REPORT_FILE).
+Les pages reprogrammées (serveur de traduction indisponible) sont rejouées avant la fin,
+pendant au plus TRANSLATION_RETRY_DRAIN_TIMEOUT secondes.
+
+Codes de sortie : 0 tout est traduit ; 1 des pages ont échoué ou sont reprogrammées ;
+2 arguments invalides ; 3 des livres sont introuvables ou en erreur ; 130 interruption.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from config import (
+    TARGET_LANGS,
+    BULK_BOOK_CONCURRENCY,
+    BULK_REPORT_FILE,
+    BULK_PROGRESS_INTERVAL,
+    PERF_TRACEMALLOC,
+    METRICS_SNAPSHOT_FILE,
+)
+from utils.file import ensure_directory
+from utils.metrics import PAGES_SYNCED, TRANSLATED_CHARACTERS, dump_at_exit
+
+EXIT_OK = 0
+EXIT_INCOMPLETE = 1
+EXIT_USAGE = 2
+EXIT_BOOK_ERRORS = 3
+EXIT_INTERRUPTED = 130
+
+
+def _total(counter) -> float:
+    """Somme d'un compteur sur toutes ses étiquettes."""
+    return sum(counter.snapshot().values())
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def perf_report_path(path: str, book_id) -> str:
+    """Rapport de performance propre à un livre (les livres parallèles n'écrivent pas le même fichier)."""
+    if not path:
+        return ""
+    root, ext = os.path.splitext(path)
+    return f"{root}.book_{book_id}{ext}"
+
+
+class BulkRun:
+    """Synchronise une liste de livres avec un parallélisme borné et consolide leurs rapports.
+
+    Chaque livre a son propre SyncManager (fork du SyncManager partagé : mêmes services,
+    mapping, miroir et file de reprise) ; le parallélisme à l'intérieur d'un livre reste
+    celui de sync_book (langues, requêtes), limité par les régulateurs du pool LibreTranslate.
+    """
+
+    def __init__(
+        self,
+        sync_manager,
+        target_langs: List[str],
+        concurrency: int = BULK_BOOK_CONCURRENCY,
+        force: bool = False,
+        progress_interval: float = BULK_PROGRESS_INTERVAL,
+        stream=None
+    ):
+        self.sync_manager = sync_manager
+        self.target_langs = list(target_langs)
+        self.concurrency = max(1, concurrency)
+        self.force = force
+        self.progress_interval = progress_interval
+        self.stream = stream or sys.stderr
+        self.logger = logging.getLogger(__name__)
+        self.books = []
+        self.results = {}
+        self.running = set()
+        self.interrupted = False
+        self._lock = threading.Lock()
+        self._start = None
+        self._pages_start = 0.0
+        self._chars_start = 0.0
+
+    # ---- Sélection des livres ----
+
+    def select_books(self, book_ids: Optional[List] = None) -> List[dict]:
+        """Livres à traduire, les plus gros d'abord ; None = tous les livres source.
+
+        Les livres qui sont eux-mêmes des traductions ne sont jamais retraduits.
+        """
+        mirror = self.sync_manager.mirror
+        mapping = self.sync_manager.mapping
+        mirror.refresh()
+        if book_ids is None:
+            books = mirror.list_books()
+        else:
+            books = [mirror.get_book(book_id) or {"id": book_id, "name": ""} for book_id in book_ids]
+        selected = []
+        for book in books:
+            if mapping.is_translation("books", book["id"]):
+                if book_ids is not None:
+                    self.logger.warning(f"[BULK] Livre {book['id']} ignoré : c'est une traduction.")
+                continue
+            selected.append(dict(book, pages=len(mirror.list_pages(book_id=book["id"]))))
+        selected.sort(key=lambda book: book["pages"], reverse=True)
+        return selected
+
+    # ---- Exécution ----
+
+    def _sync_book(self, book: dict) -> dict:
+        book_id = book["id"]
+        with self._lock:
+            self.running.add(book_id)
+        start = time.perf_counter()
+        entry = {"book_id": book_id, "book_name": book.get("name", ""), "source_pages": book.get("pages")}
+        try:
+            manager = self.sync_manager.fork(report_path="", perf_report_path=perf_report_path(
+                self.sync_manager.perf_report_path, book_id
+            ))
+            report = manager.sync_book(book_id, self.target_langs, force=self.force)
+            if report is None:
+                entry["status"] = "missing"
+            else:
+                entry.update(report.to_dict())
+                entry.pop("pages")
+                failed = sum(summary["fail"] for summary in report.summary.values())
+                entry["status"] = "incomplete" if failed else "ok"
+        except Exception as e:
+            self.logger.exception(f"[BULK] Livre {book_id} en erreur")
+            entry.update(status="error", error=str(e))
+        entry["duration_s"] = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self.running.discard(book_id)
+            self.results[book_id] = entry
+        self.print_progress(f"livre {book_id} : {entry['status']} en {_duration(entry['duration_s'])}")
+        return entry
+
+    def run(self, books: List[dict]) -> dict:
+        """Synchronise les livres ; retourne le rapport consolidé."""
+        self.books = books
+        self.sync_manager.ensure_mapping()
+        self._start = time.perf_counter()
+        self._pages_start = _total(PAGES_SYNCED)
+        self._chars_start = _total(TRANSLATED_CHARACTERS)
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        # Un seul tracemalloc pour tous les livres : le pic mémoire des rapports est celui du processus
+        started_tracemalloc = PERF_TRACEMALLOC and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        stop = threading.Event()
+        ticker = threading.Thread(target=self._progress_loop, args=(stop,), name="bulk-progress", daemon=True)
+        ticker.start()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-book")
+        try:
+            futures = [executor.submit(self._sync_book, book) for book in books]
+            for future in as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            self.interrupted = True
+            self.print_progress("interruption : fin des livres en cours, les suivants sont abandonnés")
+            for future in futures:
+                future.cancel()
+        finally:
+            executor.shutdown(wait=True)
+            stop.set()
+            if started_tracemalloc:
+                tracemalloc.stop()
+        return self.report(started_at)
+
+    # ---- Progression et rapport ----
+
+    def progress(self) -> dict:
+        elapsed = time.perf_counter() - (self._start or time.perf_counter())
+        pages = _total(PAGES_SYNCED) - self._pages_start
+        with self._lock:
+            done, running = len(self.results), len(self.running)
+        return {
+            "books_done": done,
+            "books_running": running,
+            "books_total": len(self.books),
+            "page_langs": int(pages),
+            "page_langs_per_min": round(pages / elapsed * 60, 1) if elapsed else 0.0,
+            "characters": int(_total(TRANSLATED_CHARACTERS) - self._chars_start),
+            "elapsed_s": round(elapsed, 3)
+        }
+
+    def print_progress(self, event: str = ""):
+        p = self.progress()
+        line = (
+            f"[BULK] {p['books_done']}/{p['books_total']} livres ({p['books_running']} en cours), "
+            f"{p['page_langs']} pages-langues, {p['page_langs_per_min']}/min, "
+            f"{p['characters']} caractères, {_duration(p['elapsed_s'])}"
+        )
+        self.stream.write(f"{line}{' - ' + event if event else ''}\n")
+        self.stream.flush()
+
+    def _progress_loop(self, stop: threading.Event):
+        if self.progress_interval <= 0:
+            return
+        while not stop.wait(self.progress_interval):
+            self.print_progress()
+
+    def report(self, started_at: str) -> dict:
+        books = []
+        for book in self.books:
+            books.append(self.results.get(book["id"]) or {
+                "book_id": book["id"], "book_name": book.get("name", ""), "status": "interrupted"
+            })
+        statuses = {}
+        pages = {lang: {"ok": 0, "fail": 0} for lang in self.target_langs}
+        for entry in books:
+            statuses[entry["status"]] = statuses.get(entry["status"], 0) + 1
+            for lang, summary in entry.get("summary", {}).items():
+                totals = pages.setdefault(lang, {"ok": 0, "fail": 0})
+                totals["ok"] += summary["ok"]
+                totals["fail"] += summary["fail"]
+        translator = getattr(self.sync_manager, "translator", None)
+        report = {
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target_langs": self.target_langs,
+            "concurrency": self.concurrency,
+            "force": self.force,
+            "progress": self.progress(),
+            "books_by_status": statuses,
+            "pages": pages,
+            "books": books,
+            "translate_backends": translator.backend_stats() if hasattr(translator, "backend_stats") else None
+        }
+        report["exit_code"] = exit_code(report, self.interrupted)
+        return report
+
+
+def exit_code(report: dict, interrupted: bool = False) -> int:
+    """Code de sortie d'une exécution d'après son rapport consolidé."""
+    if interrupted:
+        return EXIT_INTERRUPTED
+    statuses = report["books_by_status"]
+    if statuses.get("error") or statuses.get("missing"):
+        return EXIT_BOOK_ERRORS
+    if statuses.get("incomplete"):
+        return EXIT_INCOMPLETE
+    return EXIT_OK
+
+
+def save_report(report: dict, path: str):
+    try:
+        ensure_directory(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logging.info(f"[BULK] Rapport consolidé enregistré dans {path}.")
+    except OSError as e:
+        logging.error(f"[BULK] Impossible d'écrire le rapport {path} : {e}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Traduction de livres BookStack sans interaction (tâche planifiée).",
+        epilog="Codes de sortie : 0 succès, 1 pages en échec ou reprogrammées, 2 arguments invalides, "
+               "3 livres introuvables ou en erreur, 130 interruption."
+    )
+    parser.add_argument("books", nargs="*", type=int, help="identifiants des livres source")
+    parser.add_argument("--all", action="store_true", help="tous les livres source du miroir")
+    parser.add_argument("--langs", default=",".join(TARGET_LANGS), help="langues cibles, séparées par des virgules")
+    parser.add_argument("--concurrency", type=int, default=BULK_BOOK_CONCURRENCY, help="livres traduits en parallèle")
+    parser.add_argument(
+        "--max-requests", type=int, default=0,
+        help="requêtes LibreTranslate simultanées au plus par serveur (défaut : TRANSLATION_CONCURRENCY_MAX)"
+    )
+    parser.add_argument("--force", action="store_true", help="retraduit même les contenus à jour")
+    parser.add_argument("--report", default=BULK_REPORT_FILE, help="rapport JSON consolidé")
+    parser.add_argument(
+        "--progress-interval", type=float, default=BULK_PROGRESS_INTERVAL,
+        help="secondes entre deux lignes de progression (0 : seulement à la fin de chaque livre)"
+    )
+    args = parser.parse_args(argv)
+    args.langs = [lang.strip() for lang in args.langs.split(",") if lang.strip()]
+    if bool(args.books) == args.all:
+        parser.error("indiquez des identifiants de livres ou --all")
+    if not args.langs:
+        parser.error("aucune langue cible")
+    if args.concurrency < 1 or args.max_requests < 0:
+        parser.error("--concurrency doit être positif et --max-requests positif ou nul")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if METRICS_SNAPSHOT_FILE:
+        dump_at_exit(None if METRICS_SNAPSHOT_FILE == "-" else METRICS_SNAPSHOT_FILE)
+    from translation.context import get_context
+    context = get_context()
+    sync_manager = context.sync_manager
+    # Assez de langues simultanées pour tous les livres en cours
+    context.translator.set_concurrency(
+        languages=max(context.translator.lang_concurrency, args.concurrency * len(args.langs)),
+        requests_per_backend=args.max_requests or None
+    )
+    run = BulkRun(sync_manager, args.langs, args.concurrency, args.force, args.progress_interval)
+    try:
+        books = run.select_books(None if args.all else args.books)
+        if not books:
+            print("Aucun livre à traduire.", file=sys.stderr)
+            return EXIT_OK
+        run.print_progress(f"{len(books)} livres, {len(args.langs)} langues, {run.concurrency} en parallèle")
+        report = run.run(books)
+        if not run.interrupted:
+            # Pas de travailleur du webhook ici : les pages reprogrammées sont rejouées avant de quitter
+            report["deferred_remaining"] = sync_manager.replay_deferred()
+        save_report(report, args.report)
+        run.print_progress("terminé")
+        return report["exit_code"]
+    finally:
+        sync_manager.retry_queue.close()
+        if sync_manager.checkpoint is not None:
+            sync_manager.checkpoint.close()
+        context.translator.pool.close()
+        context.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
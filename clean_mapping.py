@@ -1,23 +1,15 @@
 # clean_mapping.py
 from api.mapping import MappingManager
-from api.books import BookStackBooksAPI
-from api.chapters import BookStackChaptersAPI
-from api.pages import BookStackPagesAPI
+from api.mirror import BookStackMirror
 
-def get_valid_ids():
-    books_api = BookStackBooksAPI()
-    chapters_api = BookStackChaptersAPI()
-    pages_api = BookStackPagesAPI()
+def get_valid_ids(mirror=None):
+    mirror = mirror or BookStackMirror()
 
-    valid_books = {str(book['id']) for book in books_api.list_books()}
-    valid_chapters = set()
-    valid_pages = set()
-
-    for book_id in valid_books:
-        for chapter in chapters_api.list_chapters(book_id):
-            valid_chapters.add(str(chapter['id']))
-        for page in pages_api.list_pages(book_id=book_id):
-            valid_pages.add(str(page['id']))
+    # Parcours complet du miroir : les éléments supprimés dans BookStack en sont retirés
+    mirror.refresh(full=True)
+    valid_books = mirror.ids("books")
+    valid_chapters = mirror.ids("chapters")
+    valid_pages = mirror.ids("pages")
 
     return valid_books, valid_chapters, valid_pages
 
@@ -12,7 +12,18 @@ BOOKSTACK_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Taille des pages de résultats pour les listings (maximum BookStack : 500)
+BOOKSTACK_PAGE_SIZE = int(os.getenv("BOOKSTACK_PAGE_SIZE", "500"))
+
+# === HTTP Client Configuration ===
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+
 # === Translation Configuration ===
+# Une ou plusieurs URL LibreTranslate, séparées par des virgules (pool de serveurs)
 LIBRETRANSLATE_URL = os.getenv("LIBRETRANSLATE_URL")
 LIBRETRANSLATE_API_KEY = os.getenv("LIBRETRANSLATE_API_KEY")
 
@@ -20,10 +31,99 @@ LIBRETRANSLATE_API_KEY = os.getenv("LIBRETRANSLATE_API_KEY")
 SOURCE_LANG = os.getenv("SOURCE_LANG", "fr")
 TARGET_LANGS = os.getenv("TARGET_LANG", "en,es,de").split(",")
 
+# Taille des fenêtres de texte traduites à la fois dans une page HTML (mémoire bornée)
+HTML_SEGMENT_WINDOW_CHARS = int(os.getenv("HTML_SEGMENT_WINDOW_CHARS", "100000"))
+
+# Langues d'une même page traduites en parallèle (gabarit compilé une seule fois)
+TRANSLATION_LANG_CONCURRENCY = int(os.getenv("TRANSLATION_LANG_CONCURRENCY", "4"))
+# Dédoublonnage des segments d'un livre avant traduction (chaque segment unique traduit une fois)
+BOOK_DEDUP_ENABLED = os.getenv("BOOK_DEDUP_ENABLED", "1") == "1"
+# Nombre de pages lues et segmentées avant chaque traduction groupée (borne la mémoire)
+BOOK_DEDUP_CHUNK_PAGES = max(1, int(os.getenv("BOOK_DEDUP_CHUNK_PAGES", "100")))
+
+# Détection de langue locale (profils de trigrammes) ; repli sur LibreTranslate si confiance faible
+LANGID_LANGUAGES = os.getenv("LANGID_LANGUAGES", ",".join([SOURCE_LANG] + TARGET_LANGS)).split(",")
+LANGID_MIN_CONFIDENCE = float(os.getenv("LANGID_MIN_CONFIDENCE", "0.15"))
+LANGID_SAMPLE_CHARS = int(os.getenv("LANGID_SAMPLE_CHARS", "2000"))
+LANGID_CACHE_SIZE = int(os.getenv("LANGID_CACHE_SIZE", "10000"))
+
+# Regroupement des segments envoyés à LibreTranslate (q accepte une liste) ; un segment
+# plus long que TRANSLATION_BATCH_MAX_CHARS est découpé aux fins de phrase
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "50"))
+TRANSLATION_BATCH_MAX_CHARS = int(os.getenv("TRANSLATION_BATCH_MAX_CHARS", "5000"))
+# Délai des requêtes de traduction : base + par millier de caractères envoyés, plafonné
+TRANSLATION_TIMEOUT_BASE = float(os.getenv("TRANSLATION_TIMEOUT_BASE", "5"))
+TRANSLATION_TIMEOUT_PER_KCHAR = float(os.getenv("TRANSLATION_TIMEOUT_PER_KCHAR", "2"))
+TRANSLATION_TIMEOUT_MAX = float(os.getenv("TRANSLATION_TIMEOUT_MAX", "120"))
+# Régulation du serveur de traduction : requêtes simultanées (AIMD), réponse jugée lente au-delà
+# de TRANSLATION_LATENCY_TARGET × délai accordé, disjoncteur après N échecs consécutifs
+TRANSLATION_CONCURRENCY_INITIAL = int(os.getenv("TRANSLATION_CONCURRENCY_INITIAL", "4"))
+TRANSLATION_CONCURRENCY_MAX = int(os.getenv("TRANSLATION_CONCURRENCY_MAX", "32"))
+TRANSLATION_LATENCY_TARGET = float(os.getenv("TRANSLATION_LATENCY_TARGET", "0.5"))
+TRANSLATION_BREAKER_FAILURES = int(os.getenv("TRANSLATION_BREAKER_FAILURES", "5"))
+TRANSLATION_BREAKER_COOLDOWN = float(os.getenv("TRANSLATION_BREAKER_COOLDOWN", "30"))
+# Pages non traduites (serveur indisponible) reprogrammées dans la file durable après ce délai
+TRANSLATION_RETRY_DELAY = float(os.getenv("TRANSLATION_RETRY_DELAY", "300"))
+# Exécutions CLI (sans travailleur du webhook) : ces pages sont rejouées dès la fin de l'exécution,
+# sans attendre le délai ci-dessus, pendant au plus ce temps ; 0 = les laisser aux travailleurs du webhook
+TRANSLATION_RETRY_DRAIN_TIMEOUT = float(os.getenv("TRANSLATION_RETRY_DRAIN_TIMEOUT", "600"))
+# Pool de serveurs : serveurs préférés par paire de langues, intervalle des vérifications de santé
+TRANSLATION_POOL_AFFINITY = int(os.getenv("TRANSLATION_POOL_AFFINITY", "2"))
+TRANSLATION_POOL_HEALTH_INTERVAL = float(os.getenv("TRANSLATION_POOL_HEALTH_INTERVAL", "15"))
+# Requêtes d'un même lot de segments envoyées en parallèle, par serveur du pool
+TRANSLATION_REQUEST_CONCURRENCY = int(os.getenv("TRANSLATION_REQUEST_CONCURRENCY", "8"))
+
 # === Directory Configuration ===
 TRANSLATED_DIR = os.getenv("TRANSLATED_DIR", os.path.join("data", "translated"))
 BOOKSTACK_DIR = os.getenv("BOOKSTACK_DIR", os.path.join("data", "bookstack"))
 DB_DIR = os.getenv("DB_DIR", "db")
 MAPPING_FILE = os.path.join(DB_DIR, "mapping.json")
 MAPPING_FILE_BACKUP = os.path.join(DB_DIR, "mapping_backup.json")
-MAPPING_FILE_TEMP = os.path.join(DB_DIR, "mapping_temp.json")
\ No newline at end of file
+MAPPING_FILE_TEMP = os.path.join(DB_DIR, "mapping_temp.json")
+MAPPING_JOURNAL_FILE = os.path.join(DB_DIR, "mapping.journal")
+MAPPING_JOURNAL_FSYNC_EVERY = int(os.getenv("MAPPING_JOURNAL_FSYNC_EVERY", "50"))
+MAPPING_JOURNAL_FSYNC_INTERVAL = float(os.getenv("MAPPING_JOURNAL_FSYNC_INTERVAL", "1.0"))
+MAPPING_COMPACT_EVERY = int(os.getenv("MAPPING_COMPACT_EVERY", "5000"))
+MIRROR_FILE = os.getenv("MIRROR_FILE", os.path.join(DB_DIR, "bookstack_mirror.sqlite3"))
+MIRROR_FULL_REFRESH_INTERVAL = float(os.getenv("MIRROR_FULL_REFRESH_INTERVAL", "86400"))
+LAST_REPORT_FILE = os.getenv("LAST_REPORT_FILE", os.path.join("data", "last_report.json"))
+
+# === Sync Engine Configuration ===
+SYNC_BOOKSTACK_CONCURRENCY = int(os.getenv("SYNC_BOOKSTACK_CONCURRENCY", "4"))
+SYNC_TRANSLATE_CONCURRENCY = int(os.getenv("SYNC_TRANSLATE_CONCURRENCY", "4"))
+# Journal de progression de sync_book (reprise après interruption)
+SYNC_CHECKPOINT_ENABLED = os.getenv("SYNC_CHECKPOINT_ENABLED", "1") == "1"
+SYNC_CHECKPOINT_FILE = os.getenv("SYNC_CHECKPOINT_FILE", os.path.join(DB_DIR, "sync_checkpoints.sqlite3"))
+
+# === Bulk Translation Configuration ===
+# Livres traduits en parallèle par bulk_translate.py
+BULK_BOOK_CONCURRENCY = int(os.getenv("BULK_BOOK_CONCURRENCY", "2"))
+BULK_REPORT_FILE = os.getenv("BULK_REPORT_FILE", os.path.join("data", "last_bulk_report.json"))
+# Intervalle (secondes) entre deux lignes de progression ; 0 = seulement à la fin de chaque livre
+BULK_PROGRESS_INTERVAL = float(os.getenv("BULK_PROGRESS_INTERVAL", "30"))
+
+# === Webhook Queue Configuration ===
+WEBHOOK_QUEUE_FILE = os.getenv("WEBHOOK_QUEUE_FILE", os.path.join(DB_DIR, "webhook_queue.sqlite3"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_JOB_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_JOB_MAX_ATTEMPTS", "5"))
+WEBHOOK_JOB_LEASE = float(os.getenv("WEBHOOK_JOB_LEASE", "900"))
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "30"))
+
+# === Metrics Configuration ===
+# Instantané des métriques écrit à la fin des exécutions CLI ("" = désactivé, "-" = stderr)
+METRICS_SNAPSHOT_FILE = os.getenv("METRICS_SNAPSHOT_FILE", "")
+
+# === Performance Report Configuration ===
+# Rapport JSONL (étapes par page et langue), complété à chaque exécution ; "" = désactivé
+PERF_REPORT_FILE = os.getenv("PERF_REPORT_FILE", "")
+# Pic mémoire via tracemalloc (ralentit nettement les synchronisations) ; "1" = activé
+PERF_TRACEMALLOC = os.getenv("PERF_TRACEMALLOC", "0") == "1"
+# Profil cProfile d'une seule page (identifiant source) ; "" = désactivé
+PROFILE_PAGE_ID = os.getenv("PROFILE_PAGE_ID", "")
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", os.path.join("data", "profile_page_{page_id}.pstats"))
+
+# === Translation Memory Configuration ===
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY_ENABLED", "1") == "1"
+TRANSLATION_MEMORY_FILE = os.getenv("TRANSLATION_MEMORY_FILE", os.path.join(DB_DIR, "translation_memory.sqlite3"))
+TRANSLATION_MEMORY_LRU_SIZE = int(os.getenv("TRANSLATION_MEMORY_LRU_SIZE", "20000"))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "500000"))
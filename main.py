@@ -1,17 +1,14 @@
-from api.books import BookStackBooksAPI
-from api.chapters import BookStackChaptersAPI
-from api.pages import BookStackPagesAPI
-from translation.sync import SyncManager
-from translation.translate import TranslationService  # Import de la classe TranslationService
+from config import METRICS_SNAPSHOT_FILE
+from translation.context import get_context
+from translation.translate import TranslationError
+from utils.metrics import dump_at_exit
 
 def main():
-    books_api = BookStackBooksAPI()
-    chapters_api = BookStackChaptersAPI()
-    pages_api = BookStackPagesAPI()
-    sync = SyncManager()
-
-    # Création de l'instance du service de traduction
-    translation_service = TranslationService()
+    # Services construits à la première utilisation et partagés (pas de mapping lu au démarrage)
+    context = get_context()
+    books_api = context.book_api
+    chapters_api = context.chapter_api
+    pages_api = context.page_api
 
     print("\n--- Traduction/MAJ BookStack (mode simplifié) ---")
     print("1. Traduire un livre entier")
@@ -46,7 +43,9 @@ def main():
             print("Aucune langue cible spécifiée.")
             return
         target_langs = [l.strip() for l in langs.split(',') if l.strip()]
-        sync.sync_book(book_id, target_langs)
+        context.sync_manager.sync_book(book_id, target_langs)
+        # Pas de travailleur du webhook ici : les pages reprogrammées sont rejouées avant de quitter
+        context.sync_manager.replay_deferred()
         return
 
     chapters = chapters_api.list_chapters(book_id)
@@ -81,7 +80,11 @@ def main():
             return
         chapter = chapters_api.get_chapter(chapter_id)
         chapter_text = chapter.get('text')  # Assurez-vous que votre API retourne un champ texte
-        translated_text = translation_service.translate_text(chapter_text, target_lang)
+        try:
+            translated_text = context.translator.translate_text(chapter_text, target_lang)
+        except TranslationError as e:
+            print(f"Traduction du chapitre impossible, rien n'a été modifié : {e}")
+            return
         chapters_api.update_chapter(chapter_id, {'text': translated_text})  # Mise à jour du chapitre
 
     elif choix == '3':
@@ -91,8 +94,12 @@ def main():
             return
         page = pages_api.get_page(page_id)
         page_html = page.get('html')  # Assurez-vous que votre API retourne un champ HTML
-        translated_html = translation_service.translate_html(page_html, target_lang)
-        pages_api.update_page(page_id, {'html': translated_html})  # Mise à jour de la page
+        try:
+            translated_html = context.translator.translate_html(page_html, target_lang)
+        except TranslationError as e:
+            print(f"Traduction de la page impossible, rien n'a été modifié : {e}")
+            return
+        pages_api.update_page(page_id, html=translated_html)  # Mise à jour de la page
 
     elif choix == '4':
         new_name = input("Nouveau nom du livre (laisser vide pour ne pas changer): ").strip()
@@ -123,10 +130,15 @@ def main():
     elif choix == '6':
         new_html = input("Nouveau contenu HTML (laisser vide pour ne pas changer): ").strip()
         if new_html:
-            pages_api.update_page(page_id, {"html": new_html})
+            pages_api.update_page(page_id, html=new_html)
             print("Page mise à jour.")
         else:
             print("Aucune modification à appliquer.")
 
 if __name__ == "__main__":
-    main()
+    if METRICS_SNAPSHOT_FILE:
+        dump_at_exit(None if METRICS_SNAPSHOT_FILE == "-" else METRICS_SNAPSHOT_FILE)
+    try:
+        main()
+    finally:
+        get_context().close()
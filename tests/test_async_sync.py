@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from api.mapping import MappingManager
+from api.mirror import BookStackMirror
+from translation.async_sync import AsyncSyncManager
+from translation.retry_queue import RetryQueue
+from translation.translate import TranslationError
+
+
+class FakeBookStack:
+    """BookStack en mémoire : un livre, un chapitre, trois pages."""
+
+    def __init__(self):
+        self.next_id = 1000
+        self.calls = 0
+        self.listings = 0
+        self.books = {1: {"id": 1, "name": "Livre", "description": ""}}
+        self.chapters = {10: {"id": 10, "book_id": 1, "name": "Chapitre"}}
+        self.pages = {
+            100 + i: {"id": 100 + i, "book_id": 1, "chapter_id": 10 if i else 0, "name": f"Page {i}", "html": f"<p>Texte {i}</p>"}
+            for i in range(3)
+        }
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def get_book(self, book_id):
+        return self.books.get(int(book_id))
+
+    def create_book(self, name, description=None):
+        book_id = self._new_id()
+        self.books[book_id] = {"id": book_id, "name": name, "description": description}
+        return self.books[book_id]
+
+    def update_book(self, book_id, fields):
+        return True
+
+    def list_chapters(self, book_id=None):
+        self.listings += 1
+        return [ch for ch in self.chapters.values() if book_id is None or ch["book_id"] == book_id]
+
+    # Listings paginés lus par le miroir
+    def iter_books(self, filters=None, strict=False):
+        return iter(list(self.books.values()))
+
+    def iter_chapters(self, filters=None, strict=False):
+        return iter(list(self.chapters.values()))
+
+    def iter_pages(self, filters=None, strict=False):
+        return iter(list(self.pages.values()))
+
+    def create_chapter(self, book_id, name, description=None):
+        chapter_id = self._new_id()
+        self.chapters[chapter_id] = {"id": chapter_id, "book_id": book_id, "name": name}
+        return self.chapters[chapter_id]
+
+    def update_chapter(self, chapter_id, fields):
+        return True
+
+    def list_pages(self, book_id=None, chapter_id=None):
+        self.listings += 1
+        return [p for p in list(self.pages.values()) if p["book_id"] == book_id]
+
+    def get_page(self, page_id):
+        return self.pages.get(int(page_id))
+
+    def create_page(self, book_id, chapter_id, name, html, lang=None, source_page_id=None):
+        page_id = self._new_id()
+        self.pages[page_id] = {"id": page_id, "book_id": book_id, "chapter_id": chapter_id, "name": name, "html": html}
+        return self.pages[page_id]
+
+    def update_page(self, page_id, **fields):
+        return self.pages[page_id]
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.calls = 0
+
+    def translate_text(self, text, target_lang, source_lang=None):
+        self.calls += 1
+        return f"[{target_lang}]{text}"
+
+    translate_html = translate_text
+
+    def compile_html(self, html):
+        return html
+
+    def fill_template(self, template, target_lang, source_lang=None, title=None):
+        return self.translate_text(title, target_lang), self.translate_text(template, target_lang)
+
+    def detect_language(self, text, cache_key=None):
+        return "fr"
+
+
+class TestAsyncSyncManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bookstack = FakeBookStack()
+        self.translator = FakeTranslator()
+        self.mapping = MappingManager(
+            mapping_path=os.path.join(self.tmp_dir, 'mapping.json'),
+            translation_service=self.translator,
+            mirror=BookStackMirror(":memory:", self.bookstack, self.bookstack, self.bookstack)
+        )
+        sync = SimpleNamespace(
+            book_api=self.bookstack, chapter_api=self.bookstack, page_api=self.bookstack,
+            translator=self.translator, mapping=self.mapping, ensure_mapping=lambda: None
+        )
+        self.engine = AsyncSyncManager(
+            sync,
+            report_path=os.path.join(self.tmp_dir, 'report.json'),
+            perf_report_path=os.path.join(self.tmp_dir, 'perf.jsonl'),
+            retry_queue=RetryQueue(os.path.join(self.tmp_dir, 'retry.sqlite3'), delay=0)
+        )
+
+    def tearDown(self):
+        self.engine.retry_queue.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_sync_book_creates_every_page_and_language(self):
+        report = self.engine.sync_book(1, ["en", "de"])
+        self.assertEqual(report.summary["en"]["ok"], 3)
+        self.assertEqual(report.summary["de"]["ok"], 3)
+        for page_id in (100, 101, 102):
+            for lang in ("en", "de"):
+                target = self.bookstack.pages[self.mapping.get_page(page_id, lang)]
+                self.assertEqual(target["name"], f"[{lang}]Page {page_id - 100}")
+        chapter_copy = self.bookstack.pages[self.mapping.get_page(101, "en")]["chapter_id"]
+        self.assertEqual(chapter_copy, self.mapping.get_chapter(10, "en"))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, 'report.json')))
+        # Structure lue dans le miroir, pas par les listings de l'API
+        self.assertEqual(self.bookstack.listings, 0)
+
+    def test_empty_report_path_writes_no_report(self):
+        self.engine.report_path = ""
+        self.assertIsNotNone(self.engine.sync_book(1, ["en"]))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'report.json')))
+
+    def test_perf_report_streams_one_line_per_page(self):
+        report = self.engine.sync_book(1, ["en", "de"])
+        with open(os.path.join(self.tmp_dir, 'perf.jsonl'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["type"] for r in records], ["run_start", "structure", "page", "page", "page", "run_end"])
+        page = records[2]
+        self.assertIn("fetch", page["stages"])
+        self.assertEqual(set(page["langs"]), {"en", "de"})
+        self.assertEqual(page["langs"]["en"]["status"], "created")
+        self.assertIn("publish", page["langs"]["en"]["stages"])
+        self.assertEqual(records[-1]["pages"], 3)
+        self.assertEqual(report.performance["run_id"], records[0]["run_id"])
+
+    def test_second_run_skips_unchanged_pages(self):
+        self.engine.sync_book(1, ["en"])
+        calls = self.translator.calls
+        report = self.engine.sync_book(1, ["en"])
+        self.assertEqual(self.translator.calls, calls)
+        self.assertEqual({page["status"] for page in report.pages}, {"skipped"})
+
+    def test_unavailable_backend_parks_pages_instead_of_publishing(self):
+        def fill_template(template, target_lang, source_lang=None, title=None):
+            if target_lang == "de":
+                raise TranslationError([template])
+            return FakeTranslator.fill_template(self.translator, template, target_lang, source_lang, title)
+
+        self.translator.fill_template = fill_template
+        report = self.engine.sync_book(1, ["en", "de"])
+        self.assertEqual(report.summary["en"]["ok"], 3)
+        self.assertEqual({page["status"] for page in report.pages if page["lang"] == "de"}, {"deferred"})
+        self.assertIsNone(self.mapping.get_page(100, "de"))
+        jobs = [self.engine.retry_queue.queue.claim() for _ in range(4)]
+        self.assertEqual(sorted(job.payload["page_id"] for job in jobs if job), [100, 101, 102])
+        self.assertEqual(jobs[0].payload["langs"], ["de"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+import requests
+
+from translation.backend import BackendController, BackendUnavailable
+
+
+def ok():
+    return SimpleNamespace(status_code=200)
+
+
+def overloaded():
+    return SimpleNamespace(status_code=503)
+
+
+class TestBackendController(unittest.TestCase):
+    def test_limit_grows_additively_and_halves_on_overload(self):
+        backend = BackendController("test", initial=4, maximum=8, failure_threshold=100)
+        for _ in range(8):
+            backend.call(ok, timeout=10)
+        self.assertGreater(backend.limit, 5)
+        before = backend.limit
+        backend.call(overloaded, timeout=10)
+        self.assertAlmostEqual(backend.limit, before / 2)
+        self.assertLessEqual(BackendController("test", initial=50, maximum=8).limit, 8)
+
+    def test_slow_responses_reduce_the_limit(self):
+        backend = BackendController("test", initial=4, latency_target=0.5)
+
+        def slow():
+            time.sleep(0.02)
+            return ok()
+
+        backend.call(slow, timeout=0.01)
+        self.assertEqual(backend.limit, 2)
+
+    def test_breaker_opens_then_probes(self):
+        backend = BackendController("test", failure_threshold=2, cooldown=0.05)
+
+        def timeout():
+            raise requests.exceptions.Timeout()
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.Timeout):
+                backend.call(timeout, timeout=1)
+        self.assertEqual(backend.state, "open")
+        with self.assertRaises(BackendUnavailable):
+            backend.call(ok)
+        time.sleep(0.06)
+        backend.call(ok)
+        self.assertEqual(backend.state, "closed")
+        self.assertEqual(backend.stats()["in_flight"], 0)
+
+    def test_failed_probe_reopens_the_breaker(self):
+        backend = BackendController("test", failure_threshold=1, cooldown=0.01)
+        backend.call(overloaded)
+        time.sleep(0.02)
+        backend.call(overloaded)
+        self.assertEqual(backend.state, "open")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from benchmarks.run import Harness, compare, parse_args, percentiles, scenario_sync_book
+
+FAST = [
+    "--books", "1", "--chapters", "1", "--pages", "2", "--loose-pages", "1", "--langs", "en",
+    "--bookstack-latency", "0", "--translate-latency", "0", "--translate-per-kb", "0", "--jitter", "0",
+]
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_sync_book_against_fake_servers(self):
+        harness = Harness(parse_args(FAST))
+        try:
+            result = scenario_sync_book(harness)
+        finally:
+            harness.close()
+        self.assertEqual(result["pages"], 3)
+        self.assertEqual(result["http_errors"], 0)
+        self.assertGreater(result["http_calls"]["translate"], 0)
+        self.assertGreater(result["bytes"]["total"], 0)
+
+    def test_unchanged_pages_cost_no_translation(self):
+        harness = Harness(parse_args(FAST))
+        try:
+            harness.sync_all_books()
+            sync = harness.services["sync_manager"]
+
+            def resync():
+                for page_id in harness.source_pages:
+                    sync.sync_page(page_id, harness.langs)
+                return len(harness.source_pages), {}
+            result = harness.measure("resync", resync)
+        finally:
+            harness.close()
+        self.assertEqual(result["http_calls"]["translate"], 0)
+
+    def test_percentiles_and_compare(self):
+        self.assertAlmostEqual(percentiles([0.001 * i for i in range(1, 101)])["p95"], 95.0)
+        current = {"scenarios": {"sync_book": {"pages_per_min": 80.0, "http_calls_per_page": 5.0}}}
+        baseline = {"scenarios": {"sync_book": {"pages_per_min": 100.0, "http_calls_per_page": 5.0}}}
+        self.assertEqual(len(compare(current, baseline, 0.1)), 1)
+        self.assertEqual(compare(current, baseline, 0.25), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import io
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+from bulk_translate import BulkRun, parse_args, save_report, EXIT_OK, EXIT_INCOMPLETE, EXIT_BOOK_ERRORS
+from translation.report import SyncReport
+
+BOOKS = {1: 3, 2: 10, 3: 1, 4: 5}     # livre -> nombre de pages
+TRANSLATIONS = {4}                     # livre 4 : traduction d'un autre livre
+
+
+class FakeMirror:
+    def refresh(self):
+        pass
+
+    def list_books(self):
+        return [{"id": book_id, "name": f"Livre {book_id}"} for book_id in BOOKS]
+
+    def get_book(self, book_id):
+        return {"id": book_id, "name": f"Livre {book_id}"} if book_id in BOOKS else None
+
+    def list_pages(self, book_id=None):
+        return [{"id": i} for i in range(BOOKS.get(book_id, 0))]
+
+
+class FakeMapping:
+    def is_translation(self, section, item_id):
+        return item_id in TRANSLATIONS
+
+
+class FakeSyncManager:
+    """Synchronisation factice : mesure le parallélisme, échoue sur demande."""
+
+    def __init__(self, fail_pages=(), broken=()):
+        self.mirror = FakeMirror()
+        self.mapping = FakeMapping()
+        self.fail_pages = set(fail_pages)
+        self.broken = set(broken)
+        self.active = 0
+        self.max_active = 0
+        self.forks = []
+        self.perf_report_path = "data/perf.jsonl"
+        self.lock = threading.Lock()
+
+    def ensure_mapping(self):
+        pass
+
+    def fork(self, **options):
+        self.forks.append(options)
+        return self
+
+    def sync_book(self, book_id, langs, force=False):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        if book_id in self.broken:
+            raise RuntimeError("BookStack indisponible")
+        if book_id not in BOOKS:
+            return None
+        report = SyncReport(book_id, f"Livre {book_id}", langs)
+        for page in range(BOOKS[book_id]):
+            for lang in langs:
+                failed = (book_id, page) in self.fail_pages
+                report.add_page(page, f"Page {page}", lang, "deferred" if failed else "created")
+        return report
+
+
+class TestBulkRun(unittest.TestCase):
+    def make_run(self, manager, concurrency=2):
+        return BulkRun(manager, ["en", "de"], concurrency=concurrency, progress_interval=0, stream=io.StringIO())
+
+    def test_all_books_largest_first_without_translations(self):
+        run = self.make_run(FakeSyncManager())
+        self.assertEqual([book["id"] for book in run.select_books()], [2, 1, 3])
+
+    def test_bounded_parallelism_and_consolidated_report(self):
+        manager = FakeSyncManager()
+        run = self.make_run(manager)
+        report = run.run(run.select_books())
+        self.assertEqual(manager.max_active, 2)
+        self.assertEqual(report["exit_code"], EXIT_OK)
+        self.assertEqual(report["books_by_status"], {"ok": 3})
+        self.assertEqual(report["pages"]["en"], {"ok": 14, "fail": 0})
+        self.assertNotIn("pages", report["books"][0])
+        self.assertTrue(all(options["report_path"] == "" for options in manager.forks))
+        self.assertIn("data/perf.book_2.jsonl", [options["perf_report_path"] for options in manager.forks])
+        self.assertIn("[BULK] 3/3 livres", run.stream.getvalue())
+
+    def test_failed_pages_and_broken_books_set_exit_code(self):
+        run = self.make_run(FakeSyncManager(fail_pages={(1, 0)}))
+        report = run.run(run.select_books([1, 3]))
+        self.assertEqual(report["exit_code"], EXIT_INCOMPLETE)
+        self.assertEqual(report["pages"]["de"], {"ok": 3, "fail": 1})
+
+        run = self.make_run(FakeSyncManager(broken={3}))
+        report = run.run(run.select_books([1, 3, 99]))
+        self.assertEqual(report["exit_code"], EXIT_BOOK_ERRORS)
+        self.assertEqual(report["books_by_status"], {"ok": 1, "error": 1, "missing": 1})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bulk", "report.json")
+            save_report(report, path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["exit_code"], EXIT_BOOK_ERRORS)
+
+    def test_arguments(self):
+        args = parse_args(["--all", "--langs", "en, de", "--concurrency", "3"])
+        self.assertEqual((args.all, args.langs, args.concurrency), (True, ["en", "de"], 3))
+        with self.assertRaises(SystemExit):
+            parse_args(["1", "--all"])
+        with self.assertRaises(SystemExit):
+            parse_args([])
+
+
+if __name__ == "__main__":
+    unittest.main()
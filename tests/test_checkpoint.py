@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.run import Harness, parse_args
+from translation.checkpoint import SyncCheckpoint
+
+FAST = [
+    "--books", "1", "--chapters", "2", "--pages", "3", "--loose-pages", "1", "--langs", "en,de",
+    "--bookstack-latency", "0", "--translate-latency", "0", "--translate-per-kb", "0", "--jitter", "0",
+]
+
+
+class TestSyncCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "checkpoints.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_interrupted_run_is_resumed_after_restart(self):
+        journal = SyncCheckpoint(self.path)
+        run = journal.begin(1, ["en", "de"])
+        self.assertFalse(run.resumed)
+        run.record(10, {"en": "created", "de": "deferred"}, "h10", "2024-01-01")
+        journal.close()  # arrêt brutal : finish() n'est jamais appelé
+
+        journal = SyncCheckpoint(self.path)
+        resumed = journal.begin(1, ["en", "de"])
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.run_id, run.run_id)
+        self.assertEqual(resumed.completed(10, "2024-01-01"), {"en"})
+        self.assertEqual(resumed.completed(10, "2024-02-01"), set())
+        self.assertEqual(resumed.completed(11, "2024-01-01"), set())
+        # Une exécution forcée ne reprend pas une exécution ordinaire
+        self.assertFalse(journal.begin(1, ["en", "de"], force=True).resumed)
+        journal.close()
+
+    def test_run_stays_open_until_every_unit_succeeds(self):
+        journal = SyncCheckpoint(self.path)
+        run = journal.begin(1, ["en"])
+        run.record(10, {"en": "failed"}, "h10", "r1")
+        run.finish()
+        run = journal.begin(1, ["en"])
+        self.assertTrue(run.resumed)
+        run.record(10, {"en": "updated"}, "h10", "r1")
+        run.finish()
+        self.assertFalse(journal.begin(1, ["en"]).resumed)
+        journal.close()
+
+
+class TestResumableSyncBook(unittest.TestCase):
+    def test_rerun_after_crash_only_processes_remaining_pages(self):
+        harness = Harness(parse_args(FAST))
+        try:
+            sync = harness.services["sync_manager"]
+            book_id = next(iter(harness.corpus["books"]))
+            timed_sync_page = sync.sync_page
+            calls = []
+
+            def crashing_sync_page(page_id, *args, **kwargs):
+                if len(calls) == 4:
+                    raise RuntimeError("processus tué")
+                calls.append(page_id)
+                return timed_sync_page(page_id, *args, **kwargs)
+
+            sync.sync_page = crashing_sync_page
+            with self.assertRaises(RuntimeError):
+                sync.sync_book(book_id, harness.langs, force=True)
+            done = list(calls)
+
+            calls.clear()
+            sync.sync_page = lambda page_id, *args, **kwargs: calls.append(page_id) or timed_sync_page(
+                page_id, *args, **kwargs
+            )
+            report = sync.sync_book(book_id, harness.langs, force=True)
+            self.assertEqual(len(done) + len(calls), len(harness.source_pages))
+            self.assertFalse(set(done) & set(calls))
+            self.assertTrue(all(summary["fail"] == 0 for summary in report.summary.values()))
+
+            # Exécution terminée : la suivante repart de zéro
+            calls.clear()
+            sync.sync_book(book_id, harness.langs, force=True)
+            self.assertEqual(len(calls), len(harness.source_pages))
+        finally:
+            harness.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
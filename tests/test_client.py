@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from api.client import HTTPClient
+from api.pages import BookStackPagesAPI
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(max_retries=2, backoff_factor=0)
+
+    def test_retries_server_errors_then_succeeds(self):
+        responses = [FakeResponse(503), FakeResponse(200)]
+        with mock.patch.object(self.client.session, 'request', side_effect=responses) as request:
+            resp = self.client.get("http://bookstack.test/api/pages/12")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(request.call_count, 2)
+        stats = self.client.stats()["GET bookstack.test/api/pages/{id}"]
+        self.assertEqual((stats["count"], stats["errors"], stats["retries"]), (2, 1, 1))
+
+    def test_post_is_not_retried_by_default(self):
+        with mock.patch.object(self.client.session, 'request', side_effect=requests.exceptions.ConnectionError()) as request:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.post("http://bookstack.test/api/pages", json={})
+        self.assertEqual(request.call_count, 1)
+
+    def test_connection_errors_are_retried_when_allowed(self):
+        errors = [requests.exceptions.ConnectionError(), requests.exceptions.ConnectionError()]
+        with mock.patch.object(self.client.session, 'request', side_effect=errors + [FakeResponse(200)]) as request:
+            resp = self.client.post("http://translate.test/translate", json={}, retry=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(request.call_count, 3)
+
+
+
+class FakeListing:
+    status_code = 200
+
+    def __init__(self, data, total):
+        self._body = {"data": data, "total": total}
+
+    def json(self):
+        return self._body
+
+
+class TestPagination(unittest.TestCase):
+    def test_iter_pages_walks_every_offset_with_server_filters(self):
+        items = [{"id": i, "name": f"Page {i}", "html": "<p>x</p>", "book_id": 7} for i in range(5)]
+        client = HTTPClient()
+        api = BookStackPagesAPI(client=client, api_base="http://bookstack.test/api")
+
+        def fake_request(method, url, params=None, **kwargs):
+            offset, count = params["offset"], params["count"]
+            self.assertEqual(params["filter[book_id]"], 7)
+            return FakeListing(items[offset:offset + count], len(items))
+
+        with mock.patch.object(client.session, 'request', side_effect=fake_request) as request:
+            pages = list(api._paginate("pages", filters={"book_id": 7}, fields=("id",), count=2))
+        self.assertEqual(pages, [{"id": i} for i in range(5)])
+        self.assertEqual(request.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from translation.content_hash import content_hash
+
+
+class TestContentHash(unittest.TestCase):
+    def test_ignores_bookstack_bookmark_ids(self):
+        first = '<p id="bkmrk-bonjour">Bonjour</p>\n<a href="#bkmrk-bonjour">lien</a>'
+        resaved = '<p id="bkmrk-bonjour-1">Bonjour</p> <a href="#bkmrk-bonjour-1">lien</a>'
+        self.assertEqual(content_hash("Page", first), content_hash("Page", resaved))
+
+    def test_detects_text_and_name_changes(self):
+        base = content_hash("Page", "<p>Bonjour</p>")
+        self.assertNotEqual(base, content_hash("Page", "<p>Bonsoir</p>"))
+        self.assertNotEqual(base, content_hash("Page 2", "<p>Bonjour</p>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
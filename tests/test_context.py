@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from api.mapping import MappingManager
+from translation.context import SyncContext
+
+
+class TestSyncContext(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'mapping.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_nothing_built_until_used(self):
+        context = SyncContext(self.path)
+        self.assertEqual(context.timings, {})
+        self.assertIs(context.page_api, context.page_api)
+        self.assertEqual(set(context.timings), {"http_client", "page_api"})
+
+    def test_mapping_reloaded_only_when_files_change(self):
+        manager = MappingManager(self.path)
+        manager.set_mapped_book('1', 'en', 42)
+        manager.flush()
+        self.assertFalse(manager.reload_if_changed())
+
+        # Écriture par un autre processus (ici une autre instance)
+        other = MappingManager(self.path)
+        other.set_mapped_page('5', 'de', 77, book_id=1, chapter_id=None)
+        other.journal.close()
+
+        self.assertTrue(manager.reload_if_changed())
+        self.assertEqual(manager.get_mapped_page('5', 'de'), 77)
+        self.assertEqual(manager.get_source_page(77).source_id, 5)
+        self.assertFalse(manager.reload_if_changed())
+        manager.journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
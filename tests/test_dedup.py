@@ -0,0 +1,101 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from api.client import get_http_client
+from translation.pool import BackendPool
+from translation.dedup import SegmentDictionary
+from translation.memory import TranslationMemory
+from translation.translate import TranslationService, TranslationError
+from translation.html_segmenter import compile_template
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def fake_post(url, json=None, **kwargs):
+    return FakeResponse({'translatedText': [f"[{json['target']}]{t}" for t in json['q']]})
+
+
+class TestSegmentDictionary(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService(
+            api_url="http://translate.test/translate", memory=TranslationMemory(path=None),
+            pool=BackendPool(["http://translate.test/translate"], get_http_client(), failure_threshold=100)
+        )
+        self.dictionary = SegmentDictionary(self.service)
+        self.pages = [
+            ("Page 1", compile_template("<p>Remarque</p><p>Étape 1</p><p>Installer</p>")),
+            ("Page 2", compile_template("<p>Remarque</p><p>Étape 1</p><p>Configurer</p>")),
+            ("Page 3", compile_template("<p> Remarque </p><pre>Remarque</pre>")),
+        ]
+
+    def test_each_unique_segment_is_sent_once_per_language(self):
+        for title, template in self.pages:
+            self.dictionary.add(template, "fr", ["en", "de"], title=title)
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            self.dictionary.translate()
+        sent = {}
+        for call in post.call_args_list:
+            payload = call.kwargs['json']
+            sent.setdefault(payload['target'], []).extend(payload['q'])
+        for lang in ("en", "de"):
+            self.assertEqual(len(sent[lang]), len(set(sent[lang])))
+            self.assertEqual(
+                set(sent[lang]),
+                {"Page 1", "Page 2", "Page 3", "Remarque", "Étape 1", "Installer", "Configurer"}
+            )
+
+        stats = self.dictionary.stats()
+        self.assertEqual(stats["segments"], 10)
+        self.assertEqual(stats["unique_segments"], 7)
+        self.assertGreater(stats["dedup_ratio"], 0.3)
+
+    def test_pages_are_rebuilt_from_the_dictionary(self):
+        for title, template in self.pages:
+            self.dictionary.add(template, "fr", ["en"], title=title)
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post):
+            self.dictionary.translate()
+        with mock.patch.object(self.service.http, 'post') as post:
+            title, html = self.dictionary.fill(self.pages[2][1], "en", "fr", title="Page 3")
+        post.assert_not_called()
+        self.assertEqual(title, "[en]Page 3")
+        self.assertEqual(html, "<p> [en]Remarque </p><pre>Remarque</pre>")
+
+    def test_known_segments_are_not_requested_again(self):
+        self.dictionary.add(self.pages[0][1], "fr", ["en"])
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post):
+            self.dictionary.translate()
+        self.dictionary.add(self.pages[1][1], "fr", ["en"])
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            self.dictionary.translate()
+        self.assertEqual(post.call_args.kwargs['json']['q'], ["Configurer"])
+
+    def test_timed_out_segments_block_the_page(self):
+        self.dictionary.add(self.pages[0][1], "fr", ["en"])
+        with mock.patch.object(self.service.http, 'post', side_effect=requests.exceptions.Timeout()):
+            self.dictionary.translate()
+        with self.assertRaises(TranslationError):
+            self.dictionary.fill(self.pages[0][1], "en", "fr")
+        self.dictionary.add(self.pages[0][1], "fr", ["en"])
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post):
+            self.dictionary.translate()
+        self.assertEqual(
+            self.dictionary.fill(self.pages[0][1], "en", "fr")[1],
+            "<p>[en]Remarque</p><p>[en]Étape 1</p><p>[en]Installer</p>"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from translation.html_segmenter import iter_segments, iter_windows, render, visible_text
+
+
+def translatable(html):
+    return [chunk for chunk, flag in iter_segments(html) if flag]
+
+
+class TestSegmenter(unittest.TestCase):
+    def test_round_trip_is_exact(self):
+        html = (
+            '<!DOCTYPE html><h2 id="bkmrk-a">Titre</h2>\n<p class=\'x\'>Un &amp; deux<br>trois</p>'
+            '<img src="a.png" alt="x > y"/><!-- commentaire --><table><tr><td>Cellule</td></tr></table>'
+        )
+        self.assertEqual("".join(chunk for chunk, _ in iter_segments(html)), html)
+        self.assertEqual(translatable(html), ["Titre", "Un &amp; deux", "trois", "Cellule"])
+
+    def test_code_pre_script_style_are_skipped(self):
+        html = (
+            "<p>Avant</p><pre><code>sudo <b>restart</b></code></pre><script>if (a<b) {}</script>"
+            "<style>p { color: red }</style><p>Après <code>ls -l</code> fin</p>"
+        )
+        self.assertEqual(translatable(html), ["Avant", "Après ", " fin"])
+
+    def test_no_translate_markers_cover_nested_elements(self):
+        html = '<div translate="no"><div>garder</div>aussi</div><span class="a notranslate">non</span>oui'
+        self.assertEqual(translatable(html), ["oui"])
+
+    def test_lone_lower_than_is_text(self):
+        self.assertEqual(translatable("<p>a < b et c</p>"), ["a < b et c"])
+
+    def test_windows_split_text_and_render_escapes(self):
+        html = "<p>un</p><p>deux &lt;x&gt;</p><p>trois</p>"
+        windows = list(iter_windows(html, max_chars=6))
+        self.assertGreater(len(windows), 1)
+        self.assertEqual(windows[0].texts, ["un", "deux <x>"])
+        out = "".join(render(w, [t.upper() for t in w.texts]) for w in windows)
+        self.assertEqual(out, "<p>UN</p><p>DEUX &lt;X&gt;</p><p>TROIS</p>")
+
+    def test_untranslated_text_is_kept_byte_for_byte(self):
+        html = "<p>a&nbsp;&amp;&#39;b</p>"
+        window = next(iter_windows(html))
+        self.assertEqual(render(window, window.texts), html)
+
+    def test_visible_text_is_truncated(self):
+        self.assertEqual(visible_text("<p>Bonjour</p><pre>x</pre><p>le   monde</p>", 100), "Bonjour le monde")
+        self.assertEqual(visible_text("<p>Bonjour</p><p>le monde</p>", 7), "Bonjour")
+
+
+if __name__ == "__main__":
+    unittest.main()
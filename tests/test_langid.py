@@ -0,0 +1,32 @@
+import unittest
+
+from translation.langid import LanguageIdentifier, sample_visible_text
+
+
+class TestLanguageIdentifier(unittest.TestCase):
+    def setUp(self):
+        self.identifier = LanguageIdentifier(["fr", "en", "de", "es"])
+
+    def test_identifies_configured_languages(self):
+        samples = {
+            "fr": "Vous trouverez ici les instructions pour demander un accès au réseau et les règles de sécurité.",
+            "en": "Here you will find the instructions to request network access and the security rules.",
+            "de": "Hier finden Sie die Anweisungen, um Netzwerkzugriff zu beantragen, und die Sicherheitsregeln.",
+            "es": "Aquí encontrará las instrucciones para solicitar acceso a la red y las reglas de seguridad.",
+        }
+        for lang, text in samples.items():
+            detected, confidence = self.identifier.identify(text)
+            self.assertEqual(detected, lang)
+            self.assertGreater(confidence, 0.15)
+
+    def test_short_text_has_no_confidence(self):
+        self.assertEqual(self.identifier.identify("Accueil"), (None, 0.0))
+
+    def test_sample_skips_markup_and_code(self):
+        html = "<p>Bonjour&nbsp;le <b>monde</b></p><pre>print('hello world')</pre><script>var x;</script>"
+        self.assertEqual(sample_visible_text(html), "Bonjour le monde")
+        self.assertEqual(sample_visible_text("abc " * 10, max_chars=7), "abc abc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,44 @@
+import os
+import shutil
+import tempfile
 import unittest
 from api.mapping import MappingManager
+from api.mirror import BookStackMirror
+from sync_mapping import sync_book_mapping
+
+
+class FakeListings:
+    """Listings BookStack minimaux pour le miroir."""
+
+    def __init__(self, books):
+        self.books = books
+
+    def iter_books(self, filters=None, strict=False):
+        return iter(self.books)
+
+    def iter_chapters(self, filters=None, strict=False):
+        return iter([])
+
+    def iter_pages(self, filters=None, strict=False):
+        return iter([])
 
 class TestMappingManager(unittest.TestCase):
     def setUp(self):
-        # Utilise un mapping temporaire pour les tests
-        self.test_path = 'db/test_mapping.json'
-        self.manager = MappingManager(mapping_path=self.test_path)
+        # Mapping et miroir temporaires : rien n'est écrit dans DB_DIR
+        self.tmp_dir = tempfile.mkdtemp()
+        self.test_path = os.path.join(self.tmp_dir, 'mapping.json')
+        self.mirror = BookStackMirror(":memory:")
+        self.manager = self.load()
         self.manager.mapping = {'books': {}, 'chapters': {}, 'pages': {}}
         self.manager.save_mapping()
 
+    def load(self):
+        return MappingManager(mapping_path=self.test_path, mirror=self.mirror)
+
     def tearDown(self):
-        import os
-        if os.path.exists(self.test_path):
-            os.remove(self.test_path)
+        self.manager.journal.close()
+        self.mirror.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
 
     def test_set_and_get_book(self):
         self.manager.set_book('1', 'en', 42)
@@ -26,5 +52,80 @@ class TestMappingManager(unittest.TestCase):
         self.manager.set_page('100', 'en', 123)
         self.assertEqual(self.manager.get_page('100', 'en'), 123)
 
+    def test_reverse_index_follows_updates(self):
+        self.manager.set_book('1', 'en', 42)
+        self.manager.set_page('100', 'de', 5810)
+        self.assertEqual(self.manager.get_source_page(5810), (100, 'de'))
+        self.assertEqual(self.manager.get_source_book('42'), (1, 'en'))
+        self.assertIsNone(self.manager.get_source_page(100))
+        self.manager.set_page('100', 'de', 5811)
+        self.assertIsNone(self.manager.get_source_page(5810))
+        self.manager.remove_page('100', 'de')
+        self.assertFalse(self.manager.is_translation('pages', 5811))
+
+    def test_reverse_index_rebuilt_on_load_and_orphans(self):
+        self.manager.set_chapter('10', 'en', 99)
+        self.manager.set_chapter('11', 'en', 98)
+        self.manager.flush()
+        reloaded = self.load()
+        self.assertEqual(reloaded.get_source_chapter(99), (10, 'en'))
+        self.assertEqual(reloaded.find_orphans('chapters', {99, 10, 11}), [(11, 'en', 98)])
+        reloaded.journal.close()
+
+    def test_journal_is_replayed_after_restart(self):
+        self.manager.set_mapped_page('200', 'en', 321, book_id=1, chapter_id=2)
+        self.manager.set_sync_state('pages', '200', 'en', 'abc', 'def')
+        # Simule un arrêt brutal : pas de flush, l'instantané n'a pas été réécrit
+        self.manager.journal.close()
+        reloaded = self.load()
+        self.assertEqual(reloaded.get_page('200', 'en'), 321)
+        self.assertTrue(reloaded.is_up_to_date('pages', '200', 'en', 'abc'))
+        reloaded.journal.close()
+
+    def test_torn_journal_line_is_ignored(self):
+        self.manager.set_book('1', 'en', 42)
+        self.manager.journal.close()
+        with open(self.manager.journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "set", "path": ["books", "2"')
+        reloaded = self.load()
+        self.assertEqual(reloaded.get_book('1', 'en'), 42)
+        self.assertIsNone(reloaded.get_book('2', 'en'))
+        reloaded.journal.close()
+
+    def test_append_after_torn_line_is_not_lost(self):
+        self.manager.set_book('1', 'en', 42)
+        self.manager.journal.close()
+        with open(self.manager.journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "set", "path": ["books", "2"')
+        reloaded = self.load()
+        reloaded.set_book('3', 'en', 7)
+        reloaded.journal.close()
+        again = self.load()
+        self.assertEqual(again.get_book('1', 'en'), 42)
+        self.assertEqual(again.get_book('3', 'en'), 7)
+        again.journal.close()
+
+    def test_sync_mapping_saves_through_the_journal(self):
+        self.manager.set_book('1', 'en', 42)
+        self.manager.flush()
+        # Mutation d'une exécution précédente restée dans le journal
+        self.manager.set_book('1', 'de', 99)
+        self.manager.journal.close()
+        api = FakeListings([{"id": 1, "name": "Livre"}, {"id": 42, "name": "Livre [en]"}])
+        sync_book_mapping(BookStackMirror(":memory:", api, api, api), mapping_path=self.test_path)
+        self.assertFalse(os.path.exists(self.manager.journal.path))
+        reloaded = self.load()
+        self.assertEqual(reloaded.get_book('1', 'en'), 42)
+        self.assertIsNone(reloaded.get_book('1', 'de'))
+        reloaded.journal.close()
+
+    def test_flush_compacts_journal_into_snapshot(self):
+        import json
+        self.manager.set_chapter('10', 'de', 99)
+        self.manager.flush()
+        self.assertFalse(os.path.exists(self.manager.journal.path))
+        with open(self.test_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['chapters']['10']['translations']['de'], 99)
+
 if __name__ == "__main__":
     unittest.main()
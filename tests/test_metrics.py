@@ -0,0 +1,60 @@
+import unittest
+from unittest import mock
+
+from api.client import HTTPClient
+from utils.metrics import Registry, HTTP_REQUESTS, HTTP_RETRIES
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_render(self):
+        counter = self.registry.counter("jobs_total", "Travaux.", ("status",))
+        counter.inc(status="done")
+        counter.inc(2, status="done")
+        counter.inc(status='a"b')
+        text = self.registry.render()
+        self.assertIn("# HELP jobs_total Travaux.\n# TYPE jobs_total counter\n", text)
+        self.assertIn('jobs_total{status="done"} 3\n', text)
+        self.assertIn('jobs_total{status="a\\"b"} 1\n', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("latency_seconds", "Durée.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn("latency_seconds_count 4\n", text)
+        self.assertIn("latency_seconds_sum 3.65\n", text)
+
+    def test_gauge_function_is_read_at_render(self):
+        gauge = self.registry.gauge("queue_depth", "Profondeur.", ("status",))
+        depth = {"pending": 1}
+        gauge.set_function(lambda: {(status,): count for status, count in depth.items()})
+        self.assertIn('queue_depth{status="pending"} 1\n', self.registry.render())
+        depth["pending"] = 4
+        self.assertIn('queue_depth{status="pending"} 4\n', self.registry.render())
+
+
+class TestHTTPMetrics(unittest.TestCase):
+    def test_client_counts_requests_and_retries_per_service(self):
+        client = HTTPClient(max_retries=2, backoff_factor=0)
+        endpoint = "GET metrics.test/api/pages/{id}"
+        before = HTTP_REQUESTS.value(service="bookstack", endpoint=endpoint, status=200)
+        with mock.patch.object(client.session, 'request', side_effect=[FakeResponse(503), FakeResponse(200)]):
+            client.get("http://metrics.test/api/pages/3", service="bookstack")
+        self.assertEqual(HTTP_REQUESTS.value(service="bookstack", endpoint=endpoint, status=200), before + 1)
+        self.assertEqual(HTTP_REQUESTS.value(service="bookstack", endpoint=endpoint, status=503), 1)
+        self.assertEqual(HTTP_RETRIES.value(service="bookstack", endpoint=endpoint), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import threading
+import unittest
+
+import requests
+
+from api.mirror import BookStackMirror
+
+
+class FakeAPI:
+    """Listings BookStack en mémoire, filtrés sur updated_at:gte comme le serveur."""
+
+    def __init__(self):
+        self.items = {
+            "books": {1: {"id": 1, "name": "Livre", "slug": "livre", "description": "d",
+                          "updated_at": "2024-01-01T10:00:00.000000Z"}},
+            "chapters": {10: {"id": 10, "book_id": 1, "name": "Chapitre", "updated_at": "2024-01-01T10:00:00.000000Z"}},
+            "pages": {
+                100: {"id": 100, "book_id": 1, "chapter_id": 10, "name": "P1", "updated_at": "2024-01-01T10:00:00.000000Z"},
+                101: {"id": 101, "book_id": 1, "chapter_id": 0, "name": "P2", "updated_at": "2024-01-01T10:00:00.000000Z"},
+            },
+        }
+        self.calls = []
+        self.fail = False
+        self.during_listing = None
+
+    def _iter(self, section, filters):
+        self.calls.append((section, dict(filters or {})))
+        if self.fail:
+            raise requests.HTTPError("Listing interrompu")
+        if self.during_listing:
+            self.during_listing(section)
+        since = (filters or {}).get("updated_at:gte")
+        for item in self.items[section].values():
+            if since is None or item["updated_at"][:19].replace("T", " ") >= since:
+                yield item
+
+    def iter_books(self, filters=None, strict=False):
+        return self._iter("books", filters)
+
+    def iter_chapters(self, filters=None, strict=False):
+        return self._iter("chapters", filters)
+
+    def iter_pages(self, filters=None, strict=False):
+        return self._iter("pages", filters)
+
+    def get_page(self, page_id):
+        self.calls.append(("get_page", page_id))
+        return {"id": page_id, "book_id": 2, "chapter_id": 20, "name": "Distante", "html": "<p>x</p>"}
+
+
+class TestBookStackMirror(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeAPI()
+        self.mirror = BookStackMirror(":memory:", self.api, self.api, self.api)
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_full_then_incremental_refresh(self):
+        self.assertEqual(self.mirror.refresh(), {"books": 1, "chapters": 1, "pages": 2})
+        self.assertEqual(self.mirror.get_page(100)["chapter_id"], 10)
+        self.assertNotIn("chapter_id", self.mirror.get_page(101))
+        self.assertEqual([p["id"] for p in self.mirror.list_pages(chapter_id=10)], [100])
+
+        self.api.items["pages"][100] = dict(self.api.items["pages"][100], name="P1 bis",
+                                            updated_at="2024-02-01T10:00:00.000000Z")
+        self.api.calls.clear()
+        self.mirror.refresh()
+        self.assertEqual(self.api.calls[2], ("pages", {"updated_at:gte": "2024-01-01 10:00:00"}))
+        self.assertEqual(self.mirror.get_page(100)["name"], "P1 bis")
+
+    def test_full_refresh_removes_deleted_items_but_failures_do_not(self):
+        self.mirror.refresh()
+        del self.api.items["pages"][101]
+        self.api.fail = True
+        self.mirror.refresh(full=True)
+        self.assertEqual(self.mirror.ids("pages"), {"100", "101"})
+        self.api.fail = False
+        self.mirror.refresh(full=True)
+        self.assertEqual(self.mirror.ids("pages"), {"100"})
+
+    def test_read_through_and_webhook_events(self):
+        self.assertEqual(self.mirror.get_page(555)["book_id"], 2)
+        self.assertEqual(self.mirror.get_page(555)["book_id"], 2)
+        self.assertEqual(self.api.calls.count(("get_page", 555)), 1)
+
+        self.assertTrue(self.mirror.apply_event("page_move", {"id": 555, "book_id": 3, "name": "Distante"}))
+        self.assertEqual(self.mirror.get_page(555, fetch=False)["book_id"], 3)
+        self.assertTrue(self.mirror.apply_event("page_delete", {"id": 555}))
+        self.assertIsNone(self.mirror.get_page(555, fetch=False))
+        self.assertFalse(self.mirror.apply_event("user_create", {"id": 1}))
+
+    def test_events_during_crawl_are_not_blocked_nor_overwritten(self):
+        self.mirror.refresh()
+
+        def webhook(section):
+            if section != "pages":
+                return
+            # Thread du serveur webhook : ne doit pas attendre la fin du parcours distant
+            thread = threading.Thread(target=lambda: (
+                self.mirror.apply_event("page_update", {"id": 100, "book_id": 1, "name": "Renommée",
+                                                        "updated_at": "2024-01-03T10:00:00.000000Z"}),
+                self.mirror.apply_event("page_delete", {"id": 101}),
+            ))
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+        self.api.during_listing = webhook
+        self.mirror.refresh(full=True)
+        self.assertEqual(self.mirror.get_page(100, fetch=False)["name"], "Renommée")
+        self.assertIsNone(self.mirror.get_page(101, fetch=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+from utils import perf
+
+
+class TestTrace(unittest.TestCase):
+    def test_stage_without_trace_is_noop(self):
+        self.assertIsNone(perf.current())
+        with perf.stage("fetch"):
+            pass
+
+    def test_nested_stages_are_exclusive(self):
+        with perf.trace() as page_trace:
+            with perf.stage("publish"):
+                time.sleep(0.02)
+                with perf.stage("translate"):
+                    time.sleep(0.05)
+        stages = page_trace.to_dict()["stages"]
+        self.assertGreaterEqual(stages["translate"], 0.05)
+        self.assertLess(stages["publish"], 0.05)
+
+    def test_named_trace_is_attached_to_parent(self):
+        with perf.trace() as page_trace:
+            with perf.trace("en") as lang_trace:
+                perf.current().add_http("libretranslate", 120, 80, retried=True)
+        self.assertIs(page_trace.children["en"], lang_trace)
+        self.assertEqual(
+            lang_trace.to_dict()["http"]["libretranslate"],
+            {"requests": 1, "bytes_sent": 120, "bytes_received": 80, "retries": 1}
+        )
+        self.assertEqual(page_trace.to_dict()["http"], {})
+
+
+class TestPerfReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "perf.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_lines_are_written_as_the_run_progresses(self):
+        report = perf.PerfReport(self.path, trace_memory=True).start(book_id=1)
+        with perf.trace() as page_trace:
+            with perf.stage("fetch"):
+                pass
+            with perf.trace("en"):
+                with perf.stage("translate"):
+                    pass
+        report.page(7, page_trace, {"en": "created", "de": "skipped"})
+        with open(self.path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["type"] for line in lines], ["run_start", "page"])
+        self.assertEqual(lines[1]["langs"]["de"], {"status": "skipped"})
+
+        summary = report.close()
+        self.assertEqual(summary["pages"], 1)
+        self.assertEqual(set(summary["stages"]), {"fetch", "translate"})
+        self.assertGreater(summary["peak_memory_bytes"], 0)
+
+    def test_runs_are_appended(self):
+        first = perf.PerfReport(self.path).start(book_id=1)
+        first.close()
+        second = perf.PerfReport(self.path).start(book_id=2)
+        summary = second.close()
+        self.assertIsNone(summary["peak_memory_bytes"])
+        with open(self.path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["type"] for line in lines], ["run_start", "run_end"] * 2)
+        self.assertEqual([line["run_id"] for line in lines[::2]], [first.run_id, second.run_id])
+
+    def test_profiled_dumps_pstats(self):
+        path = os.path.join(self.tmp_dir, "page.pstats")
+        with perf.profiled(path):
+            sum(range(1000))
+        self.assertTrue(os.path.getsize(path) > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
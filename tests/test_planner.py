@@ -0,0 +1,47 @@
+import unittest
+
+from translation.planner import split_text, pack_requests, request_timeout
+
+
+class TestSplitText(unittest.TestCase):
+    def test_short_text_is_kept(self):
+        self.assertEqual(split_text("Une phrase.", 100), ["Une phrase."])
+
+    def test_split_at_sentence_boundaries(self):
+        text = "Première phrase. Deuxième phrase ! Troisième ? Fin"
+        chunks = split_text(text, 20)
+        self.assertEqual("".join(chunks), text)
+        self.assertEqual(chunks[0], "Première phrase. ")
+        self.assertTrue(all(len(chunk) <= 20 for chunk in chunks))
+
+    def test_sentences_are_grouped_up_to_the_limit(self):
+        self.assertEqual(split_text("Un. Deux. Trois. Quatre.", 12), ["Un. Deux. ", "Trois. ", "Quatre."])
+
+    def test_long_sentence_falls_back_to_words_then_hard_cut(self):
+        text = "mot " * 10 + "x" * 25
+        chunks = split_text(text, 10)
+        self.assertEqual("".join(chunks), text)
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+
+
+class TestPackRequests(unittest.TestCase):
+    def test_first_fit_decreasing(self):
+        sizes = [2, 6, 3, 4, 5]
+        requests = pack_requests(sizes, max_chars=10, max_segments=50)
+        self.assertEqual(requests, [[1, 3], [0, 2, 4]])
+
+    def test_segment_count_is_bounded(self):
+        requests = pack_requests([1] * 5, max_chars=100, max_segments=2)
+        self.assertEqual([len(r) for r in requests], [2, 2, 1])
+        self.assertEqual(sorted(i for r in requests for i in r), list(range(5)))
+
+    def test_oversized_segment_gets_its_own_request(self):
+        self.assertEqual(pack_requests([50, 3], max_chars=10, max_segments=5), [[0], [1]])
+
+    def test_timeout_grows_with_payload(self):
+        self.assertLess(request_timeout(100), request_timeout(5000))
+        self.assertLessEqual(request_timeout(10 ** 9), 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+import requests
+
+from translation.backend import BackendUnavailable
+from translation.pool import BackendPool
+
+URLS = [f"http://lt{i}.test/translate" for i in range(4)]
+
+
+class FakeHTTP:
+    """Client HTTP factice : les serveurs listés dans down échouent, les autres répondent 200."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.posts = []
+
+    def post(self, url, **kwargs):
+        self.posts.append(url)
+        if any(url.startswith(base) for base in self.down):
+            raise requests.exceptions.ConnectionError(url)
+        return SimpleNamespace(status_code=200, url=url)
+
+    def get(self, url, **kwargs):
+        return SimpleNamespace(status_code=503 if any(url.startswith(base) for base in self.down) else 200)
+
+
+class TestBackendPool(unittest.TestCase):
+    def make_pool(self, http, **kwargs):
+        return BackendPool(URLS, http, affinity=kwargs.pop("affinity", 1), health_interval=0, **kwargs)
+
+    def test_language_pair_sticks_to_its_backends(self):
+        pool = self.make_pool(FakeHTTP())
+        first = {pool.request("translate", {}, 5, pair=("fr", "en")).url for _ in range(5)}
+        self.assertEqual(len(first), 1)
+        pairs = [("fr", lang) for lang in ("en", "de", "es", "it", "pt", "nl", "pl", "ru")]
+        used = {pool.request("translate", {}, 5, pair=pair).url for pair in pairs}
+        self.assertGreater(len(used), 1)
+
+    def test_least_outstanding_among_affine_then_spill_over(self):
+        pool = self.make_pool(FakeHTTP(), affinity=2, initial=2)
+        preferred = pool._preferred(("fr", "en"))
+        preferred[0].outstanding = 1
+        self.assertIs(pool.candidates(("fr", "en"))[0], preferred[1])
+        preferred[1].outstanding = 2
+        preferred[0].outstanding = 2
+        self.assertNotIn(pool.candidates(("fr", "en"))[0], preferred[:2])
+
+    def test_failover_to_next_backend(self):
+        pool = self.make_pool(FakeHTTP())
+        preferred = pool._preferred(("fr", "en"))
+        pool.http.down = {preferred[0].base_url}
+        response = pool.request("translate", {}, 5, pair=("fr", "en"))
+        self.assertFalse(response.url.startswith(preferred[0].base_url))
+        stats = {s["backend"]: s for s in pool.stats()}
+        self.assertEqual(stats[preferred[0].base_url]["failovers"], 1)
+        self.assertEqual(stats[preferred[0].base_url]["errors"], 1)
+
+    def test_unhealthy_backends_are_skipped(self):
+        http = FakeHTTP(down={"http://lt0.test", "http://lt1.test"})
+        pool = self.make_pool(http)
+        pool.check_health()
+        self.assertEqual(
+            {b.base_url for b in pool.candidates(("fr", "en"))}, {"http://lt2.test", "http://lt3.test"}
+        )
+        http.down = set()
+        pool.check_health()
+        self.assertEqual(len(pool.candidates(("fr", "en"))), 4)
+
+    def test_all_backends_down_raises(self):
+        pool = self.make_pool(FakeHTTP(down={url[:-len("/translate")] for url in URLS}))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            pool.request("translate", {}, 5, pair=("fr", "en"))
+        self.assertEqual(sum(s["requests"] for s in pool.stats()), 4)
+
+    def test_concurrent_failures_are_all_counted(self):
+        pool = self.make_pool(FakeHTTP(down={url[:-len("/translate")] for url in URLS}))
+
+        def fail_many():
+            for _ in range(50):
+                # Erreur de connexion, puis disjoncteurs ouverts
+                with self.assertRaises((requests.exceptions.ConnectionError, BackendUnavailable)):
+                    pool.request("translate", {}, 5, pair=("fr", "en"))
+
+        threads = [threading.Thread(target=fail_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Chaque essai a échoué ; le dernier essai de chaque appel n'est pas un repli
+        # (disjoncteurs ouverts en cours de route : le nombre d'essais par appel varie)
+        stats = pool.stats()
+        attempts = sum(s["requests"] for s in stats)
+        self.assertEqual(sum(s["errors"] for s in stats), attempts)
+        self.assertEqual(sum(s["failovers"] for s in stats), attempts - 8 * 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
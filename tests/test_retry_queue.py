@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from config import TARGET_LANGS
+from translation.memory import TranslationMemory
+from translation.retry_queue import RetryQueue
+from translation.translate import TranslationService, TranslationError
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class TestRetryQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        # Délai de production : drain ne doit pas l'attendre
+        self.retry_queue = RetryQueue(os.path.join(self.tmpdir.name, "retry.sqlite3"), delay=300)
+        self.replayed = []
+
+    def tearDown(self):
+        self.retry_queue.close()
+        self.tmpdir.cleanup()
+
+    def replay(self, page_id, langs):
+        self.replayed.append((page_id, list(langs)))
+        return {lang: "failed" if page_id == 101 else "created" for lang in langs}
+
+    def status(self, job_id):
+        return self.retry_queue.queue._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+    def test_drain_replays_parked_pages_without_waiting_for_the_delay(self):
+        for page_id in (100, 101, 102):
+            self.retry_queue.park(page_id, ["de"])
+        self.assertEqual(self.retry_queue.drain(self.replay, timeout=0.3), 1)
+        self.assertEqual(sorted({page_id for page_id, _ in self.replayed}), [100, 101, 102])
+        self.assertEqual(self.retry_queue.parked, self.retry_queue.queue.pending(self.retry_queue.parked))
+        self.assertEqual(len(self.retry_queue.parked), 1)
+        self.assertEqual(self.retry_queue.drain(self.replay, timeout=0), 1)
+
+    def test_page_merged_with_webhook_job_is_replayed_for_every_language(self):
+        # Événement webhook sans langs (= toutes les langues) puis page parquée pour "en"
+        webhook_job = self.retry_queue.queue.enqueue("page_update", {"page_id": 7}, key="page:7")
+        self.assertEqual(self.retry_queue.park(7, ["en"]), webhook_job)
+        self.assertEqual(self.retry_queue.drain(self.replay, timeout=1), 0)
+        self.assertEqual(self.replayed, [(7, TARGET_LANGS)])
+        self.assertEqual(self.status(webhook_job), "done")
+
+    def test_empty_api_translation_keeps_page_parked(self):
+        service = TranslationService(api_url="http://translate.test/translate", memory=TranslationMemory(path=None))
+
+        def replay(page_id, langs):
+            try:
+                return {lang: "updated" if service.translate_text("Bonjour", lang) else "failed" for lang in langs}
+            except TranslationError:
+                return {lang: "deferred" for lang in langs}
+
+        for response in ({"translatedText": [""]}, {"translatedText": ""}):
+            with self.subTest(response=response):
+                job_id = self.retry_queue.park(1, ["en"])
+                with mock.patch.object(service.http, "post", return_value=FakeResponse(response)):
+                    with self.assertRaises(TranslationError):
+                        service.translate_text("Bonjour", "en")
+                    self.assertEqual(self.retry_queue.drain(replay, timeout=0.3), 1)
+                self.assertEqual(self.status(job_id), "pending")
+                self.retry_queue.queue.complete(job_id)
+                self.retry_queue.parked.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from api.title_matcher import TitleMatcher
+
+
+class FakeTranslator:
+    DICTIONARY = {
+        ("en", "Medulla Vue d'ensemble"): "Medulla Overview",
+        ("de", "Medulla Vue d'ensemble"): "Medulla Übersicht",
+        ("en", "Chapitre 2 : Introduction"): "Chapter 2: Introduction",
+    }
+
+    def __init__(self):
+        self.calls = 0
+
+    def batch_translate_texts(self, texts, lang, source_lang=None):
+        self.calls += 1
+        return [self.DICTIONARY.get((lang, t), t) for t in texts]
+
+
+class TestTitleMatcher(unittest.TestCase):
+    def setUp(self):
+        self.translator = FakeTranslator()
+        self.matcher = TitleMatcher(self.translator)
+
+    def test_exact_and_fuzzy_matches(self):
+        books = {
+            "20": {"title": "Medulla Vue d'ensemble", "translations": {}},
+            "227": {"title": "Medulla Overview", "translations": {}},
+            "229": {"title": "Medulla Ubersicht", "translations": {}},
+        }
+        self.matcher.match(books, ["en", "de"])
+        self.assertEqual(books["20"]["translations"], {"en": 227, "de": 229})
+        # Un titre n'est rattaché qu'à des éléments situés après lui
+        self.assertEqual(books["229"]["translations"], {})
+
+    def test_same_book_is_never_matched(self):
+        chapters = {
+            "53": {"title": "Chapitre 2 : Introduction", "book_id": 20, "translations": {}},
+            "54": {"title": "Chapter 2: Introduction", "book_id": 20, "translations": {}},
+            "317": {"title": "Chapter 2 - Introduction", "book_id": 227, "translations": {}},
+        }
+        self.matcher.match(chapters, ["en"])
+        self.assertEqual(chapters["53"]["translations"], {"en": 317})
+
+    def test_titles_translated_once_per_language(self):
+        pages = {str(i): {"title": "Remarque", "book_id": i, "translations": {}} for i in range(50)}
+        self.matcher.match(pages, ["en", "de"])
+        self.matcher.match(pages, ["en", "de"])
+        self.assertEqual(self.translator.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from translation.memory import TranslationMemory
+from translation.translate import TranslationService, TranslationError
+from translation.html_segmenter import compile_template
+from translation.planner import request_timeout
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def fake_post(url, json=None, **kwargs):
+    q = json['q']
+    if isinstance(q, list):
+        return FakeResponse({'translatedText': [f"[{json['target']}]{t}" for t in q]})
+    return FakeResponse({'translatedText': f"[{json['target']}]{q}"})
+
+
+class TestTranslationBatch(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService(api_url="http://translate.test/translate", memory=TranslationMemory(path=None))
+
+    def test_translate_html_single_request(self):
+        html = "<p>Bonjour <strong>monde</strong></p><p>Bonjour </p>"
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            result = self.service.translate_html(html, 'en')
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(post.call_args.kwargs['json']['q'], ["Bonjour", "monde"])
+        self.assertEqual(result, "<p>[en]Bonjour <strong>[en]monde</strong></p><p>[en]Bonjour </p>")
+
+    def test_translate_html_skips_code_and_escapes_entities(self):
+        html = "<p>Tom &amp; Jerry</p><pre><code>rm -rf /tmp</code></pre>"
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            result = self.service.translate_html(html, 'en')
+        self.assertEqual(post.call_args.kwargs['json']['q'], ["Tom & Jerry"])
+        self.assertEqual(result, "<p>[en]Tom &amp; Jerry</p><pre><code>rm -rf /tmp</code></pre>")
+
+    def test_translate_page_parses_once_for_every_language(self):
+        html = "<h2>Titre</h2><p>Corps</p>"
+        with mock.patch('translation.translate.compile_template', wraps=compile_template) as compile_once, \
+                mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            result = self.service.translate_page("Nom", html, ["en", "de", "es"], 'fr')
+        self.assertEqual(compile_once.call_count, 1)
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(result["de"], ("[de]Nom", "<h2>[de]Titre</h2><p>[de]Corps</p>"))
+        self.assertEqual(set(result), {"en", "de", "es"})
+
+    def test_batch_translate_texts_keeps_order_and_blanks(self):
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post):
+            result = self.service.batch_translate_texts(["Merci", " ", "Au revoir"], 'de')
+        self.assertEqual(result, ["[de]Merci", " ", "[de]Au revoir"])
+
+    def test_fallback_when_server_returns_single_text(self):
+        def legacy_post(url, json=None, **kwargs):
+            return FakeResponse({'translatedText': "x" if isinstance(json['q'], list) else json['q'].upper()})
+
+        with mock.patch.object(self.service.http, 'post', side_effect=legacy_post):
+            result = self.service.batch_translate_texts(["oui", "non"], 'en')
+        self.assertEqual(result, ["OUI", "NON"])
+
+    def test_memory_only_sends_changed_segments(self):
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            self.service.translate_html("<p>Un</p><p>Deux</p>", 'en', 'fr')
+            result = self.service.translate_html("<p>Un</p><p>Trois</p>", 'en', 'fr')
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args.kwargs['json']['q'], ["Trois"])
+        self.assertEqual(result, "<p>[en]Un</p><p>[en]Trois</p>")
+
+    def test_failed_segments_are_not_memorized(self):
+        with mock.patch.object(self.service.http, 'post', side_effect=requests.exceptions.ConnectionError()):
+            with self.assertRaises(TranslationError):
+                self.service.translate_text("Bonjour", 'en')
+        self.assertEqual(self.service.memory.stats()["memory_entries"], 0)
+
+
+class TestRequestPlanning(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService(api_url="http://translate.test/translate", memory=TranslationMemory(path=None))
+
+    def test_long_segment_is_split_and_reassembled(self):
+        sentence = "Une phrase assez longue. "
+        with mock.patch.object(self.service.http, 'post', side_effect=fake_post) as post:
+            result = self.service.translate_text(sentence * 300, 'en')
+        sent = [q for call in post.call_args_list for q in call.kwargs['json']['q']]
+        self.assertEqual(len(sent), 2)
+        self.assertTrue(all(len(q) <= 5000 for q in sent))
+        self.assertEqual(result, "[en]" + sentence * 200 + "[en]" + sentence * 100)
+        self.assertEqual(
+            [call.kwargs['timeout'] for call in post.call_args_list],
+            [request_timeout(len(q)) for q in sent]
+        )
+
+    def test_timed_out_batch_is_bisected(self):
+        def slow_for_pairs(url, json=None, **kwargs):
+            if len(json['q']) > 1:
+                raise requests.exceptions.Timeout()
+            return fake_post(url, json)
+
+        with mock.patch.object(self.service.http, 'post', side_effect=slow_for_pairs):
+            self.assertEqual(self.service.batch_translate_texts(["un", "deux"], 'en'), ["[en]un", "[en]deux"])
+
+    def test_timeout_is_never_published_as_source_text(self):
+        template = self.service.compile_html("<p>Bonjour</p>")
+        with mock.patch.object(self.service.http, 'post', side_effect=requests.exceptions.Timeout()):
+            with self.assertRaises(TranslationError):
+                self.service.translate_text("Bonjour", 'en')
+            self.assertEqual(self.service.translate_template(template, "Titre", ['en']), {'en': None})
+        self.assertEqual(self.service.memory.stats()["memory_entries"], 0)
+
+
+class TestDetectLanguage(unittest.TestCase):
+    def setUp(self):
+        self.service = TranslationService(api_url="http://translate.test/translate", memory=TranslationMemory(path=None))
+
+    def test_detect_url_is_sibling_of_translate(self):
+        self.assertEqual(self.service.detect_url, "http://translate.test/detect")
+
+    def test_local_detection_is_cached_without_network(self):
+        html = "<h1>Accès</h1><p>Cette page explique comment demander un accès au réseau de l'entreprise.</p>"
+        with mock.patch.object(self.service.http, 'post') as post:
+            self.assertEqual(self.service.detect_language(html, cache_key="h1"), "fr")
+            with mock.patch.object(self.service.language_identifier, 'identify') as identify:
+                self.assertEqual(self.service.detect_language(html, cache_key="h1"), "fr")
+        post.assert_not_called()
+        identify.assert_not_called()
+
+    def test_remote_fallback_when_confidence_is_low(self):
+        response = FakeResponse([{"language": "de", "confidence": 90}])
+        response.status_code = 200
+        with mock.patch.object(self.service.http, 'post', return_value=response) as post:
+            self.assertEqual(self.service.detect_language("OK"), "de")
+        self.assertEqual(post.call_args.args[0], "http://translate.test/detect")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from translation.memory import TranslationMemory, split_whitespace
+
+
+class TestTranslationMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'memory.sqlite3')
+        self.memory = TranslationMemory(path=self.path, lru_size=2, max_entries=10)
+
+    def tearDown(self):
+        self.memory.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.memory.get("Bonjour", 'fr', 'en', 'lt'))
+        self.memory.set("Bonjour", 'fr', 'en', 'lt', "Hello")
+        self.assertEqual(self.memory.get("  Bonjour ", 'fr', 'en', 'lt'), "Hello")
+        self.assertIsNone(self.memory.get("Bonjour", 'fr', 'de', 'lt'))
+        stats = self.memory.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_disk_tier_survives_restart(self):
+        self.memory.set("Merci", 'fr', 'en', 'lt', "Thanks")
+        self.memory.close()
+        self.memory = TranslationMemory(path=self.path)
+        self.assertEqual(self.memory.get("Merci", 'fr', 'en', 'lt'), "Thanks")
+        self.assertEqual(self.memory.stats()["disk_hits"], 1)
+
+    def test_get_many_reads_disk_in_batches(self):
+        texts = [f"texte {i}" for i in range(1200)]
+        self.memory.close()
+        self.memory = TranslationMemory(path=self.path, lru_size=10, max_entries=5000)
+        self.memory.set_many({text: text.upper() for text in texts}, 'fr', 'en', 'lt')
+        self.memory.close()
+        self.memory = TranslationMemory(path=self.path, lru_size=10, max_entries=5000)
+        statements = []
+        self.memory._db.set_trace_callback(statements.append)
+        found = self.memory.get_many(texts + ["absent"], 'fr', 'en', 'lt')
+        self.assertEqual(len(found), 1200)
+        self.assertEqual(found["texte 7"], "TEXTE 7")
+        self.assertEqual(sum(statement.startswith("SELECT") for statement in statements), 3)
+        self.assertEqual(sum(statement == "COMMIT" for statement in statements), 1)
+        stats = self.memory.stats()
+        self.assertEqual((stats["disk_hits"], stats["misses"]), (1200, 1))
+
+    def test_size_based_eviction(self):
+        for i in range(12):
+            self.memory.set(f"texte {i}", 'fr', 'en', 'lt', f"text {i}")
+        stats = self.memory.stats()
+        self.assertLessEqual(stats["memory_entries"], 2)
+        self.assertLessEqual(stats["disk_entries"], 10)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(self.memory.get("texte 11", 'fr', 'en', 'lt'), "text 11")
+
+    def test_invalidate_language_pair(self):
+        self.memory.set("Oui", 'fr', 'en', 'lt', "Yes")
+        self.memory.set("Oui", 'fr', 'de', 'lt', "Ja")
+        self.assertEqual(self.memory.invalidate('fr', 'en'), 1)
+        self.assertIsNone(self.memory.get("Oui", 'fr', 'en', 'lt'))
+        self.assertEqual(self.memory.get("Oui", 'fr', 'de', 'lt'), "Ja")
+
+    def test_split_whitespace(self):
+        self.assertEqual(split_whitespace("  Oui\n"), ("  ", "Oui", "\n"))
+        self.assertEqual(split_whitespace(" \t"), (" \t", "", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
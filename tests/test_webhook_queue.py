@@ -0,0 +1,146 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from webhook.jobs import JobQueue, WorkerPool, merge_payloads
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "queue.sqlite3")
+        self.queue = JobQueue(self.path, max_attempts=2, debounce=0)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmpdir.cleanup()
+
+    def test_claim_complete(self):
+        job_id = self.queue.enqueue("page_update", {"page_id": 7}, key="page:7")
+        job = self.queue.claim()
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(job.payload, {"page_id": 7})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(self.queue.claim())
+        self.queue.complete(job.id)
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_same_key_not_claimed_twice(self):
+        self.queue.enqueue("page_update", {"page_id": 7}, key="page:7")
+        self.queue.enqueue("page_update", {"page_id": 7}, key="page:7")
+        self.queue.enqueue("page_update", {"page_id": 8}, key="page:8")
+        first = self.queue.claim()
+        second = self.queue.claim()
+        self.assertEqual(first.payload["page_id"], 7)
+        self.assertEqual(second.payload["page_id"], 8)
+        self.assertIsNone(self.queue.claim())
+
+    def test_running_jobs_resume_after_restart(self):
+        self.queue.enqueue("page_update", {"page_id": 7})
+        self.assertIsNotNone(self.queue.claim())
+        self.queue.close()
+
+        self.queue = JobQueue(self.path, max_attempts=2, debounce=0)
+        self.assertEqual(self.queue.recover(), 1)
+        job = self.queue.claim()
+        self.assertEqual(job.payload["page_id"], 7)
+        self.assertEqual(job.attempts, 2)
+
+    def test_fail_retries_then_gives_up(self):
+        self.queue.enqueue("page_update", {"page_id": 7})
+        job = self.queue.claim()
+        self.queue.fail(job, "boom")
+        self.assertEqual(self.queue.depth(), 1)
+        self.queue._db.execute("UPDATE jobs SET available_at = 0")
+        job = self.queue.claim()
+        self.queue.fail(job, "boom")
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_expired_lease_rejects_stale_worker(self):
+        self.queue.enqueue("page_update", {"page_id": 7}, key="page:7")
+        stale = self.queue.claim()
+        self.queue._db.execute("UPDATE jobs SET lease_until = 0")
+        fresh = self.queue.claim()
+        self.assertEqual(fresh.id, stale.id)
+        self.assertFalse(self.queue.extend_lease(stale))
+        self.assertFalse(self.queue.complete(stale.id, token=stale.token))
+        self.assertFalse(self.queue.fail(stale, "boom"))
+        self.assertEqual(self.queue.depth(), 1)
+        self.assertTrue(self.queue.complete(fresh.id, token=fresh.token))
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_extended_lease_is_not_reclaimed(self):
+        self.queue.enqueue("page_update", {"page_id": 7})
+        job = self.queue.claim()
+        self.queue._db.execute("UPDATE jobs SET lease_until = 0")
+        self.assertTrue(self.queue.extend_lease(job))
+        self.assertIsNone(self.queue.claim())
+
+    def test_worker_pool_renews_lease_of_long_job(self):
+        self.queue.lease = 0.2
+        started, release = threading.Event(), threading.Event()
+
+        def handler(job):
+            started.set()
+            release.wait(5)
+
+        pool = WorkerPool(self.queue, handler, workers=1, poll_interval=0.05, heartbeat_interval=0.05)
+        pool.start()
+        self.queue.enqueue("page_update", {"page_id": 7})
+        self.assertTrue(started.wait(5))
+        time.sleep(0.5)
+        self.assertIsNone(self.queue.claim())
+        release.set()
+        pool.stop(timeout=5)
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_burst_is_coalesced_and_debounced(self):
+        first = self.queue.enqueue("page_update", {"page_id": 7, "langs": ["en"]}, key="page:7", delay=60)
+        second = self.queue.enqueue("page_update", {"page_id": 7, "langs": ["de"]}, key="page:7", delay=60)
+        self.assertEqual(first, second)
+        self.assertEqual(self.queue.depth(), 1)
+        self.assertEqual(self.queue.coalesced, 1)
+        # Fenêtre de calme non écoulée
+        self.assertIsNone(self.queue.claim())
+        self.queue._db.execute("UPDATE jobs SET available_at = 0")
+        self.assertEqual(self.queue.claim().payload["langs"], ["de", "en"])
+
+    def test_stale_event_dropped(self):
+        self.queue.enqueue("page_update", {"page_id": 7, "updated_at": "2024-01-02T10:00:00Z"}, key="page:7")
+        job = self.queue.claim()
+        self.queue.complete(job.id, job.key, job.payload["updated_at"])
+        self.assertIsNone(self.queue.enqueue(
+            "page_update", {"page_id": 7, "updated_at": "2024-01-01T10:00:00Z"}, key="page:7"))
+        self.assertIsNotNone(self.queue.enqueue(
+            "page_update", {"page_id": 7, "updated_at": "2024-01-03T10:00:00Z"}, key="page:7"))
+        self.assertEqual(self.queue.stale, 1)
+
+    def test_merge_payloads(self):
+        merged = merge_payloads({"page_id": 1, "langs": ["en"], "updated_at": "b"}, {"page_id": 1, "updated_at": "a"})
+        self.assertNotIn("langs", merged)
+        self.assertEqual(merged["updated_at"], "b")
+
+    def test_worker_pool_drains_queue(self):
+        done = []
+        finished = threading.Event()
+
+        def handler(job):
+            done.append(job.payload["page_id"])
+            if len(done) == 3:
+                finished.set()
+
+        pool = WorkerPool(self.queue, handler, workers=2, poll_interval=0.05)
+        pool.start()
+        for page_id in (1, 2, 3):
+            self.queue.enqueue("page_update", {"page_id": page_id}, key=f"page:{page_id}")
+        self.assertTrue(finished.wait(5))
+        pool.stop(timeout=5)
+        time.sleep(0.05)
+        self.assertEqual(sorted(done), [1, 2, 3])
+        self.assertEqual(self.queue.depth(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,414 @@
+import sys
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from config import (
+    SYNC_BOOKSTACK_CONCURRENCY,
+    SYNC_TRANSLATE_CONCURRENCY,
+    TARGET_LANGS,
+    LAST_REPORT_FILE,
+    METRICS_SNAPSHOT_FILE,
+    PERF_REPORT_FILE,
+    PERF_TRACEMALLOC,
+)
+from translation.content_hash import content_hash
+from translation.report import SyncReport
+from translation.translate import TranslationError
+from translation.retry_queue import RetryQueue
+from utils import perf
+from utils.metrics import PAGES_SYNCED, PAGE_SYNC_LATENCY, dump_at_exit
+
+
+class _AsyncCaller:
+    """Exécute des appels bloquants dans un pool de threads, sous un plafond de concurrence."""
+
+    def __init__(self, concurrency: int, executor: ThreadPoolExecutor):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor = executor
+
+    async def _call(self, func, *args, **kwargs):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            # Le contexte (trace de performance courante) suit l'appel dans le thread
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+class AsyncBookStackAPI(_AsyncCaller):
+    """Équivalents asynchrones des appels BookStack (livres, chapitres, pages)."""
+
+    def __init__(self, book_api, chapter_api, page_api, concurrency: int, executor: ThreadPoolExecutor):
+        super().__init__(concurrency, executor)
+        self.book_api = book_api
+        self.chapter_api = chapter_api
+        self.page_api = page_api
+
+    async def call(self, func, *args, **kwargs):
+        """Appel bloquant quelconque vers BookStack (rafraîchissement du miroir...)."""
+        return await self._call(func, *args, **kwargs)
+
+    async def get_book(self, book_id):
+        return await self._call(self.book_api.get_book, book_id)
+
+    async def create_book(self, name, description=None):
+        return await self._call(self.book_api.create_book, name, description)
+
+    async def update_book(self, book_id, fields):
+        return await self._call(self.book_api.update_book, book_id, fields)
+
+    async def list_chapters(self, book_id):
+        return await self._call(self.chapter_api.list_chapters, book_id)
+
+    async def create_chapter(self, book_id, name, description=None):
+        return await self._call(self.chapter_api.create_chapter, book_id, name, description)
+
+    async def update_chapter(self, chapter_id, fields):
+        return await self._call(self.chapter_api.update_chapter, chapter_id, fields)
+
+    async def list_pages(self, book_id=None, chapter_id=None):
+        return await self._call(self.page_api.list_pages, book_id=book_id, chapter_id=chapter_id)
+
+    async def get_page(self, page_id):
+        return await self._call(self.page_api.get_page, page_id)
+
+    async def create_page(self, **kwargs):
+        return await self._call(self.page_api.create_page, **kwargs)
+
+    async def update_page(self, page_id, **kwargs):
+        return await self._call(self.page_api.update_page, page_id, **kwargs)
+
+
+class AsyncTranslationService(_AsyncCaller):
+    """Équivalent asynchrone des appels LibreTranslate de TranslationService."""
+
+    def __init__(self, translator, concurrency: int, executor: ThreadPoolExecutor):
+        super().__init__(concurrency, executor)
+        self.translator = translator
+
+    async def translate_text(self, text, target_lang, source_lang=None):
+        return await self._call(self.translator.translate_text, text, target_lang, source_lang)
+
+    async def translate_html(self, html, target_lang, source_lang=None):
+        return await self._call(self.translator.translate_html, html, target_lang, source_lang)
+
+    async def compile_html(self, html):
+        return await self._call(self.translator.compile_html, html)
+
+    async def fill_template(self, template, target_lang, source_lang=None, title=None):
+        return await self._call(self.translator.fill_template, template, target_lang, source_lang, title=title)
+
+    async def detect_language(self, text, cache_key=None):
+        return await self._call(self.translator.detect_language, text, cache_key=cache_key)
+
+
+class AsyncSyncManager:
+    """Moteur de synchronisation asynchrone : les unités page × langue s'exécutent en parallèle.
+
+    Les appels BookStack et LibreTranslate ont chacun leur plafond de concurrence ; le mapping
+    n'est modifié que depuis la boucle d'événements, avec la même sémantique que SyncManager.
+    """
+
+    def __init__(
+        self,
+        sync_manager=None,
+        bookstack_concurrency: int = SYNC_BOOKSTACK_CONCURRENCY,
+        translate_concurrency: int = SYNC_TRANSLATE_CONCURRENCY,
+        report_path: str = LAST_REPORT_FILE,
+        perf_report_path: str = PERF_REPORT_FILE,
+        retry_queue: Optional[RetryQueue] = None,
+        mirror=None
+    ):
+        if sync_manager is None:
+            from translation.context import get_context
+            sync_manager = get_context().sync_manager
+        self.sync = sync_manager
+        self.mapping = sync_manager.mapping
+        # Hiérarchie (livre, chapitres, pages) lue dans le miroir local, comme SyncManager
+        self.mirror = mirror or getattr(sync_manager, "mirror", None) or self.mapping.mirror
+        self.bookstack_concurrency = bookstack_concurrency
+        self.translate_concurrency = translate_concurrency
+        self.report_path = report_path
+        self.perf_report_path = perf_report_path
+        # Même file de reprise que le SyncManager (pages non traduites reprogrammées)
+        self.retry_queue = retry_queue or getattr(sync_manager, "retry_queue", None) or RetryQueue()
+        self.logger = logging.getLogger(__name__)
+
+    def sync_book(self, source_book_id, target_langs: List[str], force: bool = False) -> Optional[SyncReport]:
+        return asyncio.run(self.sync_book_async(source_book_id, target_langs, force))
+
+    def replay_deferred(self, timeout: Optional[float] = None) -> int:
+        """Fin d'une exécution CLI : retraduit les pages reprogrammées (cf. SyncManager.replay_deferred)."""
+        if self.retry_queue is None:
+            return 0
+        options = {} if timeout is None else {"timeout": timeout}
+        remaining = self.retry_queue.drain(lambda page_id, langs: self.sync.sync_page(page_id, langs), **options)
+        self.mapping.flush()
+        return remaining
+
+    async def sync_book_async(self, source_book_id, target_langs: List[str], force: bool = False) -> Optional[SyncReport]:
+        self.sync.ensure_mapping()
+        workers = self.bookstack_concurrency + self.translate_concurrency
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as executor:
+            run = _AsyncBookRun(
+                self,
+                AsyncBookStackAPI(
+                    self.sync.book_api, self.sync.chapter_api, self.sync.page_api,
+                    self.bookstack_concurrency, executor
+                ),
+                AsyncTranslationService(self.sync.translator, self.translate_concurrency, executor),
+                force
+            )
+            return await run.sync_book(source_book_id, target_langs)
+
+
+class _AsyncBookRun:
+    """État d'une synchronisation asynchrone de livre."""
+
+    def __init__(self, manager: AsyncSyncManager, bookstack: AsyncBookStackAPI, translator: AsyncTranslationService, force: bool):
+        self.mapping = manager.mapping
+        self.mirror = manager.mirror
+        self.logger = manager.logger
+        self.report_path = manager.report_path
+        self.perf_report_path = manager.perf_report_path
+        self.retry_queue = manager.retry_queue
+        self.perf_report = None
+        self.bookstack = bookstack
+        self.translator = translator
+        self.force = force
+        # Borne le nombre de pages chargées en mémoire en même temps
+        self.pages_in_flight = asyncio.Semaphore(2 * (manager.bookstack_concurrency + manager.translate_concurrency))
+
+    async def sync_book(self, source_book_id, target_langs: List[str]) -> Optional[SyncReport]:
+        # Rafraîchissement incrémental du miroir (appels BookStack) hors de la boucle d'événements
+        await self.bookstack.call(self.mirror.refresh)
+        book_details = self.mirror.get_book(source_book_id)
+        if not book_details:
+            self.logger.warning(f"[ASYNC] Livre source introuvable : {source_book_id}")
+            return None
+
+        source_chapters = self.mirror.list_chapters(book_details.get('id', source_book_id))
+        source_pages = self.mirror.list_pages(book_id=source_book_id)
+        chapter_names = {ch['id']: ch.get('name', '') for ch in source_chapters}
+
+        report = SyncReport(source_book_id, book_details.get('name', ''), target_langs)
+        if self.perf_report_path:
+            self.perf_report = perf.PerfReport(self.perf_report_path, PERF_TRACEMALLOC).start(
+                engine="async", book_id=source_book_id, book_name=book_details.get('name', ''), target_langs=target_langs
+            )
+        try:
+            # Livres et chapitres d'abord : les unités de page ne font ensuite que lire le mapping
+            with perf.trace() as structure_trace:
+                await asyncio.gather(*(
+                    self._ensure_book_and_chapters(source_book_id, book_details, source_chapters, lang)
+                    for lang in target_langs
+                ))
+            if self.perf_report:
+                self.perf_report.record("structure", structure_trace, book_id=source_book_id)
+
+            results = await asyncio.gather(*(self._sync_page(page['id'], target_langs) for page in source_pages))
+
+            for source_page, page_results in zip(source_pages, results):
+                deferred = [lang for lang, (status, _) in page_results.items() if status == "deferred"]
+                if deferred and self.retry_queue is not None:
+                    self.retry_queue.park(source_page['id'], deferred)
+                chapter_id = source_page.get('chapter_id') or None
+                for lang in target_langs:
+                    status, error = page_results.get(lang, ("failed", None))
+                    report.add_page(
+                        source_page['id'], source_page.get('name', ''), lang, status,
+                        chapter_id, chapter_names.get(chapter_id), error
+                    )
+            self.mapping.flush()
+        finally:
+            if self.perf_report:
+                report.performance = self.perf_report.close(book_id=source_book_id)
+                self.perf_report = None
+        if self.report_path:
+            report.save(self.report_path)
+        return report
+
+    async def _ensure_book_and_chapters(self, source_book_id, book_details, source_chapters, lang):
+        translated_book_id = await self._ensure_book(source_book_id, book_details, lang)
+        if not translated_book_id:
+            return
+        await asyncio.gather(*(
+            self._ensure_chapter(chapter['id'], chapter.get('name', ''), translated_book_id, lang)
+            for chapter in source_chapters
+        ))
+
+    async def _ensure_book(self, source_book_id, book_details, lang):
+        translated_book_id = self.mapping.get_book(source_book_id, lang)
+        source_hash = content_hash(book_details.get('name', ''), book_details.get('description', ''))
+        if translated_book_id and not self.force and self.mapping.is_up_to_date("books", source_book_id, lang, source_hash):
+            return translated_book_id
+
+        try:
+            title, description = await asyncio.gather(
+                self.translator.translate_text(book_details.get('name', ''), lang),
+                self.translator.translate_text(book_details.get('description', ''), lang)
+            )
+        except TranslationError as e:
+            self.logger.error(f"[ASYNC] Livre {source_book_id} non publié pour {lang} : {e}")
+            return translated_book_id
+        if translated_book_id:
+            with perf.stage("publish"):
+                published = await self.bookstack.update_book(translated_book_id, {"name": title, "description": description})
+        else:
+            with perf.stage("publish"):
+                new_book = await self.bookstack.create_book(title, description)
+            published = bool(new_book)
+            if new_book:
+                translated_book_id = new_book.get('id')
+                self.mapping.set_mapped_book(source_book_id, lang, translated_book_id)
+                self.logger.info(f"[ASYNC] Livre créé pour {lang} : ID {translated_book_id}")
+            else:
+                self.logger.error(f"[ASYNC] Échec création livre pour {lang} (source {source_book_id})")
+        if published:
+            self.mapping.set_sync_state("books", source_book_id, lang, source_hash, content_hash(title, description))
+        return translated_book_id
+
+    async def _ensure_chapter(self, source_chapter_id, chapter_name, translated_book_id, lang):
+        translated_chapter_id = self.mapping.get_chapter(source_chapter_id, lang)
+        source_hash = content_hash(chapter_name)
+        if translated_chapter_id and not self.force and self.mapping.is_up_to_date("chapters", source_chapter_id, lang, source_hash):
+            return translated_chapter_id
+
+        try:
+            name = await self.translator.translate_text(chapter_name, lang)
+        except TranslationError as e:
+            self.logger.error(f"[ASYNC] Chapitre {source_chapter_id} non publié pour {lang} : {e}")
+            return translated_chapter_id
+        if translated_chapter_id:
+            with perf.stage("publish"):
+                published = await self.bookstack.update_chapter(translated_chapter_id, {"name": name})
+        else:
+            with perf.stage("publish"):
+                chapter = await self.bookstack.create_chapter(translated_book_id, name)
+            published = bool(chapter)
+            if chapter:
+                translated_chapter_id = chapter.get('id')
+                self.mapping.set_mapped_chapter(source_chapter_id, lang, translated_chapter_id)
+                self.logger.info(f"[ASYNC] Chapitre créé pour {lang} : ID {translated_chapter_id}")
+            else:
+                self.logger.error(f"[ASYNC] Échec création chapitre pour {lang} (source {source_chapter_id})")
+        if published:
+            self.mapping.set_sync_state("chapters", source_chapter_id, lang, source_hash, content_hash(name))
+        return translated_chapter_id
+
+    async def _sync_page(self, source_page_id, target_langs: List[str]) -> dict:
+        """Synchronise une page ; retourne {langue: (statut, erreur)}."""
+        start = time.perf_counter()
+        with perf.trace() as page_trace:
+            results = await self._run_page(source_page_id, target_langs)
+        PAGE_SYNC_LATENCY.observe(time.perf_counter() - start)
+        for lang, (status, _) in results.items():
+            PAGES_SYNCED.inc(lang=lang, status=status)
+        if self.perf_report:
+            self.perf_report.page(source_page_id, page_trace, {lang: status for lang, (status, _) in results.items()})
+        return results
+
+    async def _run_page(self, source_page_id, target_langs: List[str]) -> dict:
+        if self.mapping.get_source_page(source_page_id):
+            return {lang: ("skipped", None) for lang in target_langs}
+        async with self.pages_in_flight:
+            try:
+                with perf.stage("fetch"):
+                    source_page = await self.bookstack.get_page(source_page_id)
+            except Exception as e:
+                self.logger.error(f"[ASYNC] Lecture de la page {source_page_id} impossible : {e}")
+                return {lang: ("failed", str(e)) for lang in target_langs}
+            if not source_page:
+                return {lang: ("failed", "Page source introuvable") for lang in target_langs}
+            self.mirror.upsert("pages", source_page)
+
+            source_hash = content_hash(source_page.get('name', ''), source_page.get('html', ''))
+            results, pending = {}, []
+            for lang in target_langs:
+                if not self.force and self.mapping.is_up_to_date("pages", source_page_id, lang, source_hash):
+                    results[lang] = ("skipped", None)
+                else:
+                    pending.append(lang)
+            if not pending:
+                return results
+
+            with perf.stage("detect"):
+                source_lang = await self.translator.detect_language(
+                    f"{source_page.get('name', '')}\n{source_page.get('html', '')}", cache_key=source_hash
+                )
+            # Page segmentée une seule fois, gabarit rempli pour chaque langue en parallèle
+            template = await self.translator.compile_html(source_page.get('html', ''))
+            statuses = await asyncio.gather(*(
+                self._sync_page_lang(source_page, template, lang, source_lang, source_hash) for lang in pending
+            ))
+            results.update(zip(pending, statuses))
+            return results
+
+    async def _sync_page_lang(self, source_page, template, lang, source_lang, source_hash):
+        if lang == source_lang:
+            return "skipped", None
+        source_page_id = source_page['id']
+        source_book_id = source_page.get('book_id')
+        source_chapter_id = source_page.get('chapter_id') or None
+        with perf.trace(lang):
+            try:
+                name, html = await self.translator.fill_template(
+                    template, lang, source_lang, title=source_page.get('name', '')
+                )
+                target_hash = content_hash(name, html)
+                translated_book_id = self.mapping.get_book(source_book_id, lang)
+                translated_chapter_id = self.mapping.get_chapter(source_chapter_id, lang) if source_chapter_id else None
+                if not translated_book_id or (source_chapter_id and not translated_chapter_id):
+                    return "failed", "Livre ou chapitre traduit manquant"
+
+                existing_page_id = self.mapping.get_page(source_page_id, lang)
+                if existing_page_id:
+                    with perf.stage("publish"):
+                        updated = await self.bookstack.update_page(
+                            existing_page_id, name=name, html=html, lang=lang,
+                            book_id=translated_book_id, chapter_id=translated_chapter_id
+                        )
+                    if not updated:
+                        return "failed", "Échec mise à jour"
+                    self.mapping.set_sync_state("pages", source_page_id, lang, source_hash, target_hash)
+                    return "updated", None
+
+                with perf.stage("publish"):
+                    created = await self.bookstack.create_page(
+                        book_id=translated_book_id, chapter_id=translated_chapter_id,
+                        name=name, html=html, lang=lang, source_page_id=source_page_id
+                    )
+                if not created:
+                    return "failed", "Échec création"
+                self.mapping.set_mapped_page(
+                    source_page_id, lang, created.get('id'), book_id=source_book_id, chapter_id=source_chapter_id
+                )
+                self.mapping.set_sync_state("pages", source_page_id, lang, source_hash, target_hash)
+                self.logger.info(f"[ASYNC] Page créée pour {lang} : ID {created.get('id')}")
+                return "created", None
+            except TranslationError as e:
+                # Le texte source n'est jamais publié : la page est reprogrammée
+                self.logger.error(f"[ASYNC] Page {source_page_id} non publiée pour {lang} : {e}")
+                return "deferred", str(e)
+            except Exception as e:
+                self.logger.exception(f"[ASYNC] Échec de la page {source_page_id} ({lang})")
+                return "failed", str(e)
+
+
+# Exécution directe : python -m translation.async_sync <book_id> [en,de,...]
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if METRICS_SNAPSHOT_FILE:
+        dump_at_exit(None if METRICS_SNAPSHOT_FILE == "-" else METRICS_SNAPSHOT_FILE)
+    book_id = int(sys.argv[1])
+    langs = sys.argv[2].split(",") if len(sys.argv) > 2 else TARGET_LANGS
+    manager = AsyncSyncManager()
+    report = manager.sync_book(book_id, langs)
+    # Pas de travailleur du webhook ici : les pages reprogrammées sont rejouées avant de quitter
+    manager.replay_deferred()
+    if report:
+        print({lang: (s["ok"], s["fail"]) for lang, s in report.summary.items()})
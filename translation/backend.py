@@ -0,0 +1,155 @@
+import time
+import logging
+import threading
+from typing import Callable
+
+import requests
+
+from config import (
+    TRANSLATION_CONCURRENCY_INITIAL,
+    TRANSLATION_CONCURRENCY_MAX,
+    TRANSLATION_LATENCY_TARGET,
+    TRANSLATION_BREAKER_FAILURES,
+    TRANSLATION_BREAKER_COOLDOWN,
+)
+from utils.metrics import BACKEND_CONCURRENCY, BACKEND_IN_FLIGHT, BACKEND_CIRCUIT
+
+# Réponses signalant un serveur saturé ou en erreur
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+# Valeurs de la jauge BACKEND_CIRCUIT
+CIRCUIT_STATES = {"closed": 0, "open": 1, "half_open": 2}
+
+
+class BackendUnavailable(Exception):
+    """Disjoncteur ouvert : le serveur de traduction n'est pas sollicité."""
+
+
+class BackendController:
+    """Régule les requêtes envoyées à un serveur de traduction.
+
+    Le nombre de requêtes simultanées suit une loi AIMD : +1/limite par réponse rapide,
+    divisé par deux (au plus une fois par durée de requête) sur 429, 5xx, expiration,
+    erreur de connexion ou réponse plus lente que TRANSLATION_LATENCY_TARGET × le délai
+    accordé. Après TRANSLATION_BREAKER_FAILURES échecs consécutifs, le disjoncteur s'ouvre :
+    les appels échouent aussitôt (BackendUnavailable) pendant TRANSLATION_BREAKER_COOLDOWN
+    secondes, puis une seule requête d'essai décide de la réouverture ou de la fermeture.
+    """
+
+    def __init__(
+        self,
+        name: str = "libretranslate",
+        initial: int = TRANSLATION_CONCURRENCY_INITIAL,
+        maximum: int = TRANSLATION_CONCURRENCY_MAX,
+        latency_target: float = TRANSLATION_LATENCY_TARGET,
+        failure_threshold: int = TRANSLATION_BREAKER_FAILURES,
+        cooldown: float = TRANSLATION_BREAKER_COOLDOWN
+    ):
+        self.name = name
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.latency_target = latency_target
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.logger = logging.getLogger(__name__)
+        self.in_flight = 0
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._publish()
+
+    def _publish(self):
+        BACKEND_CONCURRENCY.set(self.limit, backend=self.name)
+        BACKEND_IN_FLIGHT.set(self.in_flight, backend=self.name)
+        BACKEND_CIRCUIT.set(CIRCUIT_STATES[self.state], backend=self.name)
+
+    @property
+    def available(self) -> bool:
+        """Faux tant que le disjoncteur est ouvert et que le délai de refroidissement court."""
+        return self.state != "open" or time.monotonic() >= self._opened_at + self.cooldown
+
+    def set_maximum(self, maximum: int):
+        """Change le plafond de requêtes simultanées (la limite courante y est ramenée si besoin)."""
+        with self._condition:
+            self.maximum = max(1, maximum)
+            self.limit = min(self.limit, float(self.maximum))
+            self._publish()
+            self._condition.notify_all()
+
+    def acquire(self):
+        """Attend une place libre ; lève BackendUnavailable si le disjoncteur est ouvert."""
+        with self._condition:
+            while True:
+                if self.state == "open":
+                    remaining = self._opened_at + self.cooldown - time.monotonic()
+                    if remaining > 0:
+                        raise BackendUnavailable(f"Disjoncteur ouvert pour {self.name} (encore {remaining:.0f}s)")
+                    self.state = "half_open"
+                    self.logger.info(f"[BACKEND] {self.name} : requête d'essai.")
+                if self.state == "half_open":
+                    if not self._probing:
+                        self._probing = True
+                        break
+                elif self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(1.0)
+            self.in_flight += 1
+            self._publish()
+
+    def release(self, elapsed: float, ok: bool, overloaded: bool = False, timeout: float = 0.0):
+        """Rend la place et ajuste la limite selon l'issue de la requête."""
+        with self._condition:
+            self.in_flight -= 1
+            self._probing = False
+            slow = bool(timeout) and elapsed > self.latency_target * timeout
+            if ok:
+                self.failures = 0
+                if self.state != "closed":
+                    self.state = "closed"
+                    self.logger.info(f"[BACKEND] {self.name} rétabli, disjoncteur fermé.")
+                if not slow:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            else:
+                self.failures += 1
+                if self.state == "half_open" or self.failures >= self.failure_threshold:
+                    if self.state != "open":
+                        self.logger.error(
+                            f"[BACKEND] {self.name} indisponible ({self.failures} échecs), disjoncteur ouvert."
+                        )
+                    self.state = "open"
+                    self._opened_at = time.monotonic()
+            if overloaded or slow:
+                now = time.monotonic()
+                if now - self._last_decrease > elapsed:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+            self._publish()
+            self._condition.notify_all()
+
+    def call(self, func: Callable[[], requests.Response], timeout: float = 0.0) -> requests.Response:
+        """Exécute func() (une requête HTTP) sous la limite et enregistre son issue."""
+        self.acquire()
+        start = time.perf_counter()
+        ok, overloaded = True, False
+        try:
+            response = func()
+            overloaded = response.status_code in OVERLOAD_STATUSES
+            ok = not overloaded
+            return response
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            ok, overloaded = False, True
+            raise
+        finally:
+            self.release(time.perf_counter() - start, ok, overloaded, timeout)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "backend": self.name,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "state": self.state,
+                "consecutive_failures": self.failures
+            }
@@ -0,0 +1,167 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from config import SYNC_CHECKPOINT_FILE
+from translation.report import SUCCESS_STATUSES
+from utils.file import ensure_directory
+
+
+class BookCheckpoint:
+    """Progression d'une exécution de sync_book : une unité par (page source, langue).
+
+    Une unité terminée (created, updated, skipped) n'est plus retraitée par une reprise tant
+    que la page n'a pas changé (même updated_at dans le miroir) ; les unités en échec ou
+    reprogrammées le sont.
+    """
+
+    def __init__(self, journal: "SyncCheckpoint", run_id: int, resumed: bool, units: Dict[int, Dict[str, tuple]]):
+        self.journal = journal
+        self.run_id = run_id
+        self.resumed = resumed
+        # page -> {langue: (statut, empreinte source, updated_at)}
+        self.units = units
+        # Unités en échec pendant cette exécution (le journal reste alors ouvert)
+        self.failures = 0
+
+    def completed(self, page_id, revision: Optional[str]) -> Set[str]:
+        """Langues déjà traduites pour cette version de la page lors de l'exécution interrompue."""
+        if not revision:
+            return set()
+        return {
+            lang for lang, (status, _, unit_revision) in self.units.get(int(page_id), {}).items()
+            if status in SUCCESS_STATUSES and unit_revision == revision
+        }
+
+    def record(self, page_id, results: dict, source_hash: Optional[str], revision: Optional[str]):
+        """Enregistre l'issue de chaque langue d'une page (validée aussitôt sur disque)."""
+        page_id = int(page_id)
+        rows = []
+        for lang, status in results.items():
+            self.units.setdefault(page_id, {})[lang] = (status, source_hash, revision)
+            rows.append((self.run_id, page_id, lang, status, source_hash, revision, time.time()))
+            if status not in SUCCESS_STATUSES:
+                self.failures += 1
+        self.journal.write_units(rows)
+
+    def finish(self):
+        """Fin de l'exécution : clôt le journal si tout est traduit, le garde à reprendre sinon."""
+        self.journal.finish(self.run_id, complete=not self.failures)
+
+
+class SyncCheckpoint:
+    """Journal durable (SQLite sous DB_DIR) des exécutions de sync_book en cours.
+
+    Chaque page et langue traitée est enregistrée avec son statut, l'empreinte du contenu
+    source et sa version (updated_at). Si le processus s'arrête (plantage, déploiement,
+    manque de mémoire), la synchronisation suivante du même livre reprend l'exécution
+    interrompue : les unités terminées sont ignorées sans relire la page, seules les autres
+    sont retraitées. Une exécution entièrement réussie est close et ses unités effacées.
+    La base n'est ouverte qu'à la première exécution.
+    """
+
+    def __init__(self, path: str = SYNC_CHECKPOINT_FILE):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.path != ":memory:":
+                ensure_directory(os.path.dirname(self.path))
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " book_id INTEGER NOT NULL,"
+                " target_langs TEXT NOT NULL,"
+                " force INTEGER NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'running',"
+                " started_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS units ("
+                " run_id INTEGER NOT NULL,"
+                " page_id INTEGER NOT NULL,"
+                " lang TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " source_hash TEXT,"
+                " revision TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (run_id, page_id, lang))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS runs_book ON runs (book_id, status)")
+        return self._db
+
+    def begin(self, book_id, target_langs: Iterable[str], force: bool = False) -> BookCheckpoint:
+        """Reprend l'exécution inachevée du livre (même option force) ou en commence une."""
+        langs = ",".join(sorted(set(target_langs)))
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT id FROM runs WHERE book_id = ? AND force = ? AND status != 'completed'"
+                " ORDER BY id DESC LIMIT 1",
+                (int(book_id), int(force))
+            ).fetchone()
+            if row:
+                run_id = row[0]
+                db.execute(
+                    "UPDATE runs SET status = 'running', target_langs = ?, updated_at = ? WHERE id = ?",
+                    (langs, now, run_id)
+                )
+                units = {}
+                for page_id, lang, status, source_hash, revision in db.execute(
+                    "SELECT page_id, lang, status, source_hash, revision FROM units WHERE run_id = ?", (run_id,)
+                ):
+                    units.setdefault(page_id, {})[lang] = (status, source_hash, revision)
+            else:
+                run_id = db.execute(
+                    "INSERT INTO runs (book_id, target_langs, force, started_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (int(book_id), langs, int(force), now, now)
+                ).lastrowid
+                units = {}
+        checkpoint = BookCheckpoint(self, run_id, bool(row), units)
+        if checkpoint.resumed:
+            statuses = [unit[0] for langs in units.values() for unit in langs.values()]
+            done = sum(1 for status in statuses if status in SUCCESS_STATUSES)
+            self.logger.info(
+                f"[CHECKPOINT] Livre {book_id} : reprise de l'exécution {run_id} "
+                f"({done} unités terminées, {len(statuses) - done} à reprendre)."
+            )
+        return checkpoint
+
+    def write_units(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            db.executemany("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            db.execute("UPDATE runs SET updated_at = ? WHERE id = ?", (time.time(), rows[0][0]))
+            db.execute("COMMIT")
+
+    def finish(self, run_id: int, complete: bool):
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            db.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE id = ?",
+                ("completed" if complete else "incomplete", time.time(), run_id)
+            )
+            if complete:
+                db.execute("DELETE FROM units WHERE run_id = ?", (run_id,))
+            db.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
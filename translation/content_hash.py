@@ -0,0 +1,22 @@
+import re
+import hashlib
+
+# BookStack régénère les ancres "bkmrk-..." à chaque sauvegarde : elles ne comptent pas comme un changement
+_BOOKMARK_ID_RE = re.compile(r'\s+id\s*=\s*(["\'])bkmrk-[^"\']*\1', re.IGNORECASE)
+_BOOKMARK_REF_RE = re.compile(r'#bkmrk-[\w-]*', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+_BETWEEN_TAGS_RE = re.compile(r'>\s+<')
+
+
+def normalize_html(html: str) -> str:
+    """Retire le balisage volatil de BookStack et uniformise les espaces."""
+    html = _BOOKMARK_ID_RE.sub('', html or '')
+    html = _BOOKMARK_REF_RE.sub('#bkmrk', html)
+    html = _BETWEEN_TAGS_RE.sub('><', html)
+    return _WHITESPACE_RE.sub(' ', html).strip()
+
+
+def content_hash(name: str, html: str = '') -> str:
+    """Empreinte normalisée d'un contenu (nom + HTML)."""
+    normalized = f"{' '.join((name or '').split())}\x1f{normalize_html(html)}"
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
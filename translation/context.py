@@ -0,0 +1,138 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from config import MAPPING_FILE, TRANSLATION_MEMORY_ENABLED
+
+
+class SyncContext:
+    """Contexte de synchronisation durable, partagé par tout le processus.
+
+    Chaque service (client HTTP, mémoire de traduction, APIs BookStack, miroir, mapping, SyncManager)
+    est construit à la première utilisation puis réutilisé ; rien n'est fait à l'import ni à
+    la création du contexte. Le mapping n'est relu que si ses fichiers ont changé sur disque.
+    Les temps de construction sont exposés dans `timings` (millisecondes).
+    services permet de fournir des instances déjà construites (tests, bancs d'essai).
+    """
+
+    def __init__(self, mapping_path: str = MAPPING_FILE, services: Optional[dict] = None):
+        self.mapping_path = mapping_path
+        self.logger = logging.getLogger(__name__)
+        self.timings: Dict[str, float] = {}
+        self._services = dict(services or {})
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory):
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        with self._lock:
+            service = self._services.get(name)
+            if service is None:
+                start = time.perf_counter()
+                service = factory()
+                self.timings[name] = (time.perf_counter() - start) * 1000
+                self.logger.info(f"[CONTEXT] {name} construit en {self.timings[name]:.1f} ms.")
+                self._services[name] = service
+            return service
+
+    @property
+    def http_client(self):
+        from api.client import get_http_client
+        return self._get("http_client", get_http_client)
+
+    @property
+    def translation_memory(self):
+        from translation.memory import TranslationMemory
+        return self._get("translation_memory", TranslationMemory) if TRANSLATION_MEMORY_ENABLED else None
+
+    @property
+    def translator(self):
+        from translation.translate import TranslationService
+        return self._get("translator", lambda: TranslationService(
+            memory=self.translation_memory, http_client=self.http_client
+        ))
+
+    @property
+    def book_api(self):
+        from api.books import BookStackBooksAPI
+        return self._get("book_api", lambda: BookStackBooksAPI(client=self.http_client))
+
+    @property
+    def chapter_api(self):
+        from api.chapters import BookStackChaptersAPI
+        return self._get("chapter_api", lambda: BookStackChaptersAPI(client=self.http_client))
+
+    @property
+    def page_api(self):
+        from api.pages import BookStackPagesAPI
+        return self._get("page_api", lambda: BookStackPagesAPI(client=self.http_client))
+
+    @property
+    def mirror(self):
+        from api.mirror import BookStackMirror
+        return self._get("mirror", lambda: BookStackMirror(
+            book_api=self.book_api, chapter_api=self.chapter_api, page_api=self.page_api
+        ))
+
+    @property
+    def mapping(self):
+        """MappingManager partagé, rechargé si mapping.json ou son journal ont été modifiés ailleurs."""
+        from api.mapping import MappingManager
+        mapping = self._get("mapping", lambda: MappingManager(
+            self.mapping_path,
+            book_api=self.book_api,
+            chapter_api=self.chapter_api,
+            page_api=self.page_api,
+            translation_service=self.translator,
+            mirror=self.mirror
+        ))
+        mapping.reload_if_changed()
+        return mapping
+
+    @property
+    def sync_manager(self):
+        from translation.sync import SyncManager
+        mapping = self.mapping
+        return self._get("sync_manager", lambda: SyncManager(
+            translator=self.translator,
+            mapping=mapping,
+            book_api=self.book_api,
+            chapter_api=self.chapter_api,
+            page_api=self.page_api,
+            mirror=self.mirror
+        ))
+
+    def close(self):
+        """Vide le mapping et ferme la mémoire de traduction et le miroir."""
+        with self._lock:
+            mapping = self._services.get("mapping")
+            if mapping is not None:
+                mapping.flush()
+            for name in ("translation_memory", "mirror"):
+                service = self._services.get(name)
+                if service is not None:
+                    service.close()
+            self._services.clear()
+
+
+_context: Optional[SyncContext] = None
+_context_lock = threading.Lock()
+
+
+def get_context() -> SyncContext:
+    """Contexte unique du processus (créé à la première demande)."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = SyncContext()
+    return _context
+
+
+def set_context(context: Optional[SyncContext]):
+    """Remplace le contexte du processus (None : reconstruit à la prochaine demande)."""
+    global _context
+    with _context_lock:
+        _context = context
@@ -0,0 +1,112 @@
+import logging
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from translation.memory import normalize_segment, split_whitespace
+from translation.html_segmenter import PageTemplate, render
+from translation.translate import TranslationError
+from utils import perf
+
+
+class SegmentDictionary:
+    """Traductions partagées d'un livre : chaque segment unique est traduit une fois par langue.
+
+    Les segments des pages (titres compris) sont dédoublonnés par texte normalisé ; les
+    pages sont ensuite reconstruites à partir du dictionnaire, sans appel supplémentaire.
+    Seul le dictionnaire est conservé d'un lot de pages à l'autre.
+    """
+
+    def __init__(self, translator):
+        self.translator = translator
+        self.logger = logging.getLogger(__name__)
+        self._translations = defaultdict(dict)  # (source, cible) -> {segment normalisé: traduction}
+        self._pending = defaultdict(dict)       # (source, cible) -> segments à traduire (ordonnés)
+        self._failed = defaultdict(set)         # (source, cible) -> segments dont la traduction a échoué
+        self._seen = set()
+        self.segments = 0
+        self.unique_segments = 0
+        self.characters = 0
+        self.unique_characters = 0
+
+    @staticmethod
+    def _texts(template: PageTemplate, title: Optional[str]) -> Iterable[str]:
+        if title is not None:
+            yield title
+        for window in template.windows:
+            yield from window.texts
+
+    def add(self, template: PageTemplate, source_lang: str, target_langs: List[str], title: Optional[str] = None):
+        """Enregistre les segments d'une page à traduire dans target_langs."""
+        for text in self._texts(template, title):
+            key = normalize_segment(text)
+            if not key:
+                continue
+            self.segments += 1
+            self.characters += len(key)
+            if (source_lang, key) not in self._seen:
+                self._seen.add((source_lang, key))
+                self.unique_segments += 1
+                self.unique_characters += len(key)
+            for lang in target_langs:
+                if key not in self._translations[(source_lang, lang)]:
+                    self._pending[(source_lang, lang)][key] = None
+
+    def translate(self):
+        """Traduit les segments en attente, toutes langues en parallèle pour une même source."""
+        by_source = defaultdict(dict)
+        for (source_lang, lang), keys in self._pending.items():
+            by_source[source_lang][lang] = list(keys)
+        self._pending.clear()
+        for source_lang, keys_by_lang in by_source.items():
+            self.logger.info(
+                f"[DEDUP] {sum(map(len, keys_by_lang.values()))} segments uniques à traduire ({source_lang})"
+            )
+            results = self.translator.batch_translate_many(keys_by_lang, source_lang)
+            for lang, translations in results.items():
+                known, failed = self._translations[(source_lang, lang)], self._failed[(source_lang, lang)]
+                for key, translated in zip(keys_by_lang[lang], translations):
+                    if translated is None:
+                        failed.add(key)
+                        continue
+                    failed.discard(key)
+                    # Un segment resté identique (échec ou nom propre) sera redemandé au lot suivant
+                    if translated != key:
+                        known[key] = translated
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> str:
+        lead, core, trail = split_whitespace(text)
+        translated = self._translations[(source_lang, target_lang)].get(normalize_segment(core)) if core else None
+        return lead + translated + trail if translated is not None else text
+
+    def fill(
+        self,
+        template: PageTemplate,
+        target_lang: str,
+        source_lang: str,
+        title: Optional[str] = None
+    ) -> Tuple[Optional[str], str]:
+        """Reconstruit une page traduite depuis le dictionnaire ; retourne (titre, HTML).
+
+        TranslationError est levée si un segment de la page n'a pu être traduit.
+        """
+        failed = self._failed[(source_lang, target_lang)]
+        if failed:
+            missing = [text for text in self._texts(template, title) if normalize_segment(text) in failed]
+            if missing:
+                raise TranslationError(missing)
+        with perf.stage("serialize"):
+            html = "".join(
+                render(window, [self.lookup(text, source_lang, target_lang) for text in window.texts])
+                for window in template.windows
+            )
+        return (self.lookup(title, source_lang, target_lang) if title is not None else None), html
+
+    def stats(self) -> dict:
+        """Volumes avant / après dédoublonnage ; dedup_ratio = part des caractères évités."""
+        return {
+            "segments": self.segments,
+            "unique_segments": self.unique_segments,
+            "characters": self.characters,
+            "unique_characters": self.unique_characters,
+            "dedup_ratio": round(1 - self.unique_characters / self.characters, 4) if self.characters else 0.0
+        }
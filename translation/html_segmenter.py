@@ -0,0 +1,146 @@
+import re
+import html as html_lib
+from typing import Iterator, List, NamedTuple, Tuple, Union
+
+# Éléments dont le contenu n'est jamais traduit
+SKIPPED_ELEMENTS = frozenset({"code", "pre", "script", "style"})
+# Éléments à contenu brut : le texte n'est pas découpé en balises jusqu'à la balise fermante
+RAW_TEXT_ELEMENTS = frozenset({"script", "style"})
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+})
+
+_MARKUP = re.compile(
+    r"<!--.*?(?:-->|\Z)"                                # commentaire
+    r"|<!\[CDATA\[.*?(?:\]\]>|\Z)"                      # section CDATA
+    r"|<[!?][^>]*>"                                     # doctype, instruction de traitement
+    r"|</?([A-Za-z][\w:.-]*)((?:\"[^\"]*\"|'[^']*'|[^'\">])*)>",  # balise ouvrante ou fermante
+    re.DOTALL
+)
+_NO_TRANSLATE = re.compile(
+    r"""\btranslate\s*=\s*["']?no\b|\bclass\s*=\s*(?:"[^"]*|'[^']*|)\bnotranslate\b""",
+    re.IGNORECASE
+)
+_RAW_TEXT_END = {name: re.compile(rf"</{name}\s*>", re.IGNORECASE) for name in RAW_TEXT_ELEMENTS}
+
+
+def iter_segments(html: str) -> Iterator[Tuple[str, bool]]:
+    """Découpe un fragment HTML en morceaux (texte brut, traduisible), dans l'ordre du document.
+
+    Un seul passage, sans arbre : balises, commentaires, espaces et contenu des éléments
+    non traduisibles (code, pre, script, style, translate="no", class="notranslate") sont
+    non traduisibles. La concaténation des morceaux redonne exactement le HTML d'entrée.
+    """
+    pos, length = 0, len(html)
+    skipped = []  # éléments ouverts depuis le premier élément non traduisible
+    while pos < length:
+        # Texte jusqu'à la prochaine balise reconnue (un « < » isolé reste du texte)
+        lt, match = html.find("<", pos), None
+        while lt >= 0:
+            match = _MARKUP.match(html, lt)
+            if match:
+                break
+            lt = html.find("<", lt + 1)
+        if lt < 0:
+            lt = length
+        if lt > pos:
+            text = html[pos:lt]
+            yield text, not skipped and not text.isspace()
+        if match is None:
+            return
+
+        yield match.group(0), False
+        pos = match.end()
+        name = match.group(1)
+        if not name:
+            continue
+        name = name.lower()
+        if match.group(0)[1] == "/":
+            if name in skipped:
+                while skipped.pop() != name:
+                    pass
+            continue
+        attrs = match.group(2) or ""
+        if name in VOID_ELEMENTS or attrs.rstrip().endswith("/"):
+            continue
+        if name in RAW_TEXT_ELEMENTS:
+            end = _RAW_TEXT_END[name].search(html, pos)
+            stop = end.start() if end else length
+            if stop > pos:
+                yield html[pos:stop], False
+            if end:
+                yield end.group(0), False
+            pos = end.end() if end else length
+            continue
+        if skipped or name in SKIPPED_ELEMENTS or _NO_TRANSLATE.search(attrs):
+            skipped.append(name)
+
+
+class Window(NamedTuple):
+    """Portion d'un document : morceaux bruts et indices des textes à traduire."""
+    pieces: List[Union[str, int]]
+    raw: List[str]
+    texts: List[str]
+
+
+def iter_windows(html: str, max_chars: int = 100000) -> Iterator[Window]:
+    """Regroupe les segments en fenêtres d'au plus ~max_chars caractères de texte.
+
+    Seule la fenêtre courante est gardée en mémoire ; chaque texte est désentitisé
+    (&amp; -> &) avant traduction.
+    """
+    pieces, raw, texts, size = [], [], [], 0
+    for chunk, translatable in iter_segments(html):
+        if not translatable:
+            pieces.append(chunk)
+            continue
+        pieces.append(len(texts))
+        raw.append(chunk)
+        texts.append(html_lib.unescape(chunk))
+        size += len(chunk)
+        if size >= max_chars:
+            yield Window(pieces, raw, texts)
+            pieces, raw, texts, size = [], [], [], 0
+    if pieces:
+        yield Window(pieces, raw, texts)
+
+
+def render(window: Window, translations: List[str]) -> str:
+    """Réécrit une fenêtre ; les textes non modifiés par la traduction restent octet pour octet."""
+    out = []
+    for piece in window.pieces:
+        if isinstance(piece, str):
+            out.append(piece)
+        elif translations[piece] == window.texts[piece]:
+            out.append(window.raw[piece])
+        else:
+            out.append(html_lib.escape(translations[piece], quote=False))
+    return "".join(out)
+
+
+class PageTemplate(NamedTuple):
+    """Page compilée une seule fois : squelette et segments, à remplir pour chaque langue."""
+    windows: List[Window]
+
+    @property
+    def segments(self) -> int:
+        return sum(len(window.texts) for window in self.windows)
+
+
+def compile_template(html: str, max_chars: int = 100000) -> PageTemplate:
+    """Segmente une page une fois pour toutes (les fenêtres restent réutilisables)."""
+    return PageTemplate(list(iter_windows(html, max_chars)) or [Window([], [], [])])
+
+
+def visible_text(html: str, max_chars: int) -> str:
+    """Texte traduisible d'un fragment HTML, espaces normalisés, limité à max_chars."""
+    parts, size = [], 0
+    for chunk, translatable in iter_segments(html):
+        if translatable:
+            text = " ".join(html_lib.unescape(chunk).split())
+            parts.append(text)
+            size += len(text) + 1
+            if size >= max_chars:
+                break
+    return " ".join(parts)[:max_chars]
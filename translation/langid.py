@@ -0,0 +1,149 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from translation.html_segmenter import visible_text
+
+# Textes d'amorce servant à construire les profils de trigrammes (vocabulaire courant et
+# documentaire, proche des pages BookStack).
+SEED_TEXTS = {
+    "fr": (
+        "Cette page décrit la procédure à suivre pour installer et configurer le logiciel sur votre poste. "
+        "Avant de commencer, vérifiez que vous disposez des droits nécessaires et que le serveur est accessible. "
+        "Les utilisateurs peuvent ensuite créer des documents, les modifier et les partager avec leur équipe. "
+        "En cas de problème, consultez la section dédiée aux questions fréquentes ou contactez le support. "
+        "Il est recommandé de sauvegarder les données chaque jour afin de ne pas perdre les informations "
+        "importantes. Le tableau ci-dessous présente les principales étapes ainsi que les responsables de "
+        "chaque tâche. Nous avons mis à jour ce guide pour tenir compte des dernières évolutions de "
+        "l'application et des retours des utilisateurs. Une fois la mise à jour terminée, redémarrez le "
+        "service et vérifiez que tout fonctionne correctement."
+    ),
+    "en": (
+        "This page describes the procedure to follow in order to install and configure the software on your "
+        "computer. Before you start, make sure that you have the required permissions and that the server is "
+        "reachable. Users can then create documents, edit them and share them with their team. If you have a "
+        "problem, read the section about frequently asked questions or contact the support team. It is "
+        "recommended to back up the data every day so that important information is never lost. The table "
+        "below shows the main steps and the people who are responsible for each task. We have updated this "
+        "guide to reflect the latest changes to the application and the feedback we received from users. "
+        "When the update is finished, restart the service and check that everything works as expected."
+    ),
+    "de": (
+        "Diese Seite beschreibt das Verfahren, mit dem die Software auf Ihrem Rechner installiert und "
+        "konfiguriert wird. Bevor Sie beginnen, prüfen Sie, ob Sie über die nötigen Rechte verfügen und ob der "
+        "Server erreichbar ist. Die Benutzer können anschließend Dokumente erstellen, bearbeiten und mit ihrem "
+        "Team teilen. Bei Problemen lesen Sie den Abschnitt mit den häufig gestellten Fragen oder wenden Sie "
+        "sich an den Support. Es wird empfohlen, die Daten jeden Tag zu sichern, damit keine wichtigen "
+        "Informationen verloren gehen. Die folgende Tabelle zeigt die wichtigsten Schritte und die "
+        "Verantwortlichen für jede Aufgabe. Wir haben diese Anleitung aktualisiert, um die neuesten "
+        "Änderungen der Anwendung und die Rückmeldungen der Benutzer zu berücksichtigen. Nach der "
+        "Aktualisierung starten Sie den Dienst neu und prüfen, ob alles richtig funktioniert."
+    ),
+    "es": (
+        "Esta página describe el procedimiento que se debe seguir para instalar y configurar el programa en "
+        "su equipo. Antes de empezar, compruebe que dispone de los permisos necesarios y que el servidor es "
+        "accesible. Los usuarios pueden entonces crear documentos, modificarlos y compartirlos con su equipo. "
+        "Si tiene algún problema, consulte la sección de preguntas frecuentes o póngase en contacto con el "
+        "soporte. Se recomienda hacer una copia de seguridad de los datos todos los días para no perder la "
+        "información importante. La tabla siguiente muestra los pasos principales y los responsables de cada "
+        "tarea. Hemos actualizado esta guía para tener en cuenta los últimos cambios de la aplicación y los "
+        "comentarios de los usuarios. Cuando termine la actualización, reinicie el servicio y compruebe que "
+        "todo funciona correctamente."
+    ),
+    "it": (
+        "Questa pagina descrive la procedura da seguire per installare e configurare il programma sul vostro "
+        "computer. Prima di iniziare, verificate di avere i permessi necessari e che il server sia "
+        "raggiungibile. Gli utenti possono quindi creare documenti, modificarli e condividerli con la propria "
+        "squadra. In caso di problemi, consultate la sezione delle domande frequenti oppure contattate "
+        "l'assistenza. Si consiglia di salvare i dati ogni giorno per non perdere le informazioni importanti. "
+        "La tabella qui sotto mostra le fasi principali e i responsabili di ogni attività. Abbiamo aggiornato "
+        "questa guida per tenere conto delle ultime modifiche dell'applicazione e dei commenti degli utenti. "
+        "Al termine dell'aggiornamento, riavviate il servizio e verificate che tutto funzioni correttamente."
+    ),
+    "pt": (
+        "Esta página descreve o procedimento a seguir para instalar e configurar o programa no seu "
+        "computador. Antes de começar, verifique se tem as permissões necessárias e se o servidor está "
+        "acessível. Os utilizadores podem então criar documentos, editá-los e partilhá-los com a sua equipa. "
+        "Em caso de problema, consulte a secção de perguntas frequentes ou contacte o suporte. Recomenda-se "
+        "fazer uma cópia de segurança dos dados todos os dias para não perder informações importantes. A "
+        "tabela abaixo apresenta as principais etapas e os responsáveis por cada tarefa. Atualizámos este "
+        "guia para ter em conta as últimas alterações da aplicação e os comentários dos utilizadores. "
+        "Quando a atualização terminar, reinicie o serviço e verifique se tudo funciona corretamente."
+    ),
+    "nl": (
+        "Deze pagina beschrijft de procedure om de software op uw computer te installeren en te configureren. "
+        "Controleer voordat u begint of u de juiste rechten hebt en of de server bereikbaar is. Gebruikers "
+        "kunnen daarna documenten maken, bewerken en delen met hun team. Als er een probleem is, lees dan het "
+        "gedeelte met veelgestelde vragen of neem contact op met de ondersteuning. Het wordt aanbevolen om de "
+        "gegevens elke dag te bewaren zodat er geen belangrijke informatie verloren gaat. De onderstaande "
+        "tabel toont de belangrijkste stappen en de verantwoordelijken voor elke taak. We hebben deze "
+        "handleiding bijgewerkt om rekening te houden met de laatste wijzigingen van de toepassing en de "
+        "reacties van de gebruikers. Start na de update de dienst opnieuw en controleer of alles goed werkt."
+    ),
+}
+
+_NON_LETTERS = re.compile(r"[^\w']+|[\d_]+")
+
+
+def sample_visible_text(html: str, max_chars: int = 2000) -> str:
+    """Texte visible d'un fragment HTML (sans code, scripts ni balises), limité à max_chars."""
+    if not html:
+        return ""
+    return visible_text(html, max_chars)
+
+
+def trigrams(text: str) -> Counter:
+    """Trigrammes de caractères des mots (en minuscules, bordés d'espaces)."""
+    counts = Counter()
+    for word in _NON_LETTERS.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+    return counts
+
+
+def _normalize(counts: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {gram: v / norm for gram, v in counts.items()}
+
+
+class LanguageIdentifier:
+    """Identification de langue hors ligne par profils de trigrammes (similarité cosinus).
+
+    La confiance est l'écart relatif entre les deux meilleures langues ; un texte trop court
+    a une confiance nulle.
+    """
+
+    def __init__(
+        self,
+        languages: Optional[Iterable[str]] = None,
+        seed_texts: Optional[Dict[str, str]] = None,
+        profile_size: int = 400,
+        min_letters: int = 20
+    ):
+        seed_texts = seed_texts or SEED_TEXTS
+        langs = [lang for lang in (languages or seed_texts) if lang in seed_texts]
+        self.min_letters = min_letters
+        self.profiles = {}
+        for lang in langs:
+            top = trigrams(seed_texts[lang]).most_common(profile_size)
+            self.profiles[lang] = _normalize(dict(top))
+
+    def scores(self, text: str) -> Dict[str, float]:
+        vector = _normalize(trigrams(text))
+        return {
+            lang: sum(weight * profile.get(gram, 0.0) for gram, weight in vector.items())
+            for lang, profile in self.profiles.items()
+        }
+
+    def identify(self, text: str) -> Tuple[Optional[str], float]:
+        """Retourne (langue, confiance entre 0 et 1) ; (None, 0.0) si rien n'est identifiable."""
+        if not self.profiles or sum(c.isalpha() for c in text) < self.min_letters:
+            return None, 0.0
+        ranked = sorted(self.scores(text).items(), key=lambda item: item[1], reverse=True)
+        best_lang, best = ranked[0]
+        if best <= 0:
+            return None, 0.0
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        return best_lang, (best - second) / best
@@ -0,0 +1,224 @@
+import os
+import time
+import sqlite3
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, Tuple
+
+from config import (
+    TRANSLATION_MEMORY_FILE,
+    TRANSLATION_MEMORY_LRU_SIZE,
+    TRANSLATION_MEMORY_MAX_ENTRIES,
+)
+from utils.file import ensure_directory
+
+
+def normalize_segment(text: str) -> str:
+    """Normalise un segment pour la clé de cache (espaces réduits, bords retirés)."""
+    return " ".join(text.split())
+
+
+def split_whitespace(text: str) -> Tuple[str, str, str]:
+    """Sépare un texte en (espaces de tête, contenu, espaces de fin)."""
+    core = text.strip()
+    if not core:
+        return text, "", ""
+    start = text.index(core)
+    return text[:start], core, text[start + len(core):]
+
+
+# Clés lues par requête SELECT ... IN (...) (sous la limite de variables de SQLite)
+LOOKUP_BATCH = 500
+
+
+class TranslationMemory:
+    """Mémoire de traduction à deux niveaux : LRU en mémoire + stockage SQLite sous DB_DIR.
+
+    Les entrées sont indexées par (texte normalisé, langue source, langue cible, moteur).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = TRANSLATION_MEMORY_FILE,
+        lru_size: int = TRANSLATION_MEMORY_LRU_SIZE,
+        max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.lru_size = lru_size
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._disk_count = 0
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        try:
+            ensure_directory(os.path.dirname(path))
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS memory ("
+                " key TEXT PRIMARY KEY,"
+                " source_lang TEXT NOT NULL,"
+                " target_lang TEXT NOT NULL,"
+                " engine TEXT NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS memory_pair ON memory (source_lang, target_lang)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"[MEMORY] Stockage disque indisponible ({path}) : {e}")
+            self._db = None
+
+    @staticmethod
+    def _key(text: str, source_lang: str, target_lang: str, engine: str) -> str:
+        raw = "\x1f".join((source_lang, target_lang, engine, text))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, translation: str):
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str, source_lang: str, target_lang: str, engine: str) -> Optional[str]:
+        """Retourne la traduction mémorisée du segment, ou None."""
+        return self.get_many([text], source_lang, target_lang, engine).get(text)
+
+    def get_many(self, texts: Iterable[str], source_lang: str, target_lang: str, engine: str) -> Dict[str, str]:
+        """Retourne {texte: traduction} pour les segments déjà présents en mémoire.
+
+        Les segments absents du LRU sont lus sur disque en une requête par lot de
+        LOOKUP_BATCH clés, et leur last_used mis à jour en une seule transaction.
+        """
+        keys = {text: self._key(normalize_segment(text), source_lang, target_lang, engine) for text in texts}
+        found = {}
+        with self._lock:
+            missing = {}
+            for text, key in keys.items():
+                translation = self._lru.get(key)
+                if translation is not None:
+                    self._lru.move_to_end(key)
+                    found[text] = translation
+                else:
+                    missing.setdefault(key, []).append(text)
+            self.hits += len(found)
+            if missing and self._db is not None:
+                on_disk = {}
+                pending = list(missing)
+                for start in range(0, len(pending), LOOKUP_BATCH):
+                    batch = pending[start:start + LOOKUP_BATCH]
+                    on_disk.update(self._db.execute(
+                        f"SELECT key, translation FROM memory WHERE key IN ({', '.join('?' * len(batch))})", batch
+                    ).fetchall())
+                if on_disk:
+                    now = time.time()
+                    self._db.executemany("UPDATE memory SET last_used = ? WHERE key = ?",
+                                         [(now, key) for key in on_disk])
+                    self._db.commit()
+                    for key, translation in on_disk.items():
+                        self._remember(key, translation)
+                        for text in missing.pop(key):
+                            found[text] = translation
+                            self.hits += 1
+                            self.disk_hits += 1
+            self.misses += sum(len(texts) for texts in missing.values())
+        return found
+
+    def set(self, text: str, source_lang: str, target_lang: str, engine: str, translation: str):
+        self.set_many({text: translation}, source_lang, target_lang, engine)
+
+    def set_many(self, translations: Dict[str, str], source_lang: str, target_lang: str, engine: str):
+        """Enregistre plusieurs traductions pour une même paire de langues."""
+        if not translations:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, translation in translations.items():
+                key = self._key(normalize_segment(text), source_lang, target_lang, engine)
+                self._remember(key, translation)
+                rows.append((key, source_lang, target_lang, engine, translation, len(text) + len(translation), now))
+            if self._db is None:
+                return
+            try:
+                before = self._db.total_changes
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO memory (key, source_lang, target_lang, engine, translation, size, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+                self._disk_count += self._db.total_changes - before
+                if self._disk_count > self.max_entries:
+                    self._evict()
+            except sqlite3.Error as e:
+                self.logger.error(f"[MEMORY] Erreur d'écriture : {e}")
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale (10 % de marge)."""
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        excess = self._disk_count - int(self.max_entries * 0.9)
+        if excess <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM memory WHERE key IN (SELECT key FROM memory ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._db.commit()
+        self._disk_count -= excess
+        self.evictions += excess
+        self.logger.info(f"[MEMORY] {excess} entrées évincées.")
+
+    def invalidate(self, source_lang: Optional[str] = None, target_lang: Optional[str] = None) -> int:
+        """Supprime les entrées d'une paire de langues (None = toutes les langues)."""
+        clauses, params = [], []
+        if source_lang:
+            clauses.append("source_lang = ?")
+            params.append(source_lang)
+        if target_lang:
+            clauses.append("target_lang = ?")
+            params.append(target_lang)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            # Les clés du LRU sont des hachages : on le vide plutôt que de le filtrer
+            self._lru.clear()
+            if self._db is None:
+                return 0
+            removed = self._db.execute(f"DELETE FROM memory{where}", params).rowcount
+            self._db.commit()
+            self._disk_count = max(0, self._disk_count - removed)
+        self.logger.info(f"[MEMORY] {removed} entrées invalidées ({source_lang or '*'} -> {target_lang or '*'}).")
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._lru),
+            "disk_entries": self._disk_count,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
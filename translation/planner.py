@@ -0,0 +1,88 @@
+import re
+from typing import Iterator, List
+
+from config import (
+    TRANSLATION_TIMEOUT_BASE,
+    TRANSLATION_TIMEOUT_PER_KCHAR,
+    TRANSLATION_TIMEOUT_MAX,
+)
+
+# Fin de phrase : ponctuation (éventuellement suivie d'un guillemet ou d'une parenthèse) puis espaces
+_SENTENCE_END = re.compile(r"[.!?…;:]+[\"'»”)\]]*\s+")
+_WORD_END = re.compile(r"\s+")
+
+
+def _cut(text: str, boundary: re.Pattern) -> List[str]:
+    """Coupe text après chaque séparateur ; les séparateurs restent en fin de morceau."""
+    parts, start = [], 0
+    for match in boundary.finditer(text):
+        parts.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        parts.append(text[start:])
+    return parts
+
+
+def _pieces(text: str, max_chars: int) -> Iterator[str]:
+    """Phrases de text ; une phrase trop longue est coupée aux espaces, puis en force."""
+    for sentence in _cut(text, _SENTENCE_END):
+        if len(sentence) <= max_chars:
+            yield sentence
+            continue
+        for word in _cut(sentence, _WORD_END):
+            if len(word) <= max_chars:
+                yield word
+                continue
+            for start in range(0, len(word), max_chars):
+                yield word[start:start + max_chars]
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Découpe un texte trop long en morceaux d'au plus max_chars caractères, aux fins de phrase.
+
+    Les phrases consécutives sont regroupées tant que le morceau tient dans max_chars ;
+    "".join(split_text(text, n)) == text.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    chunks, current = [], ""
+    for piece in _pieces(text, max_chars):
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_requests(sizes: List[int], max_chars: int, max_segments: int) -> List[List[int]]:
+    """Répartit des segments en requêtes (first-fit decreasing) ; retourne les indices par requête.
+
+    Les plus gros segments sont placés d'abord, chacun dans la première requête où il tient
+    (au plus max_chars caractères et max_segments segments) ; les indices d'une requête
+    restent dans l'ordre d'origine.
+    """
+    order = sorted(range(len(sizes)), key=lambda index: -sizes[index])
+    smallest = sizes[order[-1]] if order else 0
+    requests, open_requests = [], []  # [place restante, indices]
+    for index in order:
+        size = sizes[index]
+        for request in open_requests:
+            if request[0] >= size:
+                request[0] -= size
+                request[1].append(index)
+                break
+        else:
+            request = [max_chars - size, [index]]
+            requests.append(request)
+            open_requests.append(request)
+        # Une requête pleine n'est plus parcourue
+        if request[0] < smallest or len(request[1]) >= max_segments:
+            open_requests.remove(request)
+    return [sorted(indices) for _, indices in requests]
+
+
+def request_timeout(chars: int) -> float:
+    """Délai d'une requête de traduction, proportionnel à la taille du texte envoyé."""
+    return min(TRANSLATION_TIMEOUT_MAX, TRANSLATION_TIMEOUT_BASE + chars / 1000 * TRANSLATION_TIMEOUT_PER_KCHAR)
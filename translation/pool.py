@@ -0,0 +1,192 @@
+import time
+import zlib
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import requests
+
+from config import TRANSLATION_POOL_AFFINITY, TRANSLATION_POOL_HEALTH_INTERVAL
+from translation.backend import BackendController, BackendUnavailable, OVERLOAD_STATUSES
+from utils.metrics import BACKEND_HEALTHY, BACKEND_FAILOVERS
+
+# Points d'entrée LibreTranslate, relatifs à la racine du serveur
+ENDPOINTS = {"translate": "/translate", "detect": "/detect", "languages": "/languages"}
+
+
+def base_url(url: str) -> str:
+    """Racine d'un serveur LibreTranslate (l'URL configurée peut se terminer par /translate)."""
+    url = url.rstrip('/')
+    return url[:-len('/translate')] if url.endswith('/translate') else url
+
+
+class Backend:
+    """Un serveur LibreTranslate du pool : régulation, santé et statistiques."""
+
+    def __init__(self, url: str, **controller_options):
+        self.base_url = base_url(url)
+        self.controller = BackendController(self.base_url, **controller_options)
+        self.healthy = True
+        self.outstanding = 0      # requêtes confiées, en attente de place comprises
+        self.requests = 0
+        self.errors = 0
+        self.failovers = 0
+        self.total_time = 0.0
+        BACKEND_HEALTHY.set(1, backend=self.base_url)
+
+    def url(self, endpoint: str) -> str:
+        return self.base_url + ENDPOINTS[endpoint]
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.controller.available
+
+    @property
+    def load(self) -> float:
+        return self.outstanding / max(1, int(self.controller.limit))
+
+    def stats(self) -> dict:
+        return {
+            **self.controller.stats(),
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "failovers": self.failovers,
+            "avg_latency_ms": round(self.total_time / self.requests * 1000, 2) if self.requests else 0.0
+        }
+
+
+class BackendPool:
+    """Pool de serveurs LibreTranslate interchangeables.
+
+    Chaque paire de langues est rattachée (hachage de rendez-vous) à TRANSLATION_POOL_AFFINITY
+    serveurs préférés, qui gardent ses modèles chargés ; la requête part vers le moins occupé
+    d'entre eux, et déborde sur le moins chargé du pool quand tous sont à leur limite. Un
+    serveur en erreur (429, 5xx, expiration, connexion, disjoncteur ouvert) cède la requête
+    au suivant. Avec plusieurs serveurs, /languages est interrogé toutes les
+    TRANSLATION_POOL_HEALTH_INTERVAL secondes ; un serveur qui ne répond pas est écarté
+    jusqu'à la vérification suivante réussie.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        http_client,
+        affinity: int = TRANSLATION_POOL_AFFINITY,
+        health_interval: float = TRANSLATION_POOL_HEALTH_INTERVAL,
+        **controller_options
+    ):
+        if not urls:
+            raise ValueError("Aucun serveur LibreTranslate configuré.")
+        self.backends = [Backend(url, **controller_options) for url in urls]
+        self.http = http_client
+        self.affinity = max(1, affinity)
+        self.health_interval = health_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    def _preferred(self, pair: Optional[Tuple[str, str]]) -> List[Backend]:
+        """Serveurs dans l'ordre de préférence pour une paire de langues (stable d'un processus à l'autre)."""
+        if pair is None:
+            return list(self.backends)
+        key = "|".join(pair)
+        return sorted(self.backends, key=lambda b: zlib.crc32(f"{key}|{b.base_url}".encode()), reverse=True)
+
+    def candidates(self, pair: Optional[Tuple[str, str]] = None) -> List[Backend]:
+        """Ordre d'essai des serveurs pour une requête : choix principal puis repli."""
+        preferred = self._preferred(pair)
+        with self._lock:
+            available = [b for b in preferred if b.available] or preferred
+            if pair is None:
+                first = min(available, key=lambda b: b.load)
+            else:
+                affine = [b for b in preferred[:self.affinity] if b in available and b.load < 1]
+                first = min(affine or available, key=lambda b: b.load)
+        return [first] + [b for b in available if b is not first]
+
+    def request(self, endpoint: str, payload: dict, timeout: float, pair: Optional[Tuple[str, str]] = None, **kwargs):
+        """POST vers le meilleur serveur, avec repli sur les suivants ; retourne la dernière réponse."""
+        self._ensure_health_checks()
+        candidates = self.candidates(pair)
+        # Avec plusieurs serveurs, le repli remplace les nouveaux essais sur le même serveur
+        retry = len(candidates) == 1
+        for index, backend in enumerate(candidates):
+            last = index == len(candidates) - 1
+            with self._lock:
+                backend.outstanding += 1
+            start = time.perf_counter()
+            error, response = None, None
+            try:
+                response = backend.controller.call(
+                    lambda: self.http.post(
+                        backend.url(endpoint), json=payload, timeout=timeout, retry=retry,
+                        service="libretranslate", **kwargs
+                    ),
+                    timeout
+                )
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, BackendUnavailable) as e:
+                error, response = e, None
+            finally:
+                failed = error is not None or (response is not None and response.status_code in OVERLOAD_STATUSES)
+                with self._lock:
+                    backend.outstanding -= 1
+                    backend.requests += 1
+                    backend.total_time += time.perf_counter() - start
+                    if failed:
+                        backend.errors += 1
+                        if not last:
+                            backend.failovers += 1
+            if not failed or last:
+                if error is not None:
+                    raise error
+                return response
+            BACKEND_FAILOVERS.inc(backend=backend.base_url)
+            self.logger.warning(
+                f"[POOL] {backend.base_url} en échec ({error or response.status_code}), "
+                f"repli sur {candidates[index + 1].base_url}."
+            )
+
+    def set_max_concurrency(self, maximum: int):
+        """Plafond de requêtes simultanées de chaque serveur (TRANSLATION_CONCURRENCY_MAX par défaut)."""
+        for backend in self.backends:
+            backend.controller.set_maximum(maximum)
+
+    def check_health(self):
+        """Interroge /languages sur chaque serveur et met à jour leur disponibilité."""
+        for backend in self.backends:
+            try:
+                healthy = self.http.get(
+                    backend.url("languages"), timeout=5, retry=False, service="libretranslate"
+                ).status_code == 200
+            except requests.exceptions.RequestException:
+                healthy = False
+            if healthy != backend.healthy:
+                self.logger.warning(f"[POOL] {backend.base_url} {'disponible' if healthy else 'indisponible'}.")
+            backend.healthy = healthy
+            BACKEND_HEALTHY.set(1 if healthy else 0, backend=backend.base_url)
+
+    def _ensure_health_checks(self):
+        if len(self.backends) < 2 or self.health_interval <= 0 or self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, name="translate-health", daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                self.logger.exception("[POOL] Vérification de santé en échec")
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self) -> List[dict]:
+        """Statistiques par serveur : limite, charge, santé, requêtes, erreurs, replis, latence."""
+        with self._lock:
+            return [backend.stats() for backend in self.backends]
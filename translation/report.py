@@ -0,0 +1,75 @@
+import os
+import json
+import logging
+from typing import List, Optional
+
+from config import LAST_REPORT_FILE
+from utils.file import ensure_directory
+
+# Statuts considérés comme un succès dans le rapport
+SUCCESS_STATUSES = {"created", "updated", "skipped"}
+
+
+class SyncReport:
+    """Rapport de synchronisation d'un livre (format de data/last_report.json)."""
+
+    def __init__(self, book_id, book_name: str, target_langs: List[str]):
+        self.book_id = book_id
+        self.book_name = book_name
+        self.target_langs = list(target_langs)
+        self.pages = []
+        self.summary = {lang: {"ok": 0, "fail": 0, "failures": []} for lang in self.target_langs}
+        # Résumé du rapport de performance de l'exécution (utils.perf.PerfReport.close)
+        self.performance = None
+        # Volumes avant / après dédoublonnage des segments du livre (SegmentDictionary.stats)
+        self.deduplication = None
+
+    def add_page(
+        self,
+        page_id,
+        page_name: str,
+        lang: str,
+        status: str,
+        chapter_id=None,
+        chapter_name: Optional[str] = None,
+        error: Optional[str] = None
+    ):
+        success = status in SUCCESS_STATUSES
+        self.pages.append({
+            "page_id": page_id,
+            "page_name": page_name,
+            "lang": lang,
+            "success": success,
+            "status": status,
+            "chapter_id": chapter_id,
+            "chapter_name": chapter_name
+        })
+        summary = self.summary.setdefault(lang, {"ok": 0, "fail": 0, "failures": []})
+        if success:
+            summary["ok"] += 1
+        else:
+            summary["fail"] += 1
+            summary["failures"].append({"page_id": page_id, "page_name": page_name, "error": error or status})
+
+    def to_dict(self) -> dict:
+        data = {
+            "book_id": self.book_id,
+            "book_name": self.book_name,
+            "target_langs": self.target_langs,
+            "pages": self.pages,
+            "summary": self.summary
+        }
+        if self.performance is not None:
+            data["performance"] = self.performance
+        if self.deduplication is not None:
+            data["deduplication"] = self.deduplication
+        return data
+
+    def save(self, path: str = LAST_REPORT_FILE):
+        try:
+            ensure_directory(os.path.dirname(path))
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            logging.info(f"[REPORT] Rapport enregistré dans {path}.")
+        except OSError as e:
+            logging.error(f"[REPORT] Impossible d'écrire le rapport {path} : {e}")
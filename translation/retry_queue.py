@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional
+
+from config import TARGET_LANGS, WEBHOOK_QUEUE_FILE, TRANSLATION_RETRY_DELAY, TRANSLATION_RETRY_DRAIN_TIMEOUT
+from translation.report import SUCCESS_STATUSES
+
+
+class RetryQueue:
+    """Pages à retraduire plus tard, parquées dans la file durable du webhook.
+
+    Une page dont la traduction a échoué (serveur indisponible, délai dépassé) n'est pas
+    publiée : elle devient un travail page_update, repris par les travailleurs du webhook
+    après delay secondes (avec leurs nouvelles tentatives et leur backoff). Une exécution
+    CLI, sans travailleur du webhook, rejoue elle-même ses pages parquées avant de se
+    terminer (drain). La file n'est ouverte qu'à la première page parquée.
+    """
+
+    def __init__(self, path: str = WEBHOOK_QUEUE_FILE, delay: float = TRANSLATION_RETRY_DELAY):
+        self.path = path
+        self.delay = delay
+        self.logger = logging.getLogger(__name__)
+        self._queue = None
+        self._lock = threading.Lock()
+        # Travaux parqués par ce processus
+        self.parked = set()
+
+    @property
+    def queue(self):
+        with self._lock:
+            if self._queue is None:
+                from webhook.jobs import JobQueue
+                self._queue = JobQueue(self.path)
+            return self._queue
+
+    def park(self, page_id, langs: Iterable[str]) -> Optional[int]:
+        """Reprogramme la traduction de la page pour ces langues ; retourne l'id du travail."""
+        langs = sorted(set(langs))
+        try:
+            job_id = self.queue.enqueue(
+                "page_update", {"page_id": page_id, "langs": langs}, key=f"page:{page_id}", delay=self.delay
+            )
+        except Exception as e:
+            self.logger.error(f"[RETRY] Page {page_id} ({', '.join(langs)}) non reprogrammée : {e}")
+            return None
+        with self._lock:
+            self.parked.add(job_id)
+        self.logger.warning(f"[RETRY] Page {page_id} reprogrammée pour {', '.join(langs)} dans {self.delay:.0f}s.")
+        return job_id
+
+    def drain(
+        self,
+        replay: Callable[[int, List[str]], Optional[dict]],
+        timeout: float = TRANSLATION_RETRY_DRAIN_TIMEOUT
+    ) -> int:
+        """Rejoue les pages parquées par ce processus, pendant au plus timeout secondes.
+
+        Les travaux parqués sont réclamés aussitôt, sans attendre delay ; replay(page_id, langs)
+        retourne les statuts par langue, et une langue encore en échec replanifie le travail
+        avec le backoff de la file. Un travail fusionné avec un événement webhook (sans langs)
+        concerne toutes les langues cibles. Retourne le nombre de pages restées en attente,
+        qui ne seront reprises que par un travailleur du webhook.
+        """
+        with self._lock:
+            parked = set(self.parked)
+        if not parked:
+            return 0
+        queue = self.queue
+        queue.expedite(parked)
+        deadline = time.monotonic() + max(0.0, timeout)
+        if timeout > 0:
+            self.logger.info(
+                f"[RETRY] {len(parked)} pages reprogrammées : nouvel essai avant la fin (au plus {timeout:.0f}s)."
+            )
+        while True:
+            remaining = queue.pending(parked)
+            left = deadline - time.monotonic()
+            if not remaining or left <= 0:
+                break
+            job = queue.claim(ids=remaining)
+            if job is None:
+                queue.wait(min(left, 1.0))
+                continue
+            page_id, langs = job.payload["page_id"], job.payload.get("langs") or TARGET_LANGS
+            try:
+                results = replay(page_id, langs) or {}
+                failed = [lang for lang in langs if results.get(lang) not in SUCCESS_STATUSES]
+                if failed:
+                    raise RuntimeError(f"Page {page_id} toujours non traduite pour : {', '.join(failed)}")
+            except Exception as e:
+                self.logger.warning(f"[RETRY] {e}")
+                queue.fail(job, str(e))
+            else:
+                queue.complete(job.id, token=job.token)
+                self.logger.info(f"[RETRY] Page {page_id} retraduite pour {', '.join(langs)}.")
+        with self._lock:
+            self.parked -= parked - remaining
+        if remaining:
+            self.logger.warning(
+                f"[RETRY] {len(remaining)} pages toujours en attente dans {self.path} : elles ne seront "
+                f"retraduites que par un travailleur du webhook (python -m webhook.server)."
+            )
+        return len(remaining)
+
+    def close(self):
+        with self._lock:
+            if self._queue is not None:
+                self._queue.close()
+                self._queue = None
@@ -1,24 +1,120 @@
-from typing import List, Optional
+from contextlib import nullcontext
+from typing import List, NamedTuple, Optional
+import time
 import logging
 
-from translation.translate import TranslationService
+from config import (
+    LAST_REPORT_FILE,
+    PERF_REPORT_FILE,
+    PERF_TRACEMALLOC,
+    PROFILE_PAGE_ID,
+    PROFILE_OUTPUT,
+    BOOK_DEDUP_ENABLED,
+    BOOK_DEDUP_CHUNK_PAGES,
+    SYNC_CHECKPOINT_ENABLED,
+)
+from translation.translate import TranslationService, TranslationError
+from translation.content_hash import content_hash
+from translation.report import SyncReport
+from translation.dedup import SegmentDictionary
+from translation.retry_queue import RetryQueue
+from translation.checkpoint import SyncCheckpoint
+from translation.html_segmenter import PageTemplate
 from api.mapping import MappingManager
 from api.books import BookStackBooksAPI
 from api.chapters import BookStackChaptersAPI
 from api.pages import BookStackPagesAPI
+from api.mirror import BookStackMirror
+from utils import perf
+from utils.metrics import PAGES_SYNCED, PAGE_SYNC_LATENCY
+
+
+class PreparedPage(NamedTuple):
+    """Page lue, langue détectée et segmentée : prête à être traduite puis publiée.
+
+    results et pending valent None quand ils sont vides (pas de conteneur mutable partagé
+    comme valeur par défaut) ; _publish_page les normalise.
+    """
+    page_id: str
+    page: Optional[dict] = None
+    results: Optional[dict] = None          # statuts déjà connus (pages à jour, ignorées...)
+    pending: Optional[List[str]] = None     # langues à traduire
+    source_lang: Optional[str] = None
+    source_hash: Optional[str] = None
+    template: Optional[PageTemplate] = None
+    trace: Optional[perf.Trace] = None
+    elapsed: float = 0.0
 
 
 class SyncManager:
-    def __init__(self):
-        self.translator = TranslationService()
-        self.mapping = MappingManager()
-        self.book_api = BookStackBooksAPI()
-        self.chapter_api = BookStackChaptersAPI()
-        self.page_api = BookStackPagesAPI()
+    def __init__(
+        self,
+        translator: Optional[TranslationService] = None,
+        mapping: Optional[MappingManager] = None,
+        book_api: Optional[BookStackBooksAPI] = None,
+        chapter_api: Optional[BookStackChaptersAPI] = None,
+        page_api: Optional[BookStackPagesAPI] = None,
+        report_path: str = LAST_REPORT_FILE,
+        mirror: Optional[BookStackMirror] = None,
+        perf_report_path: str = PERF_REPORT_FILE,
+        retry_queue: Optional[RetryQueue] = None,
+        checkpoint: Optional[SyncCheckpoint] = None
+    ):
+        self.book_api = book_api or BookStackBooksAPI()
+        self.chapter_api = chapter_api or BookStackChaptersAPI()
+        self.page_api = page_api or BookStackPagesAPI()
+        self.translator = translator or TranslationService()
+        self.mapping = mapping or MappingManager(
+            book_api=self.book_api,
+            chapter_api=self.chapter_api,
+            page_api=self.page_api,
+            translation_service=self.translator,
+            mirror=mirror
+        )
+        # Métadonnées (livres, chapitres, parents) lues dans le miroir ; seuls les corps de page sont demandés
+        self.mirror = mirror or self.mapping.mirror
+        # "" : rapport non écrit (la traduction en masse consolide ceux de tous les livres)
+        self.report_path = report_path
+        self.perf_report_path = perf_report_path
+        # Pages non traduites (serveur indisponible) reprogrammées par sync_book
+        self.retry_queue = retry_queue or RetryQueue()
+        # Journal de progression de sync_book : une exécution interrompue reprend où elle s'est arrêtée
+        self.checkpoint = checkpoint or (SyncCheckpoint() if SYNC_CHECKPOINT_ENABLED else None)
+        # Rapport de performance de l'exécution en cours (sync_book)
+        self.perf_report = None
+        self._mapping_checked = False
         self.logger = logging.getLogger(__name__)
         if not self.logger.hasHandlers():
             logging.basicConfig(level=logging.INFO)
 
+    def fork(self, **options) -> "SyncManager":
+        """Nouveau SyncManager partageant services, mapping, miroir et file de reprise.
+
+        Le rapport de performance appartient à l'instance : des livres synchronisés en
+        parallèle utilisent chacun la leur. options remplace les réglages (report_path...).
+        """
+        settings = dict(
+            translator=self.translator,
+            mapping=self.mapping,
+            book_api=self.book_api,
+            chapter_api=self.chapter_api,
+            page_api=self.page_api,
+            report_path=self.report_path,
+            mirror=self.mirror,
+            perf_report_path=self.perf_report_path,
+            retry_queue=self.retry_queue,
+            checkpoint=self.checkpoint
+        )
+        settings.update(options)
+        manager = SyncManager(**settings)
+        manager._mapping_checked = self._mapping_checked
+        return manager
+
+    def ensure_mapping(self):
+        """Reconstruit le mapping s'il est vide ; fait une seule fois, à la première synchronisation."""
+        if self._mapping_checked:
+            return
+        self._mapping_checked = True
         # Check if the mapping is empty and try to clean it if necessary
         if self.mapping.is_empty():
             self.logger.warning("[SYNC] Mapping vide. Tentative de nettoyage...")
@@ -29,27 +125,38 @@ class SyncManager:
         self,
         source_book_id: str,
         book_details: dict,
-        target_lang: str
+        target_lang: str,
+        force: bool = False
     ) -> Optional[str]:
         # Get existing mapping
         translated_book_id = self.mapping.get_book(source_book_id, target_lang)
+        source_hash = content_hash(book_details.get('name', ''), book_details.get('description', ''))
+        if translated_book_id and not force and self.mapping.is_up_to_date(
+            "books", source_book_id, target_lang, source_hash
+        ):
+            return translated_book_id
+
         # Prepare translations
-        translated_title = self.translator.translate_text(book_details.get('name', ''), target_lang)
-        translated_description = self.translator.translate_text(
-            book_details.get('description', ''), target_lang
-        )
+        try:
+            translated_title = self.translator.translate_text(book_details.get('name', ''), target_lang)
+            translated_description = self.translator.translate_text(
+                book_details.get('description', ''), target_lang
+            )
+        except TranslationError as e:
+            self.logger.error(f"[SYNC] Livre {source_book_id} non publié pour {target_lang} : {e}")
+            return translated_book_id
+        fields = {"name": translated_title, "description": translated_description}
 
         if translated_book_id:
             # Update existing book translation
             self.logger.info(f"[SYNC] Mise à jour du livre {translated_book_id} pour {target_lang}...")
-            self.book_api.update_book(
-                translated_book_id,
-                translated_title,
-                translated_description
-            )
+            with perf.stage("publish"):
+                published = self.book_api.update_book(translated_book_id, fields)
         else:
             # Create new translated book
-            new_book = self.book_api.create_book(translated_title, translated_description)
+            with perf.stage("publish"):
+                new_book = self.book_api.create_book(translated_title, translated_description)
+            published = bool(new_book)
             if new_book:
                 translated_book_id = new_book.get('id')
                 self.mapping.set_mapped_book(source_book_id, target_lang, translated_book_id)
@@ -57,6 +164,11 @@ class SyncManager:
             else:
                 self.logger.error(f"[SYNC] Échec création livre pour {target_lang} (source {source_book_id})")
 
+        if published:
+            self.mapping.set_sync_state(
+                "books", source_book_id, target_lang,
+                source_hash, content_hash(translated_title, translated_description)
+            )
         return translated_book_id
 
     def _ensure_translated_chapter(
@@ -64,23 +176,34 @@ class SyncManager:
         source_chapter_id: str,
         chapter_name: str,
         book_id: str,
-        target_lang: str
+        target_lang: str,
+        force: bool = False
     ) -> Optional[str]:
         # Get existing mapping
         translated_chapter_id = self.mapping.get_chapter(source_chapter_id, target_lang)
+        source_hash = content_hash(chapter_name)
+        if translated_chapter_id and not force and self.mapping.is_up_to_date(
+            "chapters", source_chapter_id, target_lang, source_hash
+        ):
+            return translated_chapter_id
+
         # Prepare translation
-        translated_name = self.translator.translate_text(chapter_name, target_lang)
+        try:
+            translated_name = self.translator.translate_text(chapter_name, target_lang)
+        except TranslationError as e:
+            self.logger.error(f"[SYNC] Chapitre {source_chapter_id} non publié pour {target_lang} : {e}")
+            return translated_chapter_id
 
         if translated_chapter_id:
             # Update existing chapter translation
             self.logger.info(f"[SYNC] Mise à jour du chapitre {translated_chapter_id} pour {target_lang}...")
-            self.chapter_api.update_chapter(
-                translated_chapter_id,
-                translated_name
-            )
+            with perf.stage("publish"):
+                published = self.chapter_api.update_chapter(translated_chapter_id, {"name": translated_name})
         else:
             # Create new translated chapter
-            chapter = self.chapter_api.create_chapter(book_id, translated_name)
+            with perf.stage("publish"):
+                chapter = self.chapter_api.create_chapter(book_id, translated_name)
+            published = bool(chapter)
             if chapter:
                 translated_chapter_id = chapter.get('id')
                 self.mapping.set_mapped_chapter(source_chapter_id, target_lang, translated_chapter_id)
@@ -88,85 +211,286 @@ class SyncManager:
             else:
                 self.logger.error(f"[SYNC] Échec création chapitre pour {target_lang} (source {source_chapter_id})")
 
+        if published:
+            self.mapping.set_sync_state(
+                "chapters", source_chapter_id, target_lang, source_hash, content_hash(translated_name)
+            )
         return translated_chapter_id
 
-    def sync_book(self, source_book_id: str, target_langs: List[str]) -> None:
-        book_details = self.book_api.get_book(source_book_id)
+    def sync_book(self, source_book_id: str, target_langs: List[str], force: bool = False) -> Optional[SyncReport]:
+        self.ensure_mapping()
+        self.mirror.refresh()
+        book_details = self.mirror.get_book(source_book_id)
         if not book_details:
             self.logger.warning(f"[SYNC] Livre source introuvable : {source_book_id}")
-            return
+            return None
 
-        for target_lang in target_langs:
-            translated_book_id = self._ensure_translated_book(
-                source_book_id, book_details, target_lang
+        report = SyncReport(source_book_id, book_details.get('name', ''), target_langs)
+        if self.perf_report_path:
+            self.perf_report = perf.PerfReport(self.perf_report_path, PERF_TRACEMALLOC).start(
+                engine="sync", book_id=source_book_id, book_name=book_details.get('name', ''), target_langs=target_langs
             )
-            if not translated_book_id:
-                continue
+        dictionary = SegmentDictionary(self.translator) if BOOK_DEDUP_ENABLED else None
+        try:
+            source_chapters = self.mirror.list_chapters(book_details.get('id', source_book_id))
+            chapter_names = {ch['id']: ch.get('name', '') for ch in source_chapters}
+            with perf.trace() as structure_trace:
+                for target_lang in target_langs:
+                    translated_book_id = self._ensure_translated_book(
+                        source_book_id, book_details, target_lang, force
+                    )
+                    if not translated_book_id:
+                        continue
 
-            # Synchronize chapters
-            source_chapters = self.chapter_api.get_chapters(source_book_id)
-            for source_chapter in source_chapters:
-                translated_chapter_id = self._ensure_translated_chapter(
-                    source_chapter['id'],
-                    source_chapter.get('name', ''),
-                    translated_book_id,
-                    target_lang
-                )
-                if not translated_chapter_id:
-                    continue
+                    # Synchronize chapters
+                    for source_chapter in source_chapters:
+                        self._ensure_translated_chapter(
+                            source_chapter['id'],
+                            source_chapter.get('name', ''),
+                            translated_book_id,
+                            target_lang,
+                            force
+                        )
+            if self.perf_report:
+                self.perf_report.record("structure", structure_trace, book_id=source_book_id)
+
+            # Synchronize pages (les pages à jour sont ignorées par sync_page), par lots :
+            # lecture et segmentation, traduction des segments uniques du lot, puis publication
+            checkpoint = self.checkpoint.begin(source_book_id, target_langs, force) if self.checkpoint else None
+            source_pages = self.mirror.list_pages(book_id=source_book_id)
+            for offset in range(0, len(source_pages), BOOK_DEDUP_CHUNK_PAGES):
+                chunk = source_pages[offset:offset + BOOK_DEDUP_CHUNK_PAGES]
+                # Langues restant à traiter ; celles terminées par une exécution interrompue
+                # (même version de la page) sont ignorées sans relire la page
+                remaining = {}
+                for source_page in chunk:
+                    done = checkpoint.completed(source_page['id'], source_page.get('updated_at')) if checkpoint else ()
+                    remaining[source_page['id']] = [lang for lang in target_langs if lang not in done]
+                prepared = {}
+                if dictionary is not None:
+                    for source_page in chunk:
+                        langs = remaining[source_page['id']]
+                        if not langs:
+                            continue
+                        page = prepared[source_page['id']] = self.prepare_page(source_page['id'], langs, force)
+                        if page.pending:
+                            dictionary.add(page.template, page.source_lang, page.pending, title=page.page.get('name', ''))
+                    with perf.trace() as dictionary_trace:
+                        dictionary.translate()
+                    if self.perf_report:
+                        self.perf_report.record("dictionary", dictionary_trace, book_id=source_book_id, **dictionary.stats())
+
+                for source_page in chunk:
+                    langs = remaining[source_page['id']]
+                    results = {lang: "skipped" for lang in target_langs if lang not in langs}
+                    if langs:
+                        page = prepared.pop(source_page['id'], None) or self.prepare_page(source_page['id'], langs, force)
+                        page_results = self.sync_page(
+                            source_page['id'], langs, force=force, prepared=page, dictionary=dictionary
+                        )
+                        results.update(page_results)
+                        if checkpoint is not None:
+                            checkpoint.record(
+                                source_page['id'],
+                                {lang: page_results.get(lang, "failed") for lang in langs},
+                                page.source_hash,
+                                (page.page or source_page).get('updated_at')
+                            )
+                    deferred = [lang for lang, status in results.items() if status == "deferred"]
+                    if deferred and self.retry_queue is not None:
+                        self.retry_queue.park(source_page['id'], deferred)
+                    chapter_id = source_page.get('chapter_id') or None
+                    for target_lang in target_langs:
+                        report.add_page(
+                            source_page['id'],
+                            source_page.get('name', ''),
+                            target_lang,
+                            results.get(target_lang, "failed"),
+                            chapter_id,
+                            chapter_names.get(chapter_id)
+                        )
 
-                # Synchronize pages
-                source_pages = self.page_api.get_pages(source_chapter['id'])
-                for source_page in source_pages:
-                    self.sync_page(source_page['id'], [target_lang])
+            self.mapping.flush()
+            if checkpoint is not None:
+                checkpoint.finish()
+        finally:
+            if dictionary is not None:
+                report.deduplication = dictionary.stats()
+            if self.perf_report:
+                report.performance = self.perf_report.close(book_id=source_book_id, deduplication=report.deduplication)
+                self.perf_report = None
+        if self.report_path:
+            report.save(self.report_path)
+        return report
 
-    def sync_page(self, source_page_id: str, target_langs: List[str]) -> None:
-        source_page = self.page_api.get_page(source_page_id)
+    def replay_deferred(self, timeout: Optional[float] = None) -> int:
+        """Fin d'une exécution CLI : retraduit les pages reprogrammées (aucun travailleur du webhook).
+
+        Retourne le nombre de pages restées en attente dans la file.
+        """
+        if self.retry_queue is None:
+            return 0
+        options = {} if timeout is None else {"timeout": timeout}
+        remaining = self.retry_queue.drain(lambda page_id, langs: self.sync_page(page_id, langs), **options)
+        self.mapping.flush()
+        return remaining
+
+    def prepare_page(self, source_page_id: str, target_langs: List[str], force: bool = False) -> PreparedPage:
+        """Lit une page, détecte sa langue et la segmente, sans rien traduire."""
+        start = time.perf_counter()
+        with perf.trace() as page_trace:
+            prepared = self._prepare_page(source_page_id, target_langs, force)
+        return prepared._replace(trace=page_trace, elapsed=time.perf_counter() - start)
+
+    def sync_page(
+        self,
+        source_page_id: str,
+        target_langs: List[str],
+        force: bool = False,
+        prepared: Optional[PreparedPage] = None,
+        dictionary: Optional[SegmentDictionary] = None
+    ) -> dict:
+        """Synchronise une page ; retourne {langue: "created" | "updated" | "skipped" | "failed" | "deferred"}.
+
+        "deferred" : traduction impossible (serveur indisponible), rien n'a été publié.
+        prepared et dictionary sont fournis par sync_book (page déjà lue, segments déjà traduits).
+        """
+        start = time.perf_counter()
+        prepared_elapsed = prepared.elapsed if prepared else 0.0
+        profile = PROFILE_PAGE_ID and str(source_page_id) == PROFILE_PAGE_ID
+        with perf.profiled(PROFILE_OUTPUT.format(page_id=source_page_id)) if profile else nullcontext():
+            if prepared is None:
+                prepared = self.prepare_page(source_page_id, target_langs, force)
+            with perf.activate(prepared.trace):
+                results = self._publish_page(prepared, dictionary)
+        PAGE_SYNC_LATENCY.observe(time.perf_counter() - start + prepared_elapsed)
+        for lang, status in results.items():
+            PAGES_SYNCED.inc(lang=lang, status=status)
+        if self.perf_report:
+            self.perf_report.page(source_page_id, prepared.trace, results)
+        return results
+
+    def _prepare_page(self, source_page_id: str, target_langs: List[str], force: bool = False) -> PreparedPage:
+        results = {}
+        self.ensure_mapping()
+        origin = self.mapping.get_source_page(source_page_id)
+        if origin:
+            # Ne jamais retraduire nos propres traductions
+            self.logger.info(f"[SYNC] Page {source_page_id} est la traduction {origin.lang} de {origin.source_id}, ignorée.")
+            return PreparedPage(source_page_id, results={lang: "skipped" for lang in target_langs})
+        with perf.stage("fetch"):
+            source_page = self.page_api.get_page(source_page_id)
         if not source_page:
             self.logger.warning(f"[SYNC] Page source introuvable : {source_page_id}")
-            return
+            return PreparedPage(source_page_id)
+        self.mirror.upsert("pages", source_page)
 
         page_name = source_page.get('name', '')
         html_content = source_page.get('html', '')
-        source_book_id = str(source_page.get('book_id'))
-        source_chapter_id = source_page.get('chapter_id')
+        source_hash = content_hash(page_name, html_content)
+
+        pending_langs = []
+        for target_lang in target_langs:
+            if not force and self.mapping.is_up_to_date("pages", source_page_id, target_lang, source_hash):
+                results[target_lang] = "skipped"
+            else:
+                pending_langs.append(target_lang)
+        if not pending_langs:
+            self.logger.info(f"[SYNC] Page {source_page_id} à jour, aucune traduction nécessaire.")
+            return PreparedPage(source_page_id, source_page, results, source_hash=source_hash)
 
-        source_lang = self.translator.detect_language(page_name or html_content)
+        with perf.stage("detect"):
+            source_lang = self.translator.detect_language(f"{page_name}\n{html_content}", cache_key=source_hash)
         if not source_lang:
             self.logger.warning(f"[SYNC] Langue source indétectable pour la page : {source_page_id}")
-            return
+            return PreparedPage(source_page_id, source_page, results)
 
-        for target_lang in target_langs:
+        for target_lang in pending_langs:
             if target_lang == source_lang:
+                results[target_lang] = "skipped"
+        # Page segmentée une seule fois pour toutes les langues
+        return PreparedPage(
+            source_page_id, source_page, results,
+            pending=[lang for lang in pending_langs if lang not in results],
+            source_lang=source_lang,
+            source_hash=source_hash,
+            template=self.translator.compile_html(html_content)
+        )
+
+    def _publish_page(self, prepared: PreparedPage, dictionary: Optional[SegmentDictionary] = None) -> dict:
+        results = dict(prepared.results or {})
+        if not prepared.pending:
+            return results
+        page_name = prepared.page.get('name', '')
+        if dictionary is not None:
+            translations = {}
+            for lang in prepared.pending:
+                try:
+                    translations[lang] = dictionary.fill(prepared.template, lang, prepared.source_lang, title=page_name)
+                except TranslationError as e:
+                    self.logger.error(f"[SYNC] Page {prepared.page_id} non publiée pour {lang} : {e}")
+                    translations[lang] = None
+        else:
+            # Toutes les langues traduites en parallèle
+            translations = self.translator.translate_template(
+                prepared.template, page_name, prepared.pending, prepared.source_lang
+            )
+        for target_lang, translation in translations.items():
+            if translation is None:
+                # Traduction incomplète : le texte source n'est jamais publié, la page est reprogrammée
+                results[target_lang] = "deferred"
                 continue
+            translated_name, translated_html = translation
+            with perf.trace(target_lang):
+                results[target_lang] = self._sync_page_lang(
+                    prepared.page_id, prepared.page, target_lang, translated_name, translated_html,
+                    prepared.source_hash
+                )
+        return results
 
-            existing_page_id = self.mapping.get_page(source_page_id, target_lang)
-            translated_name = self.translator.translate_text(page_name, target_lang, source_lang)
-            translated_html = self.translator.translate_html(html_content, target_lang, source_lang)
+    def _sync_page_lang(
+        self,
+        source_page_id: str,
+        source_page: dict,
+        target_lang: str,
+        translated_name: str,
+        translated_html: str,
+        source_hash: str
+    ) -> str:
+        """Publie la traduction d'une page dans une langue ; retourne le statut."""
+        source_book_id = str(source_page.get('book_id'))
+        source_chapter_id = source_page.get('chapter_id')
+
+        existing_page_id = self.mapping.get_page(source_page_id, target_lang)
+        target_hash = content_hash(translated_name, translated_html)
 
-            if existing_page_id:
-                # Update existing page
-                self.logger.info(f"[SYNC] Mise à jour page {existing_page_id} pour {target_lang}...")
-                self.page_api.update_page(
+        if existing_page_id:
+            # Update existing page
+            self.logger.info(f"[SYNC] Mise à jour page {existing_page_id} pour {target_lang}...")
+            with perf.stage("publish"):
+                updated = self.page_api.update_page(
                     existing_page_id,
                     translated_name,
                     translated_html,
                     book_id=self.mapping.get_book(source_book_id, target_lang),
                     chapter_id=self.mapping.get_chapter(source_chapter_id, target_lang) if source_chapter_id else None
                 )
-                continue
+                if updated:
+                    self.mapping.set_sync_state("pages", source_page_id, target_lang, source_hash, target_hash)
+            return "updated" if updated else "failed"
 
+        with perf.stage("publish"):
             # Create new translated page
             translated_book_id = self._ensure_translated_book(
                 source_book_id,
-                self.book_api.get_book(source_book_id) or {},
+                self.mirror.get_book(source_book_id) or {},
                 target_lang
             )
             translated_chapter_id = None
             if source_chapter_id:
                 translated_chapter_id = self._ensure_translated_chapter(
                     source_chapter_id,
-                    self.chapter_api.get_chapter(source_chapter_id).get('name', ''),
+                    (self.mirror.get_chapter(source_chapter_id) or {}).get('name', ''),
                     translated_book_id,
                     target_lang
                 )
@@ -180,12 +504,17 @@ class SyncManager:
                 source_page_id=source_page_id
             )
 
-            if created:
-                new_id = created.get('id')
-                self.mapping.set_mapped_page(source_page_id, target_lang, new_id)
-                self.logger.info(f"[SYNC] Page créée pour {target_lang} : ID {new_id}")
-            else:
+            if not created:
                 self.logger.error(f"[SYNC] Échec création page pour {target_lang} (source {source_page_id})")
+                return "failed"
+            new_id = created.get('id')
+            self.mapping.set_mapped_page(
+                source_page_id, target_lang, new_id,
+                book_id=source_page.get('book_id'), chapter_id=source_chapter_id
+            )
+            self.mapping.set_sync_state("pages", source_page_id, target_lang, source_hash, target_hash)
+        self.logger.info(f"[SYNC] Page créée pour {target_lang} : ID {new_id}")
+        return "created"
 
     def clean_mapping(self, valid_book_ids=None, valid_chapter_ids=None, valid_page_ids=None):
         """
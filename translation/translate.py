@@ -1,90 +1,503 @@
 import os
 import requests
 import logging
-from typing import Optional, List
-from bs4 import BeautifulSoup, NavigableString
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple, Union
 
-from config import SOURCE_LANG
+from config import (
+    SOURCE_LANG,
+    TRANSLATION_BATCH_SIZE,
+    TRANSLATION_BATCH_MAX_CHARS,
+    TRANSLATION_MEMORY_ENABLED,
+    LANGID_LANGUAGES,
+    LANGID_MIN_CONFIDENCE,
+    LANGID_SAMPLE_CHARS,
+    LANGID_CACHE_SIZE,
+    HTML_SEGMENT_WINDOW_CHARS,
+    TRANSLATION_LANG_CONCURRENCY,
+    TRANSLATION_REQUEST_CONCURRENCY,
+)
+from translation.memory import TranslationMemory, split_whitespace
+from translation.langid import LanguageIdentifier, sample_visible_text
+from translation.html_segmenter import PageTemplate, compile_template, iter_windows, render
+from translation.planner import split_text, pack_requests, request_timeout
+from translation.backend import BackendUnavailable
+from translation.pool import BackendPool
+from api.client import HTTPClient, get_http_client
+from utils import perf
+from utils.metrics import (
+    TRANSLATED_CHARACTERS,
+    TRANSLATED_SEGMENTS,
+    TRANSLATION_FAILURES,
+    LANGUAGE_DETECTIONS,
+)
+
+
+class TranslationError(Exception):
+    """Segments restés sans traduction (délai dépassé, erreur du serveur, disjoncteur ouvert).
+
+    Rien ne doit être publié : le texte source n'est jamais substitué à une traduction.
+    translations reprend les textes demandés, traduits, avec None pour les segments en échec.
+    """
+
+    def __init__(self, segments: List[str], translations: Optional[List[Optional[str]]] = None):
+        super().__init__(f"Traduction impossible pour {len(segments)} segment(s)")
+        self.segments = segments
+        self.translations = translations
 
 
 class TranslationService:
-    """Service de traduction basé sur l'API LibreTranslate."""
+    """Service de traduction basé sur l'API LibreTranslate.
+
+    api_url peut désigner plusieurs serveurs (liste ou URL séparées par des virgules) :
+    les requêtes sont alors réparties par un BackendPool.
+    """
 
-    def __init__(self, api_url: Optional[str] = None):
-        self.api_url = api_url or os.getenv("LIBRETRANSLATE_URL", "http://127.0.0.1:5000/translate")
+    def __init__(
+        self,
+        api_url: Union[str, List[str], None] = None,
+        memory: Optional[TranslationMemory] = None,
+        http_client: Optional[HTTPClient] = None,
+        pool: Optional[BackendPool] = None
+    ):
+        api_url = api_url or os.getenv("LIBRETRANSLATE_URL", "http://127.0.0.1:5000/translate")
+        urls = [url.strip() for url in (api_url.split(",") if isinstance(api_url, str) else api_url) if url.strip()]
 
-        if not self.api_url:
+        if not urls:
             raise ValueError("L'URL de l'API LibreTranslate est manquante.")
+        self.api_urls = urls
+        self.api_url = urls[0]
 
         self.logger = logging.getLogger(__name__)
         if not self.logger.hasHandlers():  # éviter de redéfinir plusieurs fois
             logging.basicConfig(level=logging.INFO)
-        self.logger.info(f"Service de traduction initialisé avec l'URL : {self.api_url}")
+        # Identifiant du moteur utilisé dans les clés de la mémoire de traduction (premier serveur :
+        # les serveurs d'un pool sont interchangeables)
+        self.engine_id = f"libretranslate:{self.api_url}"
+        if memory is None and TRANSLATION_MEMORY_ENABLED:
+            memory = TranslationMemory()
+        self.memory = memory
+        self.http = http_client or get_http_client()
+        # Répartition entre serveurs ; chacun a sa limite adaptative et son disjoncteur
+        self.pool = pool or BackendPool(urls, self.http)
+        # /detect est un point d'entrée frère de /translate (et non un sous-chemin)
+        self.detect_url = self.pool.backends[0].url("detect")
+        self.language_identifier = LanguageIdentifier(LANGID_LANGUAGES)
+        self._detected = OrderedDict()
+        # Pool créé à la première page traduite dans plusieurs langues
+        self.lang_concurrency = TRANSLATION_LANG_CONCURRENCY
+        self._lang_executor = None
+        # Requêtes d'un même lot de segments envoyées en parallèle (bornées par les régulateurs du pool)
+        self.request_concurrency = TRANSLATION_REQUEST_CONCURRENCY
+        self._request_executor = None
+        self.logger.info(f"Service de traduction initialisé avec l'URL : {', '.join(self.api_urls)}")
 
-    def _call_translation_api(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
-        """Effectue un appel à l'API de traduction."""
-        if not text.strip():
-            return text  # Rien à traduire
+    def _request_translation(self, q, target_lang: str, source_lang: Optional[str] = None):
+        """Appelle LibreTranslate ; retourne translatedText (texte ou liste), None si la réponse est vide.
 
+        Le délai dépend de la taille du texte envoyé. Les erreurs (expiration après les
+        nouveaux essais, statut d'erreur, disjoncteur ouvert) sont propagées.
+        """
+        chars = len(q) if isinstance(q, str) else sum(map(len, q))
         payload = {
-            'q': text,
+            'q': q,
             'source': source_lang or 'auto',
             'target': target_lang,
             'format': 'text'
         }
 
-        try:
-            response = requests.post(self.api_url, json=payload, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            translated = result.get('translatedText')
-            if not translated:
-                self.logger.warning(f"Réponse API sans texte traduit pour : '{text}'")
-                return text
-            return translated
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Erreur API traduction : {e}")
-            return text
-        except Exception as e:
-            self.logger.exception(f"Erreur inattendue : {e}")
-            return text
+        timeout = request_timeout(chars)
+        # La traduction est idempotente : les erreurs 5xx et de connexion sont réessayées (ou
+        # confiées à un autre serveur du pool)
+        response = self.pool.request("translate", payload, timeout, pair=(source_lang or 'auto', target_lang))
+        response.raise_for_status()
+        translated = response.json().get('translatedText')
+        if not translated:
+            self.logger.warning(f"Réponse API sans texte traduit pour : '{q}'")
+            return None
+        return translated
+
+    def _call_translation_api(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
+        """Effectue un appel à l'API de traduction, derrière la mémoire de traduction."""
+        if not text.strip():
+            return text  # Rien à traduire
+        return self._call_translation_api_batch([text], target_lang, source_lang)[0]
 
     def translate_text(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> str:
         """Traduit du texte brut."""
         self.logger.info(f"Traduction simple -> {target_lang}")
-        return self._call_translation_api(text, target_lang, source_lang)
+        with perf.stage("translate"):
+            return self._call_translation_api(text, target_lang, source_lang)
+
+    def _post_batch(
+        self,
+        texts: List[str],
+        target_lang: str,
+        source_lang: Optional[str] = None,
+        failed: Optional[List[str]] = None
+    ) -> List[Optional[str]]:
+        """Envoie un lot de segments en une seule requête (q sous forme de liste).
+
+        Les segments sans traduction valent None et sont ajoutés à failed (requête en
+        échec ou réponse vide). Un lot expiré est coupé en deux et renvoyé.
+        """
+        try:
+            translated = self._request_translation(texts, target_lang, source_lang)
+        except requests.exceptions.Timeout as e:
+            if len(texts) == 1:
+                return [self._post_single(texts[0], target_lang, source_lang, failed, e)]
+            middle = len(texts) // 2
+            self.logger.warning(f"Délai dépassé pour un lot de {len(texts)} segments, envoi en deux moitiés.")
+            return (
+                self._post_batch(texts[:middle], target_lang, source_lang, failed)
+                + self._post_batch(texts[middle:], target_lang, source_lang, failed)
+            )
+        except Exception as e:
+            self._log_failure(e, len(texts))
+            if failed is not None:
+                failed.extend(texts)
+            return [None] * len(texts)
+        if translated is None:
+            # Réponse vide : échec, le texte source n'est jamais publié à la place
+            if failed is not None:
+                failed.extend(texts)
+            return [None] * len(texts)
+        if not isinstance(translated, list) or len(translated) != len(texts):
+            # Serveur sans support des lots : repli segment par segment
+            self.logger.warning("Réponse API inattendue pour un lot, repli segment par segment.")
+            return [self._post_single(text, target_lang, source_lang, failed) for text in texts]
+        empty = [text for text, t in zip(texts, translated) if not t]
+        if empty:
+            self.logger.warning(f"Réponse API sans texte traduit pour {len(empty)} segment(s) du lot.")
+            if failed is not None:
+                failed.extend(empty)
+        return [t or None for t in translated]
+
+    def _post_single(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: Optional[str] = None,
+        failed: Optional[List[str]] = None,
+        error: Optional[Exception] = None
+    ) -> Optional[str]:
+        """Traduit un segment seul (q sous forme de texte) ; error : échec déjà constaté.
+
+        Une réponse vide est un échec comme une erreur : le segment est ajouté à failed.
+        """
+        if error is None:
+            try:
+                translated = self._request_translation(text, target_lang, source_lang)
+            except Exception as e:
+                error = e
+            else:
+                if translated:
+                    return translated
+        if error is not None:
+            self._log_failure(error, 1, len(text))
+        if failed is not None:
+            failed.append(text)
+        return None
+
+    def _log_failure(self, error: Exception, segments: int, chars: Optional[int] = None):
+        size = f"{chars} caractères" if chars is not None else f"{segments} segments"
+        if isinstance(error, requests.exceptions.Timeout):
+            self.logger.error(f"Délai de traduction dépassé ({size}) : {error}")
+        elif isinstance(error, (requests.exceptions.RequestException, BackendUnavailable)):
+            self.logger.error(f"Erreur API traduction ({size}) : {error}")
+        else:
+            self.logger.exception(f"Erreur inattendue ({size}) : {error}")
+
+    def _post_batches(
+        self,
+        batches: List[List[str]],
+        target_lang: str,
+        source_lang: Optional[str] = None,
+        failed: Optional[List[str]] = None
+    ) -> List[List[Optional[str]]]:
+        """Envoie plusieurs lots en parallèle (un seul lot : dans le thread appelant)."""
+        if len(batches) <= 1:
+            return [self._post_batch(batch, target_lang, source_lang, failed) for batch in batches]
+        if self._request_executor is None:
+            self._request_executor = ThreadPoolExecutor(
+                max_workers=self.request_concurrency * len(self.pool.backends),
+                thread_name_prefix="translate-request"
+            )
+        futures = [
+            self._request_executor.submit(
+                contextvars.copy_context().run, self._post_batch, batch, target_lang, source_lang, failed
+            )
+            for batch in batches
+        ]
+        return [future.result() for future in futures]
+
+    def _translate_missing(
+        self,
+        segments: List[str],
+        target_lang: str,
+        source_lang: Optional[str] = None
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """Traduit des segments (sans espaces de bord, sans doublons) en un minimum de requêtes.
+
+        Les segments trop longs sont découpés aux fins de phrase, puis tous les morceaux
+        sont répartis en requêtes bornées (first-fit decreasing). Retourne les traductions
+        obtenues et les segments dont une partie n'a pu être traduite (requête en échec,
+        réponse vide).
+        """
+        chunks = {segment: split_text(segment, TRANSLATION_BATCH_MAX_CHARS) for segment in segments}
+        parts = {chunk: split_whitespace(chunk) for pieces in chunks.values() for chunk in pieces}
+        requested = list(dict.fromkeys(core for _, core, _ in parts.values() if core))
+        sizes = [len(core) for core in requested]
+        batches = [
+            [requested[index] for index in indices]
+            for indices in pack_requests(sizes, TRANSLATION_BATCH_MAX_CHARS, TRANSLATION_BATCH_SIZE)
+        ]
+        translated, failed = {}, []
+        for batch, results in zip(batches, self._post_batches(batches, target_lang, source_lang, failed)):
+            for core, result in zip(batch, results):
+                if result is not None:
+                    translated[core] = result
+
+        failed = set(failed)
+        found, unavailable = {}, []
+        for segment, pieces in chunks.items():
+            cores = [parts[chunk][1] for chunk in pieces]
+            if any(core in failed for core in cores):
+                unavailable.append(segment)
+            elif all(not core or core in translated for core in cores):
+                found[segment] = "".join(
+                    lead + translated[core] + trail if core else chunk
+                    for chunk, (lead, core, trail) in ((chunk, parts[chunk]) for chunk in pieces)
+                )
+        return found, unavailable
+
+    def _call_translation_api_batch(self, texts: List[str], target_lang: str, source_lang: Optional[str] = None) -> List[str]:
+        """Traduit une liste de segments en un minimum de requêtes, en conservant l'ordre.
+
+        Seuls les segments absents de la mémoire de traduction sont envoyés. Si une requête
+        échoue (délai, erreur, disjoncteur ouvert) ou si le serveur ne renvoie aucun texte
+        pour un segment, TranslationError est levée.
+        """
+        source = source_lang or 'auto'
+        parts = [split_whitespace(text) for text in texts]
+        # Les doublons et les segments vides ne sont pas envoyés
+        unique = list(dict.fromkeys(core for _, core, _ in parts if core))
+        translations = {}
+        if self.memory is not None:
+            translations.update(self.memory.get_many(unique, source, target_lang, self.engine_id))
+        missing = [core for core in unique if core not in translations]
+        if len(unique) > len(missing):
+            TRANSLATED_SEGMENTS.inc(len(unique) - len(missing), lang=target_lang, source="memory")
+        if missing:
+            found, unavailable = self._translate_missing(missing, target_lang, source_lang)
+            TRANSLATED_CHARACTERS.inc(sum(len(core) for core in missing), lang=target_lang)
+            if found:
+                TRANSLATED_SEGMENTS.inc(len(found), lang=target_lang, source="api")
+            if len(found) < len(missing):
+                TRANSLATION_FAILURES.inc(len(missing) - len(found), lang=target_lang)
+            if self.memory is not None:
+                self.memory.set_many(found, source, target_lang, self.engine_id)
+            translations.update(found)
+            if unavailable:
+                unavailable = set(unavailable)
+                raise TranslationError(sorted(unavailable), [
+                    None if core in unavailable else lead + translations[core] + trail if core in translations else text
+                    for text, (lead, core, trail) in zip(texts, parts)
+                ])
+        return [
+            lead + translations[core] + trail if core in translations else text
+            for text, (lead, core, trail) in zip(texts, parts)
+        ]
 
     def translate_html(self, html: str, target_lang: str, source_lang: Optional[str] = None) -> str:
-        """Traduit le texte visible dans un document HTML, en conservant les balises."""
+        """Traduit le texte visible dans un document HTML, en conservant les balises.
+
+        Le document est lu en un seul passage, par fenêtres de HTML_SEGMENT_WINDOW_CHARS
+        caractères de texte ; balises, code, pre, script et style sont recopiés tels quels.
+        """
         self.logger.info(f"Traduction HTML -> {target_lang}")
-        soup = BeautifulSoup(html, 'html.parser')
+        windows = iter_windows(html or "", HTML_SEGMENT_WINDOW_CHARS)
+        out = []
+        while True:
+            with perf.stage("parse"):
+                window = next(windows, None)
+            if window is None:
+                break
+            with perf.stage("translate"):
+                translations = self._call_translation_api_batch(window.texts, target_lang, source_lang)
+            with perf.stage("serialize"):
+                out.append(render(window, translations))
+        return "".join(out)
+
+    def compile_html(self, html: str) -> PageTemplate:
+        """Segmente une page une seule fois ; le gabarit se remplit ensuite pour chaque langue."""
+        with perf.stage("parse"):
+            return compile_template(html or "", HTML_SEGMENT_WINDOW_CHARS)
+
+    def fill_template(
+        self,
+        template: PageTemplate,
+        target_lang: str,
+        source_lang: Optional[str] = None,
+        title: Optional[str] = None
+    ) -> Tuple[Optional[str], str]:
+        """Traduit un gabarit dans une langue ; retourne (titre traduit, HTML).
+
+        Le titre voyage dans le premier lot de segments : pas de requête séparée.
+        """
+        self.logger.info(f"Traduction gabarit ({template.segments} segments) -> {target_lang}")
+        translated_title, out = title, []
+        for index, window in enumerate(template.windows):
+            texts = window.texts
+            if index == 0 and title is not None:
+                texts = [title] + texts
+            with perf.stage("translate"):
+                translations = self._call_translation_api_batch(texts, target_lang, source_lang)
+            if index == 0 and title is not None:
+                translated_title, translations = translations[0], translations[1:]
+            with perf.stage("serialize"):
+                out.append(render(window, translations))
+        return translated_title, "".join(out)
+
+    def _per_language(self, target_langs: List[str], func) -> Dict[str, object]:
+        """Exécute func(langue) pour chaque langue, en parallèle ; {langue: résultat}."""
+        def run(lang):
+            with perf.trace(lang):
+                return func(lang)
+
+        if len(target_langs) <= 1:
+            return {lang: run(lang) for lang in target_langs}
+        if self._lang_executor is None:
+            self._lang_executor = ThreadPoolExecutor(
+                max_workers=self.lang_concurrency, thread_name_prefix="translate"
+            )
+        # Chaque langue garde le contexte de l'appelant (trace de performance de la page)
+        futures = {
+            lang: self._lang_executor.submit(contextvars.copy_context().run, run, lang)
+            for lang in target_langs
+        }
+        return {lang: future.result() for lang, future in futures.items()}
+
+    def translate_template(
+        self,
+        template: PageTemplate,
+        title: str,
+        target_langs: List[str],
+        source_lang: Optional[str] = None
+    ) -> Dict[str, Optional[Tuple[str, str]]]:
+        """Remplit un gabarit dans plusieurs langues, en parallèle ; {langue: (titre, HTML)}.
+
+        Une langue dont la traduction a échoué vaut None (la page ne doit pas être publiée).
+        """
+        def fill(lang):
+            try:
+                return self.fill_template(template, lang, source_lang, title=title)
+            except TranslationError as e:
+                self.logger.error(f"Traduction gabarit -> {lang} abandonnée : {e}")
+                return None
 
-        # On ne modifie que les chaînes de texte visibles (NavigableString)
-        for element in soup.find_all(string=True):
-            if isinstance(element, NavigableString) and element.strip():
-                translated = self._call_translation_api(str(element), target_lang, source_lang)
-                element.replace_with(translated)
+        return self._per_language(target_langs, fill)
 
-        return str(soup)
+    def translate_page(
+        self,
+        title: str,
+        html: str,
+        target_langs: List[str],
+        source_lang: Optional[str] = None
+    ) -> Dict[str, Optional[Tuple[str, str]]]:
+        """Traduit le titre et le corps d'une page dans plusieurs langues ; {langue: (titre, HTML)}.
+
+        La page est segmentée une fois ; les lots de toutes les langues partent en parallèle.
+        """
+        return self.translate_template(self.compile_html(html), title, target_langs, source_lang)
+
+    def batch_translate_many(
+        self,
+        texts_by_lang: Dict[str, List[str]],
+        source_lang: Optional[str] = None
+    ) -> Dict[str, List[Optional[str]]]:
+        """Traduit des listes de textes (une par langue cible), toutes langues en parallèle.
+
+        Un texte dont la traduction a échoué vaut None.
+        """
+        def translate(lang):
+            try:
+                return self.batch_translate_texts(texts_by_lang[lang], lang, source_lang)
+            except TranslationError as e:
+                self.logger.error(f"Traduction -> {lang} incomplète : {e}")
+                return e.translations
+
+        return self._per_language(list(texts_by_lang), translate)
 
     def batch_translate_texts(self, texts: List[str], target_lang: str, source_lang: Optional[str] = None) -> List[str]:
-        """Traduit une liste de textes (un par un)."""
+        """Traduit une liste de textes par lots."""
         self.logger.info(f"Traduction de {len(texts)} textes -> {target_lang}")
-        return [self.translate_text(text, target_lang, source_lang) for text in texts]
+        with perf.stage("translate"):
+            return self._call_translation_api_batch(texts, target_lang, source_lang)
     
-    def detect_language(self, text):
+    def set_concurrency(self, languages: Optional[int] = None, requests_per_backend: Optional[int] = None):
+        """Ajuste le parallélisme avant la première traduction (traduction en masse).
+
+        languages : langues traduites simultanément, toutes pages confondues ;
+        requests_per_backend : requêtes simultanées au plus par serveur LibreTranslate.
+        """
+        if languages:
+            self.lang_concurrency = languages
+            if self._lang_executor is not None:
+                self._lang_executor.shutdown(wait=False)
+                self._lang_executor = None
+        if requests_per_backend:
+            self.request_concurrency = requests_per_backend
+            self.pool.set_max_concurrency(requests_per_backend)
+            if self._request_executor is not None:
+                self._request_executor.shutdown(wait=False)
+                self._request_executor = None
+
+    def backend_stats(self) -> List[dict]:
+        """Statistiques par serveur LibreTranslate (limite, charge, santé, erreurs, latence)."""
+        return self.pool.stats()
+
+    def detect_language(self, text, cache_key: Optional[str] = None):
+        """Langue d'un texte ou d'un fragment HTML.
+
+        Identification locale sur un échantillon du texte visible ; LibreTranslate (/detect)
+        n'est interrogé que si la confiance est faible. Le résultat est mis en cache par
+        cache_key (typiquement l'empreinte du contenu de la page).
+        """
+        if cache_key is not None and cache_key in self._detected:
+            self._detected.move_to_end(cache_key)
+            LANGUAGE_DETECTIONS.inc(method="cache")
+            return self._detected[cache_key]
+
+        sample = sample_visible_text(text or "", LANGID_SAMPLE_CHARS)
+        lang, confidence = self.language_identifier.identify(sample)
+        if lang is None or confidence < LANGID_MIN_CONFIDENCE:
+            LANGUAGE_DETECTIONS.inc(method="remote")
+            lang = self._detect_remote(sample) or lang or SOURCE_LANG  # fallback sur langue par défaut
+        else:
+            LANGUAGE_DETECTIONS.inc(method="local")
+
+        if cache_key is not None:
+            self._detected[cache_key] = lang
+            if len(self._detected) > LANGID_CACHE_SIZE:
+                self._detected.popitem(last=False)
+        return lang
+
+    def _detect_remote(self, text) -> Optional[str]:
         payload = {"q": text}
         headers = {"Content-Type": "application/json"}
-        
+
         try:
-            resp = requests.post(f"{self.api_url}/detect", json=payload, headers=headers)
+            resp = self.pool.request("detect", payload, self.http.timeout, headers=headers)
             if resp.status_code == 200:
                 detections = resp.json()
                 if detections:
                     return detections[0]['language']
         except Exception as e:
-                print(f"[TRANSLATE] Erreur de détection de langue : {e}")
-        return SOURCE_LANG  # fallback sur langue par défaut
+            self.logger.warning(f"[TRANSLATE] Erreur de détection de langue : {e}")
+        return None
 
 
 
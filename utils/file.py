@@ -1,6 +1,11 @@
 # utils/file.py
+import os
+
+
 def ensure_directory(path):
-    pass
+    """Crée le dossier (et ses parents) s'il n'existe pas encore."""
+    if path:
+        os.makedirs(path, exist_ok=True)
 
 def log(message):
     pass
@@ -0,0 +1,267 @@
+import os
+import sys
+import atexit
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> str:
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [self.header()]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key)} {_format_value(value)}\n")
+        return "".join(lines)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Jauge fixée explicitement, ou calculée à la lecture via set_function()."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """function() retourne {(valeurs d'étiquettes...): valeur} ; évaluée à chaque lecture."""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                values = self._function() or {}
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"[METRICS] Lecture de {self.name} impossible : {e}")
+                values = {}
+            with self._lock:
+                self._values = {tuple(str(v) for v in key): float(value) for key, value in values.items()}
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> str:
+        lines = [self.header()]
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}\n")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}\n")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}\n")
+        return "".join(lines)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key): {"count": state[2], "sum": state[1]} for key, state in self._values.items()}
+
+
+class Registry:
+    """Registre de métriques au format texte Prometheus (exposition 0.0.4)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames=(), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# === Métriques partagées ===
+HTTP_REQUESTS = REGISTRY.counter(
+    "bookstack_translation_http_requests_total", "Requêtes HTTP sortantes par service, endpoint et statut.",
+    ("service", "endpoint", "status"))
+HTTP_RETRIES = REGISTRY.counter(
+    "bookstack_translation_http_retries_total", "Nouvelles tentatives HTTP par service et endpoint.",
+    ("service", "endpoint"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "bookstack_translation_http_request_duration_seconds", "Durée des requêtes HTTP sortantes.",
+    ("service", "endpoint"))
+TRANSLATED_CHARACTERS = REGISTRY.counter(
+    "bookstack_translation_translated_characters_total", "Caractères envoyés à LibreTranslate par langue.",
+    ("lang",))
+TRANSLATED_SEGMENTS = REGISTRY.counter(
+    "bookstack_translation_translated_segments_total", "Segments traduits par langue et origine (api, memory).",
+    ("lang", "source"))
+TRANSLATION_FAILURES = REGISTRY.counter(
+    "bookstack_translation_translation_failures_total", "Segments non traduits par langue.", ("lang",))
+LANGUAGE_DETECTIONS = REGISTRY.counter(
+    "bookstack_translation_language_detections_total", "Détections de langue par méthode (cache, local, remote).",
+    ("method",))
+PAGES_SYNCED = REGISTRY.counter(
+    "bookstack_translation_pages_total", "Pages synchronisées par langue et statut.", ("lang", "status"))
+PAGE_SYNC_LATENCY = REGISTRY.histogram(
+    "bookstack_translation_page_sync_duration_seconds", "Durée de synchronisation d'une page (toutes langues).")
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "bookstack_translation_cache_hit_ratio", "Taux de succès des caches (translation_memory, language).",
+    ("cache",))
+MAPPING_ENTRIES = REGISTRY.gauge(
+    "bookstack_translation_mapping_entries", "Entrées du mapping par section.", ("section",))
+JOBS = REGISTRY.gauge(
+    "bookstack_translation_webhook_jobs", "Travaux de la file webhook par statut.", ("status",))
+BACKEND_CONCURRENCY = REGISTRY.gauge(
+    "bookstack_translation_backend_concurrency_limit", "Limite adaptative de requêtes de traduction simultanées.",
+    ("backend",))
+BACKEND_IN_FLIGHT = REGISTRY.gauge(
+    "bookstack_translation_backend_in_flight", "Requêtes de traduction en cours.", ("backend",))
+BACKEND_CIRCUIT = REGISTRY.gauge(
+    "bookstack_translation_backend_circuit_state", "État du disjoncteur (0 fermé, 1 ouvert, 2 essai).", ("backend",))
+BACKEND_HEALTHY = REGISTRY.gauge(
+    "bookstack_translation_backend_healthy", "Serveur de traduction disponible (vérification de santé).", ("backend",))
+BACKEND_FAILOVERS = REGISTRY.counter(
+    "bookstack_translation_backend_failovers_total", "Requêtes cédées à un autre serveur après un échec.",
+    ("backend",))
+
+
+def _ratio(hits: float, misses: float) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def _cache_ratios():
+    memory_hits = TRANSLATED_SEGMENTS.snapshot()
+    hits = sum(v for k, v in memory_hits.items() if k.endswith(",memory"))
+    misses = sum(v for k, v in memory_hits.items() if k.endswith(",api"))
+    detections = LANGUAGE_DETECTIONS.snapshot()
+    cached = detections.get("cache", 0.0)
+    return {
+        ("translation_memory",): _ratio(hits, misses),
+        ("language",): _ratio(cached, detections.get("local", 0.0) + detections.get("remote", 0.0)),
+    }
+
+
+CACHE_HIT_RATIO.set_function(_cache_ratios)
+
+
+def dump_snapshot(path: Optional[str] = None, registry: Registry = REGISTRY):
+    """Écrit les métriques au format texte dans path (ou sur stderr)."""
+    text = registry.render()
+    if not path:
+        sys.stderr.write(text)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    logging.getLogger(__name__).info(f"[METRICS] Instantané écrit dans {path}.")
+
+
+def dump_at_exit(path: Optional[str] = None, registry: Registry = REGISTRY):
+    """Enregistre l'écriture d'un instantané des métriques à la fin du processus (mode CLI)."""
+    atexit.register(dump_snapshot, path, registry)
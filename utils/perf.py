@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import uuid
+import cProfile
+import logging
+import threading
+import contextvars
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from utils.file import ensure_directory
+
+_trace = contextvars.ContextVar("perf_trace", default=None)
+_frame = contextvars.ContextVar("perf_stage", default=None)
+
+
+def _http_totals():
+    return {"requests": 0, "bytes_sent": 0, "bytes_received": 0, "retries": 0}
+
+
+class Trace:
+    """Mesures d'une page ou d'une unité page × langue : durée par étape et trafic HTTP.
+
+    La trace courante suit le contexte (contextvars) : elle est visible des appels faits
+    dans le même thread ou dans un contexte copié (pool de threads du moteur asynchrone).
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.http = defaultdict(_http_totals)
+        self.children = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, elapsed: float):
+        with self._lock:
+            self.stages[name] += elapsed
+
+    def add_http(self, service: str, bytes_sent: int, bytes_received: int, retried: bool):
+        with self._lock:
+            totals = self.http[service]
+            totals["requests"] += 1
+            totals["bytes_sent"] += bytes_sent
+            totals["bytes_received"] += bytes_received
+            totals["retries"] += int(retried)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "wall_time": round(time.perf_counter() - self.start, 6),
+                "stages": {name: round(value, 6) for name, value in self.stages.items()},
+                "http": {service: dict(totals) for service, totals in self.http.items()}
+            }
+
+
+def current() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def trace(name: Optional[str] = None):
+    """Active une nouvelle trace pour le bloc (et les appels qu'il déclenche).
+
+    Avec name, la trace est rattachée à la trace englobante (ex. une langue d'une page) ;
+    une trace de même nom déjà rattachée est reprise (traduction puis publication).
+    """
+    new = Trace()
+    parent = _trace.get()
+    if name is not None and parent is not None:
+        with parent._lock:
+            new = parent.children.setdefault(name, new)
+    token = _trace.set(new)
+    try:
+        yield new
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def activate(existing: Optional[Trace]):
+    """Reprend une trace existante (page préparée puis publiée plus tard)."""
+    if existing is None:
+        yield None
+        return
+    token = _trace.set(existing)
+    try:
+        yield existing
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Chronomètre une étape de la trace courante ; sans trace active, ne fait rien.
+
+    Les étapes imbriquées sont exclusives : le temps d'une étape interne (traduction d'un
+    titre pendant la publication d'un livre) est retiré de l'étape qui l'englobe.
+    """
+    current_trace = _trace.get()
+    if current_trace is None:
+        yield
+        return
+    frame = [0.0]
+    parent = _frame.get()
+    token = _frame.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _frame.reset(token)
+        current_trace.add_stage(name, elapsed - frame[0])
+        if parent is not None:
+            parent[0] += elapsed
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0
+
+
+def record_http(service: str, response=None, retried: bool = False):
+    """Attribue une requête HTTP (octets envoyés et reçus) à la trace courante."""
+    current_trace = _trace.get()
+    if current_trace is None:
+        return
+    sent = received = 0
+    if response is not None:
+        request = getattr(response, "request", None)
+        sent = _body_size(getattr(request, "body", None))
+        received = len(getattr(response, "content", b"") or b"")
+    current_trace.add_http(service, sent, received, retried)
+
+
+class PerfReport:
+    """Rapport de performance d'une exécution, écrit en JSONL au fil de l'eau.
+
+    Une ligne "run_start", une ligne "page" par page synchronisée (étapes par langue,
+    requêtes et octets par service), puis une ligne "run_end" avec les totaux et le pic
+    mémoire (tracemalloc). Les lignes sont ajoutées à la fin du fichier : les exécutions
+    précédentes sont conservées et se distinguent par leur run_id. Seuls les totaux sont
+    gardés en mémoire.
+    """
+
+    def __init__(self, path: str, trace_memory: bool = False):
+        self.path = path
+        self.trace_memory = trace_memory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages = defaultdict(float)
+        self.http = defaultdict(_http_totals)
+        self.pages = 0
+        self._file = None
+        self._start = None
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def start(self, **fields):
+        try:
+            ensure_directory(os.path.dirname(self.path))
+            self._file = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            logging.error(f"[PERF] Impossible d'écrire le rapport {self.path} : {e}")
+            self._file = None
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self._write(dict(
+            type="run_start", run_id=self.run_id,
+            started_at=datetime.now(timezone.utc).isoformat(timespec="seconds"), **fields
+        ))
+        return self
+
+    def page(self, page_id, page_trace: Trace, statuses: dict, **fields):
+        """Écrit la ligne d'une page : étapes communes (fetch) puis détail par langue."""
+        langs = {}
+        for lang, status in statuses.items():
+            lang_trace = page_trace.children.get(lang)
+            langs[lang] = dict(status=status, **(lang_trace.to_dict() if lang_trace else {}))
+        with self._lock:
+            self.pages += 1
+        self.record("page", page_trace, page_id=page_id, langs=langs, **fields)
+
+    def record(self, record_type: str, unit_trace: Trace, **fields):
+        """Écrit une ligne de mesures (page, structure du livre...) et l'ajoute aux totaux."""
+        record = dict(type=record_type, run_id=self.run_id, **fields)
+        record.update(unit_trace.to_dict())
+        with self._lock:
+            for part in [record] + list(record.get("langs", {}).values()):
+                for name, value in part.get("stages", {}).items():
+                    self.stages[name] += value
+                for service, totals in part.get("http", {}).items():
+                    for key, value in totals.items():
+                        self.http[service][key] += value
+        self._write(record)
+
+    def close(self, **fields) -> dict:
+        """Écrit la ligne de fin ; retourne le résumé (repris dans data/last_report.json)."""
+        peak = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        with self._lock:
+            summary = {
+                "run_id": self.run_id,
+                "wall_time": round(time.perf_counter() - (self._start or time.perf_counter()), 6),
+                "pages": self.pages,
+                "stages": {name: round(value, 6) for name, value in self.stages.items()},
+                "http": {service: dict(totals) for service, totals in self.http.items()},
+                "peak_memory_bytes": peak,
+                "perf_report": self.path
+            }
+        self._write(dict(type="run_end", **summary, **fields))
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logging.info(f"[PERF] Rapport de performance enregistré dans {self.path}.")
+        return summary
+
+
+@contextmanager
+def profiled(path: str):
+    """Exécute le bloc sous cProfile et enregistre les statistiques (pstats) dans path."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        ensure_directory(os.path.dirname(path))
+        profiler.dump_stats(path)
+        logging.info(f"[PERF] Profil enregistré dans {path} (python -m pstats {path}).")
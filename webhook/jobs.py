@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from typing import Callable, Iterable, NamedTuple, Optional, Set
+
+from config import (
+    WEBHOOK_QUEUE_FILE,
+    WEBHOOK_JOB_MAX_ATTEMPTS,
+    WEBHOOK_JOB_LEASE,
+    WEBHOOK_DEBOUNCE_SECONDS,
+)
+from utils.file import ensure_directory
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    key: Optional[str]
+    payload: dict
+    attempts: int
+    token: Optional[str] = None     # jeton du bail : seul son détenteur peut le prolonger ou le clore
+
+
+def merge_payloads(current: dict, incoming: dict) -> dict:
+    """Fusionne deux événements pour la même entité.
+
+    Les langues sont unies (absence de "langs" = toutes les langues cibles) et la version
+    la plus récente (updated_at) est conservée.
+    """
+    merged = {**current, **incoming}
+    if current.get("langs") is None or incoming.get("langs") is None:
+        merged.pop("langs", None)
+    else:
+        merged["langs"] = sorted(set(current["langs"]) | set(incoming["langs"]))
+    versions = [v for v in (current.get("updated_at"), incoming.get("updated_at")) if v]
+    if versions:
+        merged["updated_at"] = max(versions)
+    return merged
+
+
+class JobQueue:
+    """File de travaux durable (SQLite sous DB_DIR), livrée au moins une fois.
+
+    Un travail réclamé reçoit un bail et un jeton ; le travailleur prolonge le bail tant
+    qu'il s'exécute (extend_lease). S'il n'est ni prolongé, ni terminé, ni échoué avant
+    l'expiration (processus tué, redémarrage), le travail redevient disponible, et l'ancien
+    travailleur, dont le jeton n'est plus valable, ne peut plus modifier son état.
+
+    Les événements d'une même clé (type d'entité, id source) sont regroupés : tant que le
+    travail n'est pas commencé, chaque nouvel événement y est fusionné et repousse son départ
+    d'une fenêtre de calme (debounce). Un événement dont updated_at n'est pas plus récent
+    que la dernière version synchronisée est ignoré.
+    """
+
+    def __init__(
+        self,
+        path: str = WEBHOOK_QUEUE_FILE,
+        max_attempts: int = WEBHOOK_JOB_MAX_ATTEMPTS,
+        lease: float = WEBHOOK_JOB_LEASE,
+        debounce: float = WEBHOOK_DEBOUNCE_SECONDS
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.debounce = debounce
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        ensure_directory(os.path.dirname(path))
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " key TEXT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL,"
+            " lease_until REAL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "lease_token" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+        # Dernière version (updated_at) synchronisée avec succès par clé
+        self._db.execute("CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, updated_at TEXT NOT NULL)")
+        self.coalesced = 0
+        self.stale = 0
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        key: Optional[str] = None,
+        delay: Optional[float] = None
+    ) -> Optional[int]:
+        """Persiste (ou fusionne) un travail ; retourne son identifiant, None si l'événement est périmé.
+
+        delay : fenêtre de calme avant exécution (par défaut self.debounce si une clé est donnée).
+        """
+        now = time.time()
+        if delay is None:
+            delay = self.debounce if key else 0.0
+        version = payload.get("updated_at")
+        with self._available:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if key and version:
+                    row = self._db.execute("SELECT updated_at FROM versions WHERE key = ?", (key,)).fetchone()
+                    if row and version <= row[0]:
+                        self._db.execute("COMMIT")
+                        self.stale += 1
+                        self.logger.info(f"[QUEUE] Événement périmé ignoré pour {key} ({version} <= {row[0]}).")
+                        return None
+                pending = None
+                if key:
+                    pending = self._db.execute(
+                        "SELECT id, payload FROM jobs WHERE key = ? AND kind = ? AND status = 'pending'"
+                        " ORDER BY id LIMIT 1",
+                        (key, kind)
+                    ).fetchone()
+                if pending:
+                    job_id = pending[0]
+                    merged = merge_payloads(json.loads(pending[1]), payload)
+                    self._db.execute(
+                        "UPDATE jobs SET payload = ?, available_at = MAX(available_at, ?), updated_at = ? WHERE id = ?",
+                        (json.dumps(merged, ensure_ascii=False), now + delay, now, job_id)
+                    )
+                    self.coalesced += 1
+                else:
+                    job_id = self._db.execute(
+                        "INSERT INTO jobs (kind, key, payload, available_at, created_at, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (kind, key, json.dumps(payload, ensure_ascii=False), now + delay, now, now)
+                    ).lastrowid
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._available.notify()
+            return job_id
+
+    def recover(self) -> int:
+        """Au démarrage : les travaux restés « running » sont remis en attente."""
+        with self._lock:
+            count = self._db.execute(
+                "UPDATE jobs SET status = 'pending', lease_until = NULL, lease_token = NULL, updated_at = ?"
+                " WHERE status = 'running'",
+                (time.time(),)
+            ).rowcount
+        if count:
+            self.logger.warning(f"[QUEUE] {count} travaux interrompus remis en attente.")
+        return count
+
+    def claim(self, ids: Optional[Iterable[int]] = None) -> Optional[Job]:
+        """Réclame le plus ancien travail disponible dont la clé n'est pas déjà en cours.
+
+        ids : ne réclamer que parmi ces travaux.
+        """
+        now = time.time()
+        ids = None if ids is None else [int(job_id) for job_id in ids]
+        only = "" if ids is None else f" AND id IN ({', '.join('?' * len(ids))})"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Baux expirés : le travailleur a disparu, le travail est à refaire
+                self._db.execute(
+                    "UPDATE jobs SET status = 'pending', lease_token = NULL WHERE status = 'running' AND lease_until < ?",
+                    (now,)
+                )
+                row = self._db.execute(
+                    "SELECT id, kind, key, payload, attempts FROM jobs j"
+                    " WHERE status = 'pending' AND available_at <= ?"
+                    " AND (key IS NULL OR NOT EXISTS ("
+                    "   SELECT 1 FROM jobs r WHERE r.key = j.key AND r.status = 'running'))" + only +
+                    " ORDER BY available_at, id LIMIT 1",
+                    (now,) + tuple(ids or ())
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                token = uuid.uuid4().hex
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, lease_token = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (now + self.lease, token, now, row[0])
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return Job(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1, token)
+
+    @staticmethod
+    def _owned(token: Optional[str]) -> str:
+        """Condition SQL : le travail est toujours tenu par ce jeton (sans jeton : pas de contrôle)."""
+        return " AND status = 'running' AND lease_token = ?" if token else ""
+
+    def extend_lease(self, job: Job) -> bool:
+        """Prolonge le bail d'un travail en cours ; False s'il a été repris par un autre travailleur."""
+        now = time.time()
+        with self._lock:
+            extended = self._db.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (now + self.lease, now, job.id, job.token)
+            ).rowcount
+        if not extended:
+            self.logger.warning(f"[QUEUE] Bail du travail {job.id} perdu : il a été repris ailleurs.")
+        return bool(extended)
+
+    def complete(self, job_id: int, key: Optional[str] = None, version: Optional[str] = None,
+                 token: Optional[str] = None) -> bool:
+        """Marque le travail terminé et retient la version synchronisée pour sa clé.
+
+        Avec token, rien n'est modifié si le bail a été repris par un autre travailleur.
+        """
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL, lease_token = NULL, updated_at = ?"
+                " WHERE id = ?" + self._owned(token),
+                (time.time(), job_id) + ((token,) if token else ())
+            ).rowcount
+            if not updated:
+                self.logger.warning(f"[QUEUE] Travail {job_id} terminé après la perte de son bail, ignoré.")
+                return False
+            if key and version:
+                self._db.execute(
+                    "INSERT INTO versions (key, updated_at) VALUES (?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET updated_at = MAX(updated_at, excluded.updated_at)",
+                    (key, version)
+                )
+            return True
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Replanifie le travail avec backoff, ou l'abandonne après max_attempts essais.
+
+        Rien n'est modifié si le bail du travail a été repris par un autre travailleur.
+        """
+        now = time.time()
+        owned = self._owned(job.token)
+        token = (job.token,) if job.token else ()
+        with self._available:
+            if job.attempts >= self.max_attempts:
+                updated = self._db.execute(
+                    "UPDATE jobs SET status = 'failed', lease_until = NULL, lease_token = NULL, last_error = ?,"
+                    " updated_at = ? WHERE id = ?" + owned,
+                    (error, now, job.id) + token
+                ).rowcount
+                if updated:
+                    self.logger.error(f"[QUEUE] Travail {job.id} abandonné après {job.attempts} essais : {error}")
+                return bool(updated)
+            delay = random.uniform(0, min(300, 5 * 2 ** job.attempts))
+            updated = self._db.execute(
+                "UPDATE jobs SET status = 'pending', lease_until = NULL, lease_token = NULL, last_error = ?,"
+                " available_at = ?, updated_at = ? WHERE id = ?" + owned,
+                (error, now + delay, now, job.id) + token
+            ).rowcount
+            if not updated:
+                self.logger.warning(f"[QUEUE] Échec du travail {job.id} après la perte de son bail, ignoré.")
+                return False
+            self._available.notify()
+            return True
+
+    def wait(self, timeout: float):
+        """Bloque jusqu'à un nouvel enqueue (ou l'expiration du délai)."""
+        with self._available:
+            self._available.wait(timeout)
+
+    def expedite(self, ids: Iterable[int]) -> int:
+        """Rend ces travaux en attente disponibles tout de suite (délai et debounce ignorés)."""
+        ids = [int(job_id) for job_id in ids]
+        if not ids:
+            return 0
+        with self._available:
+            expedited = self._db.execute(
+                f"UPDATE jobs SET available_at = ? WHERE status = 'pending' AND id IN ({', '.join('?' * len(ids))})",
+                [time.time()] + ids
+            ).rowcount
+            self._available.notify_all()
+        return expedited
+
+    def pending(self, ids: Iterable[int]) -> Set[int]:
+        """Parmi ces travaux, ceux qui attendent encore d'être réclamés."""
+        ids = [int(job_id) for job_id in ids]
+        if not ids:
+            return set()
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                f"SELECT id FROM jobs WHERE status = 'pending' AND id IN ({', '.join('?' * len(ids))})", ids
+            )}
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+    def counts(self) -> dict:
+        """Nombre de travaux par statut."""
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def latencies(self) -> list:
+        """Délais (secondes) entre la création et la fin des travaux terminés."""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT updated_at - created_at FROM jobs WHERE status = 'done' ORDER BY id"
+            )]
+
+    def purge(self, older_than: float = 7 * 24 * 3600) -> int:
+        """Supprime les travaux terminés plus anciens que older_than secondes."""
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class WorkerPool:
+    """Pool de threads qui vident la file et appellent handler(job) pour chaque travail.
+
+    Un thread de battement de cœur prolonge le bail des travaux en cours (toutes les
+    heartbeat_interval secondes, par défaut un tiers du bail) : une longue synchronisation
+    de livre n'est pas reprise en parallèle par un autre travailleur.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Job], None], workers: int = 2, poll_interval: float = 1.0,
+                 heartbeat_interval: Optional[float] = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or max(1.0, queue.lease / 3)
+        self.logger = logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._threads = []
+        self._active = {}
+        self._active_lock = threading.Lock()
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="webhook-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        self.logger.info(f"[QUEUE] {self.workers} travailleurs démarrés.")
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wait(self.poll_interval)
+                continue
+            with self._active_lock:
+                self._active[job.id] = job
+            try:
+                self.handler(job)
+            except Exception as e:
+                self.logger.exception(f"[QUEUE] Échec du travail {job.id} ({job.kind})")
+                self.queue.fail(job, str(e))
+            else:
+                self.queue.complete(job.id, job.key, job.payload.get("updated_at"), token=job.token)
+            finally:
+                with self._active_lock:
+                    self._active.pop(job.id, None)
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._active_lock:
+                jobs = list(self._active.values())
+            for job in jobs:
+                self.queue.extend_lease(job)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        with self.queue._available:
+            self.queue._available.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
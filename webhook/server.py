@@ -1,4 +1,4 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
 import logging
 import sys
@@ -6,11 +6,37 @@ import os
 
 # Add directory to path for module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from config import TARGET_LANGS
+from config import TARGET_LANGS, WEBHOOK_WORKERS
+from webhook.jobs import JobQueue, WorkerPool
+from translation.context import get_context
+from utils.metrics import REGISTRY, CONTENT_TYPE, JOBS, MAPPING_ENTRIES
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
+# File durable partagée par le serveur et les travailleurs (créée dans run())
+job_queue = None
+
+
+def process_job(job):
+    """Exécute un travail de la file ; une exception le replanifie (livraison au moins une fois)."""
+    if job.kind == "page_update":
+        page_id = job.payload["page_id"]
+        sync = get_context().sync_manager
+        origin = sync.mapping.get_source_page(page_id)
+        if origin:
+            logging.info(f"[WEBHOOK] Page {page_id} = traduction {origin.lang} de {origin.source_id}, ignorée.")
+            return
+        results = sync.sync_page(page_id, job.payload.get("langs") or TARGET_LANGS)
+        sync.mapping.flush()
+        # "deferred" : serveur de traduction indisponible, le travail est replanifié par la file
+        failed = [lang for lang, status in (results or {}).items() if status in ("failed", "deferred")]
+        if failed:
+            raise RuntimeError(f"Synchronisation de la page {page_id} échouée pour : {', '.join(failed)}")
+    else:
+        logging.warning(f"[WEBHOOK] Travail de type inconnu ignoré : {job.kind}")
+
+
 class WebhookHandler(BaseHTTPRequestHandler):
     def _send_json(self, code, data):
         payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
@@ -20,6 +46,16 @@ class WebhookHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(payload)
 
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            return self._send_json(404, {"error": "Not found"})
+        payload = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
     def do_POST(self):
         try:
             content_length = int(self.headers['Content-Length'])
@@ -29,6 +65,8 @@ class WebhookHandler(BaseHTTPRequestHandler):
             print("Requête webhook reçue :", json_data)
 
             event_type = json_data.get("event")
+            # Le miroir local suit chaque création / modification / suppression signalée
+            mirrored = get_context().mirror.apply_event(event_type, json_data.get("related_item") or {})
 
             if event_type == "chapter_create":
                 chapter_id = json_data.get("chapter_id")
@@ -54,9 +92,16 @@ class WebhookHandler(BaseHTTPRequestHandler):
                         return
 
                 logging.info(f"[WEBHOOK] Mise à jour de la page : {page_id}")
-                from translation.sync import SyncManager
-                sync = SyncManager()
-                sync.sync_page(page_id, TARGET_LANGS)
+                payload = {"page_id": page_id}
+                if related.get("updated_at"):
+                    payload["updated_at"] = related["updated_at"]
+                job_id = job_queue.enqueue("page_update", payload, key=f"page:{page_id}")
+                if job_id is None:
+                    return self._send_json(200, {"status": "stale"})
+                return self._send_json(202, {"status": "queued", "job_id": job_id})
+
+            elif mirrored:
+                logging.info(f"[WEBHOOK] Miroir mis à jour : {event_type}")
 
             else:
                 logging.warning(f"[WEBHOOK] Événement non géré : {event_type}")
@@ -88,9 +133,30 @@ class WebhookHandler(BaseHTTPRequestHandler):
 
             
 
-def run(port=5050):
-    logging.info(f"Server running at http://0.0.0.0:{port}/webhook")
-    HTTPServer(("0.0.0.0", port), WebhookHandler).serve_forever()
+def run(port=5050, workers=WEBHOOK_WORKERS):
+    global job_queue
+    job_queue = JobQueue()
+    # Les travaux interrompus par un arrêt précédent sont repris
+    job_queue.recover()
+    job_queue.purge()
+    # Services construits avant d'accepter des requêtes : aucun coût au premier événement
+    get_context().sync_manager
+    JOBS.set_function(lambda: {(status,): count for status, count in job_queue.counts().items()})
+    MAPPING_ENTRIES.set_function(lambda: {
+        (section,): len(entries) for section, entries in get_context().mapping.mapping.items()
+        if isinstance(entries, dict)
+    })
+    pool = WorkerPool(job_queue, process_job, workers=workers)
+    pool.start()
+    logging.info(f"Server running at http://0.0.0.0:{port}/webhook (métriques : /metrics)")
+    try:
+        ThreadingHTTPServer(("0.0.0.0", port), WebhookHandler).serve_forever()
+    except KeyboardInterrupt:
+        logging.info("[WEBHOOK] Arrêt demandé, attente des travaux en cours...")
+    finally:
+        pool.stop()
+        get_context().close()
+        job_queue.close()
 
 
 if __name__ == "__main__":